@@ -0,0 +1,445 @@
+import asyncio
+import atexit
+import json
+import threading
+import time
+from urllib.parse import urlencode
+
+import httpx
+
+from api import api_client
+from api.cache_local import clave_endpoint
+from api.formato_compacto import cabecera_accept, es_formato_compacto, tipo_contenido
+from api.modelos import a_modelos
+from api.sesion_local import borrar_sesion
+
+# ====================================================================
+# --- API ASÍNCRONA (api_client.aio) ---
+# ====================================================================
+# Las mismas operaciones que api_client como corutinas (`await aio.obtener_clientes()`), para lanzar
+# decenas de peticiones a la vez sin un hilo por petición. Todas corren en un único bucle asyncio
+# en un hilo auxiliar; desde Tk se usan con components.segundo_plano.ejecutar_asincrono(), que
+# recoge el resultado con after().
+#
+# Transporte: httpx.AsyncClient (HTTP/2 si además está `h2`) con conexiones keep-alive reutilizables.
+# Usa el mismo cookie jar que api_client.GLOBAL_SESSION, así la cookie de sesión (JSESSIONID) se envía
+# respetando dominio, ruta y caducidad, igual que en la API síncrona. La caché de instantáneas,
+# las métricas y el modo MOCK también son los de api_client.
+
+# Conexiones simultáneas como máximo por transporte
+LIMITE_CONEXIONES = 10
+# Tiempo máximo (s) de una petición completa
+TIEMPO_MAXIMO_S = 30
+
+
+class _Respuesta:
+    def __init__(self, estado, cabeceras, contenido):
+        self.estado = estado
+        self.cabeceras = cabeceras
+        self.contenido = contenido
+
+
+class _TransporteHttpx:
+    """httpx.AsyncClient con pool keep-alive (y HTTP/2 si está instalado `h2`)."""
+    def __init__(self, limite=LIMITE_CONEXIONES):
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        self.cliente = httpx.AsyncClient(http2=http2, timeout=TIEMPO_MAXIMO_S,
+                                         limits=httpx.Limits(max_connections=limite, max_keepalive_connections=limite))
+
+    def _compartir_cookies(self):
+        # El jar de requests es un http.cookiejar.CookieJar: httpx lo usa tal cual (sin copiarlo)
+        jar = api_client.GLOBAL_SESSION.cookies
+        if self.cliente.cookies.jar is not jar:
+            self.cliente.cookies = jar
+
+    async def peticion(self, metodo, url, cabeceras, cuerpo):
+        self._compartir_cookies()
+        respuesta = await self.cliente.request(metodo, url, headers=cabeceras, content=cuerpo)
+        return _Respuesta(respuesta.status_code, respuesta.headers, respuesta.content)
+
+    async def abrir_listado(self, url, params):
+        # GET en streaming: devuelve la respuesta httpx sin leer el cuerpo (cerrarla con aclose()).
+        self._compartir_cookies()
+        peticion = self.cliente.build_request('GET', url, params=params, headers={"Accept": cabecera_accept()})
+        return await self.cliente.send(peticion, stream=True)
+
+    async def cerrar(self):
+        await self.cliente.aclose()
+
+
+# Errores de red (equivalen a requests.exceptions.RequestException en la API síncrona)
+_ERRORES_TRANSPORTE = (OSError, asyncio.TimeoutError, httpx.RequestError)
+
+
+# --------------------------------------------------------------------
+# BUCLE ASYNCIO EN UN HILO AUXILIAR
+# --------------------------------------------------------------------
+
+_ESTADO = {"bucle": None, "hilo": None, "transporte": None}
+_CANDADO_BUCLE = threading.Lock()
+# GETs en curso dentro del bucle (clave -> Task), para agrupar los idénticos
+_EN_VUELO = {}
+
+
+def _bucle():
+    with _CANDADO_BUCLE:
+        if _ESTADO["bucle"] is None:
+            bucle = asyncio.new_event_loop()
+            hilo = threading.Thread(target=bucle.run_forever, name="api-aio", daemon=True)
+            hilo.start()
+            _ESTADO.update(bucle=bucle, hilo=hilo)
+        return _ESTADO["bucle"]
+
+
+def _transporte():
+    # Se crea dentro del bucle (primera petición): el semáforo y el cliente quedan ligados a él.
+    if _ESTADO["transporte"] is None:
+        _ESTADO["transporte"] = _TransporteHttpx()
+    return _ESTADO["transporte"]
+
+
+def lanzar(corutina):
+    """
+    Programa `corutina` en el bucle del hilo auxiliar y devuelve un concurrent.futures.Future.
+    Es seguro llamarlo desde cualquier hilo (incluido el de Tk).
+    """
+    return asyncio.run_coroutine_threadsafe(corutina, _bucle())
+
+
+def ejecutar(corutina):
+    # Versión bloqueante de lanzar(): espera el resultado. No usar en el hilo de Tk ni dentro del bucle.
+    return lanzar(corutina).result()
+
+
+async def reunir(*corutinas):
+    # Ejecuta varias operaciones a la vez y devuelve sus resultados en el mismo orden.
+    return await asyncio.gather(*corutinas)
+
+
+def cerrar():
+    # Cierra las conexiones abiertas y detiene el bucle (al cerrar sesión y al salir de la aplicación).
+    # La siguiente petición vuelve a crearlos.
+    bucle = _ESTADO["bucle"]
+    if bucle is None:
+        return
+    transporte = _ESTADO["transporte"]
+    if transporte is not None:
+        asyncio.run_coroutine_threadsafe(transporte.cerrar(), bucle).result(TIEMPO_MAXIMO_S)
+    bucle.call_soon_threadsafe(bucle.stop)
+    _ESTADO["hilo"].join(TIEMPO_MAXIMO_S)
+    _ESTADO.update(bucle=None, hilo=None, transporte=None)
+
+atexit.register(cerrar)
+
+
+# --------------------------------------------------------------------
+# PETICIÓN BASE (equivalente asíncrono de _manejar_peticion)
+# --------------------------------------------------------------------
+
+async def _peticion(metodo, endpoint, data = None, params = None, usar_cache = True):
+    if api_client.USAR_MOCK_DATA:
+        return api_client._manejar_peticion(metodo, endpoint, data=data, params=params, usar_cache=usar_cache)
+    if metodo != 'GET':
+        return await _ejecutar_peticion(metodo, endpoint, data, params, usar_cache)
+
+    # GETs idénticos concurrentes comparten la misma tarea
+    clave = (clave_endpoint(endpoint, params), usar_cache)
+    tarea = _EN_VUELO.get(clave)
+    api_client.METRICAS.registrar_cache('GET compartido (en vuelo)', tarea is not None)
+    if tarea is None:
+        tarea = _EN_VUELO[clave] = asyncio.ensure_future(_ejecutar_peticion(metodo, endpoint, data, params, usar_cache))
+        tarea.add_done_callback(lambda _: _EN_VUELO.pop(clave, None))
+    # shield: cancelar a quien espera no cancela la petición que comparten los demás
+    return await asyncio.shield(tarea)
+
+
+async def _ejecutar_peticion(metodo, endpoint, data, params, usar_cache):
+    url = f"{api_client.BASE_URL}/{endpoint}"
+    if params:
+        url += "?" + urlencode({k: v for k, v in params.items() if v is not None})
+    cuerpo = json.dumps(data).encode('utf-8') if data is not None else None
+    cabeceras = {"Accept": "application/json"}
+    if cuerpo is not None:
+        cabeceras["Content-Type"] = "application/json"
+
+    metricas = api_client.METRICAS
+    inicio = time.perf_counter()
+    try:
+        respuesta = await asyncio.wait_for(_transporte().peticion(metodo, url, cabeceras, cuerpo), TIEMPO_MAXIMO_S)
+    except _ERRORES_TRANSPORTE as e:
+        print(f"ERROR DE CONEXIÓN en {metodo} {url}: {e!r}")
+        metricas.registrar_peticion(metodo, endpoint, (time.perf_counter() - inicio) * 1000, error=type(e).__name__)
+        if metodo == 'GET' and usar_cache:
+            return api_client._servir_desde_cache(endpoint, params)
+        return None
+
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    bytes_enviados = len(cuerpo or b'')
+    bytes_recibidos = len(respuesta.contenido)
+    if respuesta.estado >= 400:
+        metricas.registrar_peticion(metodo, endpoint, duracion_ms, bytes_enviados, bytes_recibidos, error=respuesta.estado)
+        detalle = respuesta.contenido.decode('utf-8', 'replace') or "Detalle no disponible."
+        print(f"ERROR HTTP {respuesta.estado} en {metodo} {url}: {detalle}")
+        if respuesta.estado == 401:
+            borrar_sesion()
+        if metodo == 'GET' and usar_cache and respuesta.estado >= 500:
+            return api_client._servir_desde_cache(endpoint, params)
+        return None
+
+    if respuesta.contenido and respuesta.estado != 204:
+        t0 = time.perf_counter()
+        try:
+            json_data = json.loads(respuesta.contenido)
+        except ValueError as e:
+            print(f"ERROR DE FORMATO en {metodo} {url}: {e}")
+            metricas.registrar_peticion(metodo, endpoint, duracion_ms, bytes_enviados, bytes_recibidos, error=type(e).__name__)
+            return None
+        t1 = time.perf_counter()
+        datos = api_client._normalizar_datos_desde_api(json_data)
+        t2 = time.perf_counter()
+        metricas.registrar_peticion(metodo, endpoint, duracion_ms, bytes_enviados, bytes_recibidos,
+                                    parseo_ms=(t1 - t0) * 1000, normalizacion_ms=(t2 - t1) * 1000)
+        if metodo == 'GET':
+            api_client.GLOBAL_ESTADO_CONEXION["sin_conexion"] = False
+            if usar_cache and isinstance(datos, list):
+                api_client.CACHE_SNAPSHOTS.guardar(api_client._usuario_cache(), clave_endpoint(endpoint, params), datos)
+        return datos
+
+    metricas.registrar_peticion(metodo, endpoint, duracion_ms, bytes_enviados, bytes_recibidos)
+    return True
+
+
+# --------------------------------------------------------------------
+# SINCRONIZACIÓN INCREMENTAL (mismo gestor y dataset local que api_client)
+# --------------------------------------------------------------------
+
+def _en_streaming(endpoint, params, al_lote, tamano_lote = api_client.TAMANO_LOTE_STREAMING, al_columnas = None):
+    """
+    Misma firma y resultado que api_client._peticion_en_streaming, con la red en el bucle (httpx):
+    se llama desde un hilo auxiliar, que decodifica con api_client._leer_listado los trozos según
+    el bucle los recibe (streaming y formato compacto igual que la API síncrona).
+    """
+    url = f"{api_client.BASE_URL}/{endpoint}"
+    entidad = endpoint.split('/')[0]
+    bucle = _bucle()
+    metricas = api_client.METRICAS
+    contador = {"espera": 0.0}
+
+    def _en_bucle(awaitable):
+        return asyncio.run_coroutine_threadsafe(asyncio.wait_for(awaitable, TIEMPO_MAXIMO_S), bucle).result(TIEMPO_MAXIMO_S)
+
+    async def _abrir():
+        return await _transporte().abrir_listado(url, params)
+
+    inicio = time.perf_counter()
+    try:
+        respuesta = _en_bucle(_abrir())
+    except _ERRORES_TRANSPORTE as e:
+        print(f"ERROR DE CONEXIÓN en GET {url} (streaming): {e!r}")
+        metricas.registrar_peticion('GET', endpoint, (time.perf_counter() - inicio) * 1000, error=type(e).__name__)
+        return None
+
+    def _trozos(bytes_cuerpo):
+        while True:
+            espera = time.perf_counter()
+            trozo = _en_bucle(anext(bytes_cuerpo, None))
+            contador["espera"] += time.perf_counter() - espera
+            if trozo is None:
+                return
+            yield trozo
+
+    try:
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        if respuesta.status_code >= 400:
+            metricas.registrar_peticion('GET', endpoint, duracion_ms, error=respuesta.status_code)
+            print(f"ERROR HTTP {respuesta.status_code} en GET {url}: {respuesta.reason_phrase}")
+            if respuesta.status_code == 401:
+                borrar_sesion()
+            return None
+
+        t0 = time.perf_counter()
+        tipo = tipo_contenido(respuesta)
+        raiz, resto, normalizacion = api_client._leer_listado(
+            entidad, tipo, _trozos(respuesta.aiter_bytes(api_client.TAMANO_TROZO_STREAMING)),
+            al_lote, tamano_lote, al_columnas)
+        parseo_ms = (time.perf_counter() - t0 - contador["espera"] - normalizacion) * 1000
+        metricas.registrar_peticion('GET', endpoint, duracion_ms, bytes_recibidos=respuesta.num_bytes_downloaded,
+                                    parseo_ms=parseo_ms, normalizacion_ms=normalizacion * 1000)
+        metricas.registrar_cache('listado en formato compacto', es_formato_compacto(tipo))
+        return raiz, resto
+    except _ERRORES_TRANSPORTE + (ValueError,) as e:
+        print(f"ERROR DE CONEXIÓN en GET {url} (streaming): {e!r}")
+        metricas.registrar_peticion('GET', endpoint, (time.perf_counter() - inicio) * 1000, error=type(e).__name__)
+        return None
+    finally:
+        try:
+            _en_bucle(respuesta.aclose())
+        except _ERRORES_TRANSPORTE:
+            pass
+
+async def _params_con_alcance(entidad, params):
+    # En un hilo: el alcance de un comercial puede esperar a que se resuelva su ID tras el login.
+    return await asyncio.to_thread(api_client._params_con_alcance, entidad, params)
+
+async def _peticion_sincronizacion(endpoint, params):
+    # La misma descarga que api_client (streaming, formato compacto, columnas de facturas): la red va
+    # por el bucle y la decodificación en un hilo, así varias sincronizaciones se solapan sin bloquearlo.
+    return await asyncio.to_thread(api_client._peticion_sincronizacion, endpoint, params, None, _en_streaming)
+
+async def sincronizar_entidad(entidad, params = None):
+    # Equivalente de api_client.sincronizar_entidad: varias a la vez (reunir) comparten el bucle.
+    params = await _params_con_alcance(entidad, params)
+    if api_client.USAR_MOCK_DATA: return api_client._simular_obtener_entidad(entidad, params)
+    return await api_client.SINCRONIZADOR.sincronizar_asincrono(entidad, params, _peticion_sincronizacion)
+
+async def sincronizar_comerciales():
+    return await sincronizar_entidad('comerciales') or []
+
+async def sincronizar_clientes(comercial_id = None):
+    params = {'comercialId': comercial_id} if comercial_id is not None else None
+    return await sincronizar_entidad('clientes', params) or []
+
+async def sincronizar_facturas(cliente_id = None, comercial_id = None):
+    params = {}
+    if cliente_id is not None: params['clienteId'] = cliente_id
+    if comercial_id is not None: params['comercialId'] = comercial_id
+    return await sincronizar_entidad('facturas', params or None) or []
+
+
+# --------------------------------------------------------------------
+# COMERCIALES, CLIENTES, SECCIONES, PRODUCTOS Y FACTURAS
+# --------------------------------------------------------------------
+# Mismas firmas y resultados que sus equivalentes de api_client (modelos, True/None).
+
+async def obtener_comerciales():
+    if api_client.USAR_MOCK_DATA: return api_client.obtener_comerciales()
+    return a_modelos('comerciales', await _peticion('GET', 'comerciales')) or []
+
+async def obtener_comercial_por_id(id):
+    if api_client.USAR_MOCK_DATA: return api_client.obtener_comercial_por_id(id)
+    return a_modelos('comerciales', await _peticion('GET', f'comerciales/{id}'))
+
+async def crear_comercial(datos):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('POST', 'comerciales', data=datos)
+
+async def actualizar_comercial(id, datos):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('PUT', f'comerciales/{id}', data=datos)
+
+async def eliminar_comercial(id):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('DELETE', f'comerciales/{id}') is True
+
+async def obtener_clientes(comercial_id = None):
+    if api_client.USAR_MOCK_DATA: return api_client.obtener_clientes(comercial_id)
+    params = {'comercialId': comercial_id} if comercial_id is not None else None
+    params = await _params_con_alcance('clientes', params)
+    return a_modelos('clientes', await _peticion('GET', 'clientes', params=params)) or []
+
+async def obtener_cliente_por_id(id):
+    if api_client.USAR_MOCK_DATA: return api_client.obtener_cliente_por_id(id)
+    return a_modelos('clientes', await _peticion('GET', f'clientes/{id}'))
+
+async def crear_cliente(datos):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('POST', 'clientes', data=datos)
+
+async def actualizar_cliente(id, datos):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('PUT', f'clientes/{id}', data=datos)
+
+async def eliminar_cliente(id):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('DELETE', f'clientes/{id}') is True
+
+async def obtener_secciones():
+    if api_client.USAR_MOCK_DATA: return api_client.obtener_secciones()
+    return a_modelos('secciones', await _peticion('GET', 'secciones')) or []
+
+async def obtener_seccion_por_id(id):
+    if api_client.USAR_MOCK_DATA: return api_client.obtener_seccion_por_id(id)
+    return a_modelos('secciones', await _peticion('GET', f'secciones/{id}'))
+
+async def crear_seccion(datos):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('POST', 'secciones', data=datos)
+
+async def actualizar_seccion(id, datos):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('PUT', f'secciones/{id}', data=datos)
+
+async def eliminar_seccion(id):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('DELETE', f'secciones/{id}') is True
+
+async def obtener_productos(seccion_id = None):
+    if api_client.USAR_MOCK_DATA: return api_client.obtener_productos(seccion_id)
+    params = {'seccionId': seccion_id} if seccion_id is not None else None
+    return a_modelos('productos', await _peticion('GET', 'productos', params=params)) or []
+
+async def obtener_producto_por_id(id):
+    if api_client.USAR_MOCK_DATA: return api_client.obtener_producto_por_id(id)
+    return a_modelos('productos', await _peticion('GET', f'productos/{id}'))
+
+async def crear_producto(datos):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('POST', 'productos', data=datos)
+
+async def actualizar_producto(id, datos):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('PUT', f'productos/{id}', data=datos)
+
+async def eliminar_producto(id):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('DELETE', f'productos/{id}') is True
+
+async def obtener_facturas(cliente_id = None, comercial_id = None):
+    if api_client.USAR_MOCK_DATA: return api_client.obtener_facturas(cliente_id, comercial_id)
+    params = {}
+    if cliente_id is not None: params['clienteId'] = cliente_id
+    if comercial_id is not None: params['comercialId'] = comercial_id
+    params = await _params_con_alcance('facturas', params or None)
+    return a_modelos('facturas', await _peticion('GET', 'facturas', params=params)) or []
+
+async def obtener_factura_por_id(id):
+    if api_client.USAR_MOCK_DATA: return api_client.obtener_factura_por_id(id)
+    return a_modelos('facturas', await _peticion('GET', f'facturas/{id}'))
+
+async def crear_factura(datos):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('POST', 'facturas', data=datos)
+
+async def actualizar_factura(id, datos):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('PUT', f'facturas/{id}', data=datos)
+
+async def eliminar_factura(id):
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('DELETE', f'facturas/{id}') is True
+
+# --------------------------------------------------------------------
+# INFORMES Y ESTADÍSTICAS
+# --------------------------------------------------------------------
+
+async def arrancar_informe(tipo):
+    if api_client.USAR_MOCK_DATA: return True
+    if tipo not in ['clientes', 'facturas', 'completo']: return None
+    return await _peticion('GET', f'informes/{tipo}')
+
+async def obtener_estadisticas_api():
+    if api_client.USAR_MOCK_DATA: return api_client.obtener_estadisticas_api()
+    return await _peticion('GET', 'estadisticas')
+
+async def exportar_estadisticas(nombre_archivo = None):
+    if api_client.USAR_MOCK_DATA: return True
+    params = {'file': nombre_archivo} if nombre_archivo else None
+    return await _peticion('POST', 'estadisticas', params=params) is True
+
+async def resetear_estadisticas():
+    if api_client.USAR_MOCK_DATA: return True
+    return await _peticion('DELETE', 'estadisticas') is True
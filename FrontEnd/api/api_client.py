@@ -1,8 +1,25 @@
+import atexit
+import os
+import threading
+import time
+import weakref
 import requests
-from datetime import datetime
+from datetime import date
 from collections import defaultdict
 from typing import Any
 
+from api.cache_local import CacheSnapshots, clave_endpoint
+from api.sincronizacion import PARAM_TOKEN, TOKEN_INICIAL, GestorSincronizacion
+from api.modelos import a_modelos, a_modelos_desde_columnas
+from api.formato_compacto import ACCEPT_ENCODING, LectorBloques, cabecera_accept, es_formato_compacto, tipo_contenido
+from api.metricas import MetricasCliente
+from api.json_incremental import LectorArrayJson
+from api.vuelo_unico import VueloUnico
+from api.motor_informes import generar_informe
+from api.columnar import ColumnasFacturas, DatasetColumnar
+from api.ranking import RankingTopN, lideres_con_otros, orden_ranking
+from api.sesion_local import guardar_sesion, cargar_sesion, borrar_sesion
+
 # ====================================================================
 # --- 1. CONFIGURACIÓN E INTERRUPTOR GLOBAL DE DATOS ---
 # ====================================================================
@@ -11,11 +28,25 @@ from typing import Any
 USAR_MOCK_DATA = False
 
 # Base URL corregida (asume que tu servlet está en /crm-backend/api/login)
-BASE_URL = "http://localhost:8080/crm-backend/api"
+# Se puede sobreescribir con CRM_BASE_URL (p. ej. para apuntar a un servidor stub local)
+BASE_URL = os.environ.get("CRM_BASE_URL", "http://localhost:8080/crm-backend/api")
 
 # --- GESTIÓN DE SESIÓN Y AUTENTICACIÓN ---
 GLOBAL_SESSION = requests.Session()
-GLOBAL_USER_INFO = {"logueado": False, "rol": None, "nombre": None}
+# Compresiones que se pueden descomprimir aquí (gzip/deflate; br y zstd si están sus librerías)
+GLOBAL_SESSION.headers["Accept-Encoding"] = ACCEPT_ENCODING
+GLOBAL_USER_INFO = {"logueado": False, "rol": None, "nombre": None, "username": None, "comercial_id": None}
+
+# --- CACHÉ LOCAL Y MODO SIN CONEXIÓN ---
+# Última instantánea de cada colección en disco (por usuario y endpoint).
+CACHE_SNAPSHOTS = CacheSnapshots()
+# 'sin_conexion' se activa cuando un GET se sirve desde la caché porque el servlet no responde.
+GLOBAL_ESTADO_CONEXION = {"sin_conexion": False}
+
+# --- INSTRUMENTACIÓN (latencias, bytes, parseo, caché y errores) ---
+METRICAS = MetricasCliente()
+# GETs en curso, para agrupar los idénticos que llegan a la vez desde varios hilos
+PETICIONES_EN_VUELO = VueloUnico()
 
 # --- MOCK DATA GLOBAL (Se mantiene para la simulación de CRUD) ---
 MOCK_COMERCIALES = [
@@ -39,27 +70,39 @@ MOCK_SECCIONES = [ {"seccion_id": 1, "nombre": "Electrónica"}, {"seccion_id": 2
 MOCK_PRODUCTOS = [ {"producto_id": 101, "nombre": "Laptop X1", "precio_base": "1200.00", "plazas_disponibles": 50, "seccion_id": 1}, {"producto_id": 102, "nombre": "Aspiradora V2", "precio_base": "300.00", "plazas_disponibles": 150, "seccion_id": 2}, ]
 
 
-def _simular_obtener_entidad(entidad):
-    if entidad == 'clientes': return MOCK_CLIENTES
-    elif entidad == 'comerciales': return MOCK_COMERCIALES
-    elif entidad == 'secciones': return MOCK_SECCIONES
-    elif entidad == 'productos': return MOCK_PRODUCTOS
-    elif entidad == 'facturas': return MOCK_FACTURAS_ESTADISTICAS
-    return []
+# Filtros de la API (camelCase) -> campo del registro mock
+_FILTROS_MOCK = {'comercialId': 'comercial_id', 'clienteId': 'cliente_id', 'seccionId': 'seccion_id'}
+
+def _simular_obtener_entidad(entidad, params = None):
+    if entidad == 'clientes': datos = MOCK_CLIENTES
+    elif entidad == 'comerciales': datos = MOCK_COMERCIALES
+    elif entidad == 'secciones': datos = MOCK_SECCIONES
+    elif entidad == 'productos': datos = MOCK_PRODUCTOS
+    elif entidad == 'facturas': datos = MOCK_FACTURAS_ESTADISTICAS
+    else: return []
+    # Aplica los mismos filtros que el servidor (comercialId, clienteId, seccionId)
+    for filtro, valor in (params or {}).items():
+        campo = _FILTROS_MOCK.get(filtro)
+        if campo and valor is not None:
+            datos = [d for d in datos if str(d.get(campo)) == str(valor)]
+    return a_modelos(entidad, datos)
+
+def _usuario_cache():
+    # Las instantáneas se guardan por usuario para no mezclar carteras distintas.
+    return GLOBAL_USER_INFO.get("username") or "anonimo"
+
+# Claves camelCase (Java) -> snake_case (Python)
+_CLAVES_API = {
+    'clienteId': 'cliente_id', 'comercialId': 'comercial_id', 'productoId': 'producto_id',
+    'seccionId': 'seccion_id', 'facturaId': 'factura_id', 'passwordHash': 'password_hash',
+    'fechaEmision': 'fecha_emision', 'syncToken': 'sync_token',
+}
 
-def _limpiar_total_factura(total_str):
-    try: return float(str(total_str).replace('€', '').replace(',', ''))
-    except ValueError: return 0.0
-        
 def _normalizar_datos_desde_api(datos: Any) -> Any:
     # Función para convertir claves de camelCase (Java) a snake_case (Python)
     if isinstance(datos, dict):
         new_dict = {}
-        key_mapping = {
-            'clienteId': 'cliente_id', 'comercialId': 'comercial_id', 'productoId': 'producto_id',
-            'seccionId': 'seccion_id', 'facturaId': 'factura_id', 'passwordHash': 'password_hash',
-            'fechaEmision': 'fecha_emision',
-        }
+        key_mapping = _CLAVES_API
         
         for key, value in datos.items():
             new_key = key_mapping.get(key, key)
@@ -74,9 +117,7 @@ def _normalizar_datos_desde_api(datos: Any) -> Any:
 # --- 2. FUNCIÓN DE UTILIDAD CENTRAL (CONEXIÓN REAL) ---
 # ====================================================================
 
-def _manejar_peticion(metodo, endpoint, data = None, params = None):
-    url = f"{BASE_URL}/{endpoint}"
-    
+def _manejar_peticion(metodo, endpoint, data = None, params = None, usar_cache = True):
     #  Lógica de MOCK total para el CRUD 
     if USAR_MOCK_DATA and metodo != 'GET':
           # Simulación de éxito para todas las operaciones de escritura/borrado
@@ -85,8 +126,21 @@ def _manejar_peticion(metodo, endpoint, data = None, params = None):
           # Simulación de GETs
           entidad = endpoint.split('/')[0] # Extraer 'comerciales', 'clientes', etc.
           return _simular_obtener_entidad(entidad)
-    
+
+    if metodo != 'GET':
+        return _ejecutar_peticion(metodo, endpoint, data, params, usar_cache)
+
+    # GETs idénticos concurrentes (mismo endpoint y filtros) comparten una sola petición HTTP
+    clave = (clave_endpoint(endpoint, params), usar_cache)
+    datos, compartida = PETICIONES_EN_VUELO.ejecutar(
+        clave, lambda: _ejecutar_peticion(metodo, endpoint, data, params, usar_cache))
+    METRICAS.registrar_cache('GET compartido (en vuelo)', compartida)
+    return datos
+
+def _ejecutar_peticion(metodo, endpoint, data, params, usar_cache):
+    url = f"{BASE_URL}/{endpoint}"
     #  Lógica REAL
+    inicio = time.perf_counter()
     try:
         if metodo == 'GET':
             response = GLOBAL_SESSION.get(url, params=params)
@@ -101,22 +155,232 @@ def _manejar_peticion(metodo, endpoint, data = None, params = None):
         else:
             raise ValueError(f"Método HTTP no soportado: {metodo}")
             
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        bytes_enviados = len(response.request.body or b'')
+        bytes_recibidos = len(response.content)
+        if not response.ok:
+            METRICAS.registrar_peticion(metodo, endpoint, duracion_ms, bytes_enviados, bytes_recibidos, error=response.status_code)
         response.raise_for_status()
         
         if response.text and response.status_code != 204:
+            t0 = time.perf_counter()
             json_data = response.json()
-            return _normalizar_datos_desde_api(json_data)
+            t1 = time.perf_counter()
+            datos = _normalizar_datos_desde_api(json_data)
+            t2 = time.perf_counter()
+            METRICAS.registrar_peticion(metodo, endpoint, duracion_ms, bytes_enviados, bytes_recibidos,
+                                        parseo_ms=(t1 - t0) * 1000, normalizacion_ms=(t2 - t1) * 1000)
+            if metodo == 'GET':
+                GLOBAL_ESTADO_CONEXION["sin_conexion"] = False
+                # Solo las colecciones (listas) se guardan como instantánea
+                if usar_cache and isinstance(datos, list):
+                    CACHE_SNAPSHOTS.guardar(_usuario_cache(), clave_endpoint(endpoint, params), datos)
+            return datos
         
+        METRICAS.registrar_peticion(metodo, endpoint, duracion_ms, bytes_enviados, bytes_recibidos)
         return True
         
     except requests.exceptions.HTTPError as e:
         error_detail = e.response.text if e.response.text else "Detalle no disponible."
         print(f"ERROR HTTP {e.response.status_code} en {metodo} {url}: {error_detail}")
+        if e.response.status_code == 401:
+            # La sesión del servlet ha caducado: no la reutilizamos en el próximo arranque
+            borrar_sesion()
+        # Un 5xx suele indicar que el servlet está caído: servimos la caché si existe
+        if metodo == 'GET' and usar_cache and e.response.status_code >= 500:
+            return _servir_desde_cache(endpoint, params)
         return None
     except requests.exceptions.RequestException as e:
         print(f"ERROR DE CONEXIÓN en {metodo} {url}: {e}")
+        METRICAS.registrar_peticion(metodo, endpoint, (time.perf_counter() - inicio) * 1000, error=type(e).__name__)
+        if metodo == 'GET' and usar_cache:
+            return _servir_desde_cache(endpoint, params)
+        return None
+
+# --- STREAMING DE COLECCIONES GRANDES ---
+# Bytes leídos de la respuesta en cada trozo y registros por lote entregado
+TAMANO_TROZO_STREAMING = 64 * 1024
+TAMANO_LOTE_STREAMING = 5000
+
+def _leer_listado(entidad, tipo, trozos, al_lote, tamano_lote = TAMANO_LOTE_STREAMING, al_columnas = None):
+    """
+    Decodifica un listado según llegan sus trozos (bytes) y entrega los modelos a `al_lote` por lotes:
+    - formato columnar (JSON o MessagePack): bloque a bloque (LectorBloques); cada bloque de columnas
+      se convierte directamente en modelos y `al_columnas(columnas, filas)`, opcional, recibe además
+      las columnas (snake_case) para copias columnares;
+    - JSON de siempre: con LectorArrayJson en lotes de `tamano_lote`.
+    No se guarda el cuerpo completo ni el documento entero (la memoria pico depende del lote).
+    Devuelve (raiz, resto, segundos de conversión a modelos); lo usan también los GET de api.aio.
+    """
+    normalizacion = 0.0
+    if es_formato_compacto(tipo):
+        lector = LectorBloques(tipo, trozos)
+        for columnas, filas in lector:
+            t_bloque = time.perf_counter()
+            columnas = {_CLAVES_API.get(c, c): v for c, v in columnas.items()}
+            if al_columnas is not None:
+                al_columnas(columnas, filas)
+            modelos = a_modelos_desde_columnas(entidad, columnas, filas)
+            if modelos is None:
+                modelos = [dict(zip(columnas, fila)) for fila in zip(*columnas.values())]
+            del columnas
+            normalizacion += time.perf_counter() - t_bloque
+            al_lote(modelos)
+    else:
+        lector = LectorArrayJson(trozos)
+        lote = []
+        for registro in lector:
+            lote.append(registro)
+            if len(lote) >= tamano_lote:
+                t_lote = time.perf_counter()
+                lote = a_modelos(entidad, _normalizar_datos_desde_api(lote))
+                normalizacion += time.perf_counter() - t_lote
+                al_lote(lote)
+                lote = []
+        if lote:
+            t_lote = time.perf_counter()
+            lote = a_modelos(entidad, _normalizar_datos_desde_api(lote))
+            normalizacion += time.perf_counter() - t_lote
+            al_lote(lote)
+    return lector.raiz, _normalizar_datos_desde_api(lector.resto), normalizacion
+
+def _peticion_en_streaming(endpoint, params, al_lote, tamano_lote = TAMANO_LOTE_STREAMING, al_columnas = None):
+    """
+    GET de un listado con stream=True; `al_lote(modelos)` recibe los registros ya convertidos
+    en lotes (ver _leer_listado). Se negocia compresión y formato (ver api.formato_compacto).
+    Devuelve (raiz, resto) con raiz 'lista' u 'objeto' y `resto` las demás claves normalizadas
+    del objeto raíz (p. ej. deleted y sync_token de un delta), o None si la petición falla.
+    """
+    url = f"{BASE_URL}/{endpoint}"
+    entidad = endpoint.split('/')[0]
+    inicio = time.perf_counter()
+    contador = {"espera": 0.0}
+
+    def _trozos(respuesta):
+        # Mide el tiempo de red para separar la espera del parseo en las métricas
+        espera = time.perf_counter()
+        for trozo in respuesta.iter_content(TAMANO_TROZO_STREAMING):
+            contador["espera"] += time.perf_counter() - espera
+            yield trozo
+            espera = time.perf_counter()
+
+    try:
+        with GLOBAL_SESSION.get(url, params=params, stream=True, headers={"Accept": cabecera_accept()}) as response:
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+            if not response.ok:
+                METRICAS.registrar_peticion('GET', endpoint, duracion_ms, error=response.status_code)
+            response.raise_for_status()
+
+            t0 = time.perf_counter()
+            tipo = tipo_contenido(response)
+            raiz, resto, normalizacion = _leer_listado(entidad, tipo, _trozos(response), al_lote,
+                                                       tamano_lote, al_columnas)
+            # El parseo es el tiempo total menos la red, la conversión a modelos y lo que tarda al_lote;
+            # los bytes recibidos son los de la red (comprimidos si el servidor comprimió)
+            parseo_ms = (time.perf_counter() - t0 - contador["espera"] - normalizacion) * 1000
+            METRICAS.registrar_peticion('GET', endpoint, duracion_ms, bytes_recibidos=response.raw.tell(),
+                                        parseo_ms=parseo_ms, normalizacion_ms=normalizacion * 1000)
+            METRICAS.registrar_cache('listado en formato compacto', es_formato_compacto(tipo))
+            return raiz, resto
+    except requests.exceptions.HTTPError as e:
+        print(f"ERROR HTTP {e.response.status_code} en GET {url}: {e.response.reason}")
+        if e.response.status_code == 401:
+            borrar_sesion()
+        return None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"ERROR DE CONEXIÓN en GET {url} (streaming): {e}")
+        METRICAS.registrar_peticion('GET', endpoint, (time.perf_counter() - inicio) * 1000, error=type(e).__name__)
         return None
 
+def _servir_desde_cache(endpoint, params = None):
+    # Fallback de solo lectura: devuelve la última instantánea guardada (o None).
+    datos = obtener_snapshot(endpoint, params)
+    METRICAS.registrar_cache('snapshot (sin conexión)', datos is not None)
+    if datos is not None:
+        GLOBAL_ESTADO_CONEXION["sin_conexion"] = True
+        print(f"AVISO: Servidor no disponible. Sirviendo '{endpoint}' desde la caché local (solo lectura).")
+    return datos
+
+def obtener_snapshot(endpoint, params = None):
+    """
+    Devuelve la última instantánea local de una colección (lista) o None si no existe.
+    Permite pintar las tablas al instante antes de que responda la API.
+    """
+    if USAR_MOCK_DATA: return None
+    resultado = CACHE_SNAPSHOTS.leer(_usuario_cache(), clave_endpoint(endpoint, params))
+    return resultado[0] if resultado else None
+
+def esta_sin_conexion():
+    # True si los últimos datos se sirvieron desde la caché por falta de servidor.
+    return GLOBAL_ESTADO_CONEXION["sin_conexion"]
+
+# ====================================================================
+# --- 2b. SINCRONIZACIÓN INCREMENTAL (DELTA) ---
+# ====================================================================
+
+def _peticion_sincronizacion(endpoint, params, al_lote = None, en_streaming = None):
+    # GET en streaming sin la caché genérica: el gestor de sincronización guarda su propio dataset + token.
+    # Cada lote llega ya convertido a modelos, así nunca coexisten el JSON completo y los modelos.
+    # `al_lote(modelos)`, opcional, recibe además cada lote según llega (tablas que se van rellenando).
+    # En la descarga completa de facturas se guardan también sus columnas tipadas (para DatasetColumnar).
+    # `en_streaming` sustituye a _peticion_en_streaming (misma firma); api.aio pasa la suya sobre httpx.
+    registros = []
+    def _recibir(lote):
+        registros.extend(lote)
+        if al_lote is not None:
+            al_lote(lote)
+    completa = endpoint == 'facturas' and (params or {}).get(PARAM_TOKEN) == TOKEN_INICIAL
+    columnas = ColumnasFacturas() if completa else None
+    resultado = (en_streaming or _peticion_en_streaming)(endpoint, params, _recibir,
+                                                         al_columnas=columnas.anadir if columnas is not None else None)
+    GLOBAL_ESTADO_CONEXION["sin_conexion"] = resultado is None
+    if resultado is None:
+        return None
+    raiz, resto = resultado
+    if raiz == 'lista':
+        return registros
+    # Misma forma que la respuesta completa: {'items': [...], 'deleted': [...], 'sync_token': ...}
+    resto['items'] = registros
+    if columnas is not None and columnas.filas == len(registros):
+        resto['columnas'] = columnas
+    return resto
+
+SINCRONIZADOR = GestorSincronizacion(_peticion_sincronizacion, cache=CACHE_SNAPSHOTS, usuario=_usuario_cache,
+                                     convertir=a_modelos, metricas=METRICAS)
+
+def sincronizar_entidad(entidad, params = None, al_lote = None):
+    """
+    Recarga barata de una colección: pide solo los registros cambiados/borrados desde
+    el último token y los fusiona con el dataset local. Devuelve la lista completa.
+    En la primera descarga, `al_lote(modelos)` recibe los registros por lotes según llegan.
+    """
+    params = _params_con_alcance(entidad, params)
+    if USAR_MOCK_DATA: return _simular_obtener_entidad(entidad, params)
+    return SINCRONIZADOR.sincronizar(entidad, params, al_lote)
+
+def version_datos(entidad, params = None):
+    # Versión del dataset local: cambia solo cuando una sincronización trae cambios reales.
+    if USAR_MOCK_DATA: return 0
+    return SINCRONIZADOR.version(entidad, _params_con_alcance(entidad, params))
+
+def obtener_datos_locales(entidad, params = None):
+    # Dataset local (memoria o disco) sin tocar la red. None si nunca se ha cargado.
+    if USAR_MOCK_DATA: return None
+    datos = SINCRONIZADOR.datos_locales(entidad, _params_con_alcance(entidad, params))
+    METRICAS.registrar_cache('datos locales', datos is not None)
+    return datos
+
+def obtener_metricas():
+    """
+    Resumen de la instrumentación del cliente: por cada "MÉTODO endpoint" el histograma
+    de latencias (ms), parseo JSON y normalización, bytes enviados/recibidos y errores;
+    además de las tasas de acierto de cada caché.
+    """
+    return METRICAS.resumen()
+
+def reiniciar_metricas():
+    METRICAS.reiniciar()
+
 # ====================================================================
 # --- 3. AUTENTICACIÓN Y CRUD BASE ---
 # ====================================================================
@@ -145,44 +409,174 @@ def login_autenticacion(username, password):
             GLOBAL_USER_INFO["logueado"] = True
             GLOBAL_USER_INFO["rol"] = "admin"
             GLOBAL_USER_INFO["nombre"] = "Administrador"
+            GLOBAL_USER_INFO["username"] = username
             return {"username": username, "nombre": "Administrador", "rol": "admin"}
         return False
         
     # CONEXIÓN REAL AL SERVLET¡¡
+    inicio = time.perf_counter()
     try:
         # Usamos 'data' para enviar form-urlencoded, compatible con request.getParameter()
         response = GLOBAL_SESSION.post(url, data=datos_formulario)
+        METRICAS.registrar_peticion('POST', endpoint, (time.perf_counter() - inicio) * 1000,
+                                    len(response.request.body or b''), len(response.content),
+                                    error=None if response.status_code == 200 else response.status_code)
         
         if response.status_code == 200:
-            # Esperamos: ROL,NOMBRE (ej: admin,David López)
+            # Esperamos: ROL,NOMBRE (ej: admin,David López) y opcionalmente ROL,NOMBRE,COMERCIAL_ID
             respuesta_texto = response.text
             if ',' in respuesta_texto:
                 rol, nombre = respuesta_texto.split(',', 1)
+                comercial_id = None
+                if ',' in nombre and nombre.rsplit(',', 1)[1].strip().isdigit():
+                    nombre, id_texto = nombre.rsplit(',', 1)
+                    comercial_id = int(id_texto)
                 
                 GLOBAL_USER_INFO["logueado"] = True
                 GLOBAL_USER_INFO["rol"] = rol.lower()
                 GLOBAL_USER_INFO["nombre"] = nombre.strip()
+                GLOBAL_USER_INFO["username"] = username
+                if comercial_id is None and rol.lower() == 'comercial':
+                    # Servidor sin ID en la respuesta: se busca en la instantánea local (sin red)
+                    comercial_id = _buscar_comercial_id(username)
+                GLOBAL_USER_INFO["comercial_id"] = comercial_id
+                # La cookie de sesión queda en GLOBAL_SESSION; la guardamos para el próximo arranque
+                guardar_sesion(GLOBAL_SESSION.cookies, GLOBAL_USER_INFO)
+                _resolver_comercial_id_si_falta()
                 
                 return {"username": username, "nombre": nombre.strip(), "rol": rol.lower()}
         
         # Si falla es por 401 Unauthorized o 400 Bad Request
         return False
         
-    except requests.exceptions.RequestException:
+    except requests.exceptions.RequestException as e:
         # Falla de conexión
+        METRICAS.registrar_peticion('POST', endpoint, (time.perf_counter() - inicio) * 1000, error=type(e).__name__)
         return None
         
+def _buscar_comercial_id(username, comerciales = None):
+    # ID del comercial `username` en `comerciales` o, si no se pasan, en la instantánea local (sin red).
+    if comerciales is None:
+        comerciales = obtener_datos_locales('comerciales')
+    for comercial in comerciales or []:
+        if comercial.get('username') == username:
+            return comercial.get('comercial_id')
+    return None
+
+# Resolución en curso del ID del comercial logueado (se espera fuera del hilo de Tk, ver parametros_alcance)
+_COMERCIAL_ID_RESUELTO = threading.Event()
+_COMERCIAL_ID_RESUELTO.set()
+TIEMPO_RESOLVER_COMERCIAL_S = 30
+
+def _resolver_comercial_id_si_falta():
+    # Comercial sin ID tras el login: se busca en un hilo aparte en la colección sincronizada de comerciales
+    # (la misma que pinta el dashboard), así el login no espera a descargarla.
+    if GLOBAL_USER_INFO.get("rol") != 'comercial' or GLOBAL_USER_INFO.get("comercial_id") is not None:
+        return
+    username = GLOBAL_USER_INFO.get("username")
+
+    def _resolver():
+        try:
+            comercial_id = _buscar_comercial_id(username, sincronizar_entidad('comerciales'))
+            if comercial_id is not None and GLOBAL_USER_INFO.get("username") == username:
+                GLOBAL_USER_INFO["comercial_id"] = comercial_id
+                guardar_sesion(GLOBAL_SESSION.cookies, GLOBAL_USER_INFO)
+        finally:
+            _COMERCIAL_ID_RESUELTO.set()
+
+    _COMERCIAL_ID_RESUELTO.clear()
+    threading.Thread(target=_resolver, name="resolver-comercial", daemon=True).start()
+
+# --------------------------------------------------------------------
+# 3b. ALCANCE DE DATOS SEGÚN EL ROL
+# --------------------------------------------------------------------
+# Un usuario con rol 'comercial' solo carga su cartera (clientes y facturas con su comercialId).
+# Los administradores ven toda la empresa; cada colección se descarga solo cuando una vista la pide.
+
+ENTIDADES_CON_ALCANCE = ('clientes', 'facturas')
+
+def parametros_alcance():
+    # Filtro que aplica al usuario actual: {'comercialId': id} para comerciales, None para admins.
+    if GLOBAL_USER_INFO.get("rol") != 'comercial':
+        return None
+    comercial_id = GLOBAL_USER_INFO.get("comercial_id")
+    if comercial_id is None and threading.current_thread() is not threading.main_thread():
+        # Las descargas (fuera del hilo de Tk) esperan al ID que se está resolviendo tras el login
+        _COMERCIAL_ID_RESUELTO.wait(TIEMPO_RESOLVER_COMERCIAL_S)
+        comercial_id = GLOBAL_USER_INFO.get("comercial_id")
+    if comercial_id is None:
+        if _COMERCIAL_ID_RESUELTO.is_set():
+            print("AVISO: No se conoce el ID del comercial logueado; se cargan todos los datos.")
+        return None
+    return {'comercialId': comercial_id}
+
+def _params_con_alcance(entidad, params):
+    # Sin filtros explícitos, las colecciones de cartera se limitan al alcance del usuario.
+    if params is None and entidad in ENTIDADES_CON_ALCANCE:
+        return parametros_alcance()
+    return params
+
+# Espera máxima de la comprobación de la sesión guardada
+TIEMPO_VALIDAR_SESION_S = 5
+
+def validar_sesion_restaurada():
+    """
+    Comprueba con un GET barato y autenticado la sesión que devolvió restaurar_sesion(). Bloquea hasta
+    TIEMPO_VALIDAR_SESION_S: llamar fuera del hilo de Tk. False si el servlet la rechaza (caducada:
+    hay que volver al login), True si la acepta y None si no responde (se sigue sin conexión).
+    """
+    try:
+        response = GLOBAL_SESSION.get(f"{BASE_URL}/estadisticas", timeout=TIEMPO_VALIDAR_SESION_S)
+    except requests.exceptions.RequestException:
+        return None
+    if response.status_code in (401, 403):
+        print("AVISO: La sesión guardada ha caducado; hay que volver a iniciar sesión.")
+        return False
+    return True
+
+def restaurar_sesion():
+    """
+    Reutiliza la sesión guardada en el arranque anterior (cookies + datos del usuario) sin tocar la red,
+    para pintar el dashboard al instante. Devuelve los datos del usuario, o None si no hay sesión guardada.
+    La validez se comprueba después en segundo plano con validar_sesion_restaurada().
+    """
+    if USAR_MOCK_DATA: return None
+    sesion = cargar_sesion()
+    if sesion is None:
+        return None
+
+    usuario, cookies = sesion
+    for c in cookies:
+        GLOBAL_SESSION.cookies.set(c["name"], c["value"], domain=c["domain"], path=c["path"],
+                                   expires=c["expires"], secure=c["secure"])
+    GLOBAL_USER_INFO.update(usuario)
+    GLOBAL_USER_INFO["logueado"] = True
+    _resolver_comercial_id_si_falta()
+    return {"username": usuario.get("username"), "nombre": usuario.get("nombre"), "rol": usuario.get("rol"),
+            "comercial_id": usuario.get("comercial_id")}
+
+def cerrar_sesion():
+    # Olvida la sesión en memoria y en disco (botón "Cerrar Sesión").
+    GLOBAL_SESSION.cookies.clear()
+    borrar_sesion()
+    liberar_dataset_columnar()
+    aio.cerrar()
+    GLOBAL_USER_INFO.update({"logueado": False, "rol": None, "nombre": None, "username": None, "comercial_id": None})
+
 # -----------------------------------------------------------
 # 4. COMERCIALES (/api/comerciales) 
 # -----------------------------------------------------------
 
 def obtener_comerciales():
     if USAR_MOCK_DATA: return _simular_obtener_entidad("comerciales")
-    return _manejar_peticion('GET', 'comerciales') or []
+    return a_modelos('comerciales', _manejar_peticion('GET', 'comerciales')) or []
+
+def sincronizar_comerciales():
+    return sincronizar_entidad('comerciales') or []
 
 def obtener_comercial_por_id(id):
-    if USAR_MOCK_DATA: return next((c.copy() for c in MOCK_COMERCIALES if c['comercial_id'] == int(id)), None)
-    return _manejar_peticion('GET', f'comerciales/{id}')
+    if USAR_MOCK_DATA: return next((a_modelos('comerciales', c) for c in MOCK_COMERCIALES if c['comercial_id'] == int(id)), None)
+    return a_modelos('comerciales', _manejar_peticion('GET', f'comerciales/{id}'))
 
 def crear_comercial(datos):
     if USAR_MOCK_DATA: return True
@@ -201,15 +595,20 @@ def eliminar_comercial(id):
 # --------------------------------------------------------------------
 
 def obtener_clientes(comercial_id = None):
-    if USAR_MOCK_DATA and comercial_id is None: return _simular_obtener_entidad("clientes")
     params = {'comercialId': comercial_id} if comercial_id is not None else None
-    return _manejar_peticion('GET', 'clientes', params=params) or []
+    params = _params_con_alcance('clientes', params)
+    if USAR_MOCK_DATA: return _simular_obtener_entidad("clientes", params)
+    return a_modelos('clientes', _manejar_peticion('GET', 'clientes', params=params)) or []
+
+def sincronizar_clientes(comercial_id = None, al_lote = None):
+    params = {'comercialId': comercial_id} if comercial_id is not None else None
+    return sincronizar_entidad('clientes', params, al_lote) or []
 
 def obtener_cliente_por_id(id):
     if USAR_MOCK_DATA:
         id_buscado = int(id)
-        return next((c.copy() for c in MOCK_CLIENTES if c['cliente_id'] == id_buscado), None)
-    return _manejar_peticion('GET', f'clientes/{id}')
+        return next((a_modelos('clientes', c) for c in MOCK_CLIENTES if c['cliente_id'] == id_buscado), None)
+    return a_modelos('clientes', _manejar_peticion('GET', f'clientes/{id}'))
 
 def crear_cliente(datos):
     if USAR_MOCK_DATA: return True # Simulación de creación
@@ -229,11 +628,11 @@ def eliminar_cliente(id):
 
 def obtener_secciones():
     if USAR_MOCK_DATA: return _simular_obtener_entidad("secciones")
-    return _manejar_peticion('GET', 'secciones') or []
+    return a_modelos('secciones', _manejar_peticion('GET', 'secciones')) or []
 
 def obtener_seccion_por_id(id):
-    if USAR_MOCK_DATA: return next((s.copy() for s in MOCK_SECCIONES if s['seccion_id'] == int(id)), None)
-    return _manejar_peticion('GET', f'secciones/{id}')
+    if USAR_MOCK_DATA: return next((a_modelos('secciones', s) for s in MOCK_SECCIONES if s['seccion_id'] == int(id)), None)
+    return a_modelos('secciones', _manejar_peticion('GET', f'secciones/{id}'))
 
 def crear_seccion(datos):
     if USAR_MOCK_DATA: return True # Simulación de creación
@@ -254,11 +653,11 @@ def eliminar_seccion(id):
 def obtener_productos(seccion_id = None):
     if USAR_MOCK_DATA and seccion_id is None: return _simular_obtener_entidad("productos")
     params = {'seccionId': seccion_id} if seccion_id is not None else None
-    return _manejar_peticion('GET', 'productos', params=params) or []
+    return a_modelos('productos', _manejar_peticion('GET', 'productos', params=params)) or []
 
 def obtener_producto_por_id(id):
-    if USAR_MOCK_DATA: return next((p.copy() for p in MOCK_PRODUCTOS if p['producto_id'] == int(id)), None)
-    return _manejar_peticion('GET', f'productos/{id}')
+    if USAR_MOCK_DATA: return next((a_modelos('productos', p) for p in MOCK_PRODUCTOS if p['producto_id'] == int(id)), None)
+    return a_modelos('productos', _manejar_peticion('GET', f'productos/{id}'))
 
 def crear_producto(datos):
     if USAR_MOCK_DATA: return True # Simulación de creación
@@ -277,15 +676,22 @@ def eliminar_producto(id):
 # --------------------------------------------------------------------
 
 def obtener_facturas(cliente_id = None, comercial_id = None):
-    if USAR_MOCK_DATA and cliente_id is None and comercial_id is None: return _simular_obtener_entidad("facturas")
     params = {}
     if cliente_id is not None: params['clienteId'] = cliente_id
     if comercial_id is not None: params['comercialId'] = comercial_id
-    return _manejar_peticion('GET', 'facturas', params=params) or []
+    params = _params_con_alcance('facturas', params or None)
+    if USAR_MOCK_DATA: return _simular_obtener_entidad("facturas", params)
+    return a_modelos('facturas', _manejar_peticion('GET', 'facturas', params=params)) or []
+
+def sincronizar_facturas(cliente_id = None, comercial_id = None, al_lote = None):
+    params = {}
+    if cliente_id is not None: params['clienteId'] = cliente_id
+    if comercial_id is not None: params['comercialId'] = comercial_id
+    return sincronizar_entidad('facturas', params or None, al_lote) or []
 
 def obtener_factura_por_id(id):
-    if USAR_MOCK_DATA: return next((f.copy() for f in MOCK_FACTURAS_ESTADISTICAS if f['factura_id'] == str(id)), None)
-    return _manejar_peticion('GET', f'facturas/{id}')
+    if USAR_MOCK_DATA: return next((a_modelos('facturas', f) for f in MOCK_FACTURAS_ESTADISTICAS if f['factura_id'] == str(id)), None)
+    return a_modelos('facturas', _manejar_peticion('GET', f'facturas/{id}'))
 
 def crear_factura(datos):
     if USAR_MOCK_DATA: return True # Simulación de creación
@@ -309,6 +715,53 @@ def arrancar_informe(tipo):
     if tipo not in ['clientes', 'facturas', 'completo']: return None
     return _manejar_peticion('GET', f'informes/{tipo}')
 
+# Copia columnar en memoria compartida de facturas y clientes: se reconstruye solo cuando
+# la sincronización devuelve otro dataset (otra lista); mientras tanto todos los informes la reutilizan.
+_DATASET_COLUMNAR = {"facturas": None, "clientes": None, "dataset": None}
+_CANDADO_COLUMNAR = threading.Lock()
+
+def obtener_dataset_columnar(facturas = None, clientes = None, reservar = False):
+    """
+    DatasetColumnar (memoria compartida) de las facturas y clientes locales.
+    Los procesos de informes se adjuntan a él por nombre sin copiar los datos.
+    Con `reservar`, se devuelve ya reservado (ver DatasetColumnar.reservar): hay que llamar a soltar().
+    """
+    facturas = sincronizar_facturas() if facturas is None else facturas
+    clientes = sincronizar_clientes() if clientes is None else clientes
+    with _CANDADO_COLUMNAR:
+        if _DATASET_COLUMNAR["facturas"] is not facturas or _DATASET_COLUMNAR["clientes"] is not clientes:
+            anterior = _DATASET_COLUMNAR["dataset"]
+            # Columnas tipadas de la descarga, si las facturas no han cambiado desde entonces
+            columnas = SINCRONIZADOR.columnas('facturas', _params_con_alcance('facturas', None), facturas)
+            _DATASET_COLUMNAR.update(facturas=facturas, clientes=clientes,
+                                     dataset=DatasetColumnar(facturas, clientes, columnas))
+            if anterior is not None: anterior.cerrar()
+        if reservar: _DATASET_COLUMNAR["dataset"].reservar()
+        return _DATASET_COLUMNAR["dataset"]
+
+def liberar_dataset_columnar():
+    # Libera el bloque de memoria compartida (al cerrar sesión y al salir); si hay un informe
+    # en curso, se libera cuando termine.
+    with _CANDADO_COLUMNAR:
+        if _DATASET_COLUMNAR["dataset"] is not None:
+            _DATASET_COLUMNAR["dataset"].cerrar()
+        _DATASET_COLUMNAR.update(facturas=None, clientes=None, dataset=None)
+
+atexit.register(liberar_dataset_columnar)
+
+def generar_informe_local(al_progreso = None):
+    """
+    Informe completo calculado en local (multiproceso con muchos datos): ingresos por comercial y mes,
+    clientes por comercial, desglose por estado y top clientes. Bloquea: llamar fuera del hilo de Tk.
+    """
+    dataset = obtener_dataset_columnar(reservar=True)
+    try:
+        comerciales = sincronizar_comerciales()
+        return generar_informe(dataset, comerciales, al_progreso=al_progreso)
+    finally:
+        # Un cierre de sesión durante el informe no libera la memoria hasta aquí
+        dataset.soltar()
+
 def obtener_estadisticas_api():
     if USAR_MOCK_DATA: return {'peticionesTotales': 100, 'fallos': 5} # Simulación
     return _manejar_peticion('GET', 'estadisticas')
@@ -323,67 +776,137 @@ def resetear_estadisticas():
     return _manejar_peticion('DELETE', f'estadisticas') is True
 
 # --- Funciones de Dashboard ---
+# Todas aceptan los datos ya cargados (para agregar varias veces sin repetir peticiones);
+# si no se pasan, se sincronizan (delta) con la API.
 
-def obtener_facturas_para_estadisticas(): return obtener_facturas()
-def obtener_comerciales_para_estadisticas(): return obtener_comerciales()
+def obtener_facturas_para_estadisticas(): return sincronizar_facturas()
+def obtener_comerciales_para_estadisticas(): return sincronizar_comerciales()
 
-def get_invoice_counts():
-    facturas = obtener_facturas_para_estadisticas()
+def get_invoice_counts(facturas = None):
+    if facturas is None: facturas = obtener_facturas_para_estadisticas()
     counts = defaultdict(int)
-    for factura in facturas: counts[factura.get('estado', 'desconocido')] += 1
+    for factura in facturas: counts[factura.estado or 'desconocido'] += 1
     return {'pagada': counts.get('pagada', 0), 'pendiente': counts.get('pendiente', 0), 'cancelada': counts.get('cancelada', 0)}
 
-def get_ingresos_mensuales():
-    facturas = obtener_facturas_para_estadisticas()
+def get_ingresos_mensuales(facturas = None):
+    if facturas is None: facturas = obtener_facturas_para_estadisticas()
+    # total y fecha_emision ya vienen convertidos en el modelo Factura: solo agrupamos por (año, mes)
     ingresos_por_mes = defaultdict(float)
     for factura in facturas:
-        total = _limpiar_total_factura(str(factura.get('total', '0.00€')))
-        fecha_str = factura.get('fecha_emision')
-        if fecha_str and total > 0:
-            try:
-                # Usar split('T') para manejar el formato DE JAVA
-                fecha_dt = datetime.strptime(fecha_str.split('T')[0], "%Y-%m-%d")
-                mes = fecha_dt.strftime("%b %Y")
-                ingresos_por_mes[mes] += total
-            except: continue
-    periodos_ordenados = sorted(ingresos_por_mes.keys(), key=lambda x: datetime.strptime(x, "%b %Y"))
-    valores = [ingresos_por_mes[p] for p in periodos_ordenados]
+        fecha = factura.fecha_emision
+        if fecha is not None and factura.total > 0:
+            ingresos_por_mes[(fecha.year, fecha.month)] += factura.total
+    meses_ordenados = sorted(ingresos_por_mes)
+    periodos_ordenados = [date(anio, mes, 1).strftime("%b %Y") for anio, mes in meses_ordenados]
+    valores = [ingresos_por_mes[m] for m in meses_ordenados]
     return periodos_ordenados, valores
 
-def get_ranking_comerciales():
-    comerciales = obtener_comerciales_para_estadisticas()
-    facturas = obtener_facturas_para_estadisticas()
-    nombres_comerciales = {c['comercial_id']: c['nombre'] for c in comerciales if 'comercial_id' in c}
-    ingresos_por_id = defaultdict(float)
+# Ingresos por comercial de cada dataset de facturas sincronizado, mantenidos con los deltas de la
+# sincronización: el ranking del dashboard no vuelve a recorrer todas las facturas en cada refresco.
+_RANKINGS_INGRESOS = weakref.WeakKeyDictionary()  # ConjuntoSincronizado -> RankingTopN
+
+def _ingreso_factura(factura):
+    return factura.total if factura.comercial_id is not None and factura.total > 0 else 0.0
+
+def _al_cambiar_conjunto(entidad, params, conjunto, cambios):
+    if entidad != 'facturas':
+        return
+    ranking = _RANKINGS_INGRESOS.get(conjunto)
+    if ranking is None or cambios is None:
+        ranking = RankingTopN()
+        for factura in conjunto.registros.values():
+            if _ingreso_factura(factura): ranking.sumar(factura.comercial_id, _ingreso_factura(factura))
+        _RANKINGS_INGRESOS[conjunto] = ranking
+        return
+    for anterior, nuevo in cambios:
+        if anterior is not None and _ingreso_factura(anterior): ranking.sumar(anterior.comercial_id, -_ingreso_factura(anterior))
+        if nuevo is not None and _ingreso_factura(nuevo): ranking.sumar(nuevo.comercial_id, _ingreso_factura(nuevo))
+
+SINCRONIZADOR.observar(_al_cambiar_conjunto)
+
+def _ranking_ingresos(facturas, nombres_comerciales):
+    # El ranking incremental si `facturas` es la lista actual de un dataset sincronizado; si no, una pasada.
+    for conjunto, ranking in list(_RANKINGS_INGRESOS.items()):
+        if conjunto.es_lista_actual(facturas):
+            return ranking
+    ranking = RankingTopN()
     for factura in facturas:
-        comercial_id = factura.get('comercial_id')
-        total = _limpiar_total_factura(str(factura.get('total', '0.00€')))
-        if comercial_id in nombres_comerciales and total > 0:
-            ingresos_por_id[comercial_id] += total
-    ranking = []
-    for c in comerciales:
-        c_id = c.get('comercial_id')
-        total = ingresos_por_id.get(c_id, 0.0)
-        ranking.append({"nombre": c.get('nombre', "Desconocido"), "ingresos": total})
-    ranking.sort(key=lambda x: x['ingresos'], reverse=True)
+        comercial_id = factura.comercial_id
+        if comercial_id in nombres_comerciales and factura.total > 0:
+            ranking.sumar(comercial_id, factura.total)
     return ranking
 
+def get_ranking_comerciales(comerciales = None, facturas = None, top_n = None):
+    """
+    Ingresos por comercial de mayor a menor. Con `top_n`, solo los `top_n` primeros (selección con
+    montículo, sin ordenar a todos) y una última fila "Otros" con el resto ('otros': True).
+    Cada fila lleva el 'id' del comercial (None en "Otros").
+    """
+    if comerciales is None: comerciales = obtener_comerciales_para_estadisticas()
+    if facturas is None: facturas = obtener_facturas_para_estadisticas()
+    nombres_comerciales = {c.comercial_id: c.nombre for c in comerciales if c.comercial_id is not None}
+    ranking = _ranking_ingresos(facturas, nombres_comerciales)
+    if top_n is not None and top_n < len(comerciales):
+        return lideres_con_otros(ranking, nombres_comerciales, top_n, 'ingresos')
+    resultado = []
+    for c in comerciales:
+        total = ranking.totales.get(c.comercial_id, 0.0) if c.comercial_id in nombres_comerciales else 0.0
+        resultado.append({"id": c.comercial_id, "nombre": c.nombre or "Desconocido", "ingresos": total})
+    resultado.sort(key=_orden_filas('ingresos'))
+    return resultado
+
+def _orden_filas(clave_valor):
+    # Mismo orden que el ranking con `top_n` (mayor valor primero, a igual valor menor id); sin id, al final.
+    return lambda fila: (fila['id'] is None, orden_ranking(fila['id'] if fila['id'] is not None else 0, fila[clave_valor]))
+
 # FUNCIÓN: CLIENTES POR COMERCIAL PARA ESTADISTICASS
-def get_clientes_por_comercial():
-    comerciales = obtener_comerciales_para_estadisticas()
-    clientes = obtener_clientes()
+def get_clientes_por_comercial(comerciales = None, clientes = None, top_n = None):
+    # Número de clientes por comercial; con `top_n`, los primeros más una fila "Otros" (ver get_ranking_comerciales).
+    if comerciales is None: comerciales = obtener_comerciales_para_estadisticas()
+    if clientes is None: clientes = sincronizar_clientes()
 
-    clientes_count_por_id = defaultdict(int)
+    clientes_count_por_id = RankingTopN()
     for cliente in clientes:
-        comercial_id = cliente.get('comercial_id')
+        comercial_id = cliente.comercial_id
         if comercial_id:
-            clientes_count_por_id[comercial_id] += 1
+            clientes_count_por_id.sumar(comercial_id, 1)
+
+    if top_n is not None and top_n < len(comerciales):
+        nombres_comerciales = {c.comercial_id: c.nombre for c in comerciales if c.comercial_id is not None}
+        return lideres_con_otros(clientes_count_por_id, nombres_comerciales, top_n, 'clientes')
 
     ranking_clientes = []
     for c in comerciales:
-        c_id = c.get('comercial_id')
-        count = clientes_count_por_id.get(c_id, 0)
-        ranking_clientes.append({"nombre": c.get('nombre', "Desconocido"), "clientes": count})
+        count = clientes_count_por_id.totales.get(c.comercial_id, 0)
+        ranking_clientes.append({"id": c.comercial_id, "nombre": c.nombre or "Desconocido", "clientes": count})
     
-    ranking_clientes.sort(key=lambda x: x['clientes'], reverse=True)
-    return ranking_clientes
\ No newline at end of file
+    ranking_clientes.sort(key=_orden_filas('clientes'))
+    return ranking_clientes
+
+def indexar_por(filas, atributo, por_defecto = None):
+    # {valor de `atributo`: [filas con ese valor]} en una sola pasada (el orden de `filas` se conserva).
+    indice = defaultdict(list)
+    for fila in filas:
+        indice[getattr(fila, atributo) or por_defecto].append(fila)
+    return dict(indice)
+
+def get_indices_detalle(facturas = None, clientes = None):
+    """
+    Índices para el detalle (drill-down) del dashboard, calculados junto a los agregados:
+    comercial_id -> facturas, estado -> facturas y comercial_id -> clientes.
+    Abrir un detalle es entonces un acceso a diccionario, sin peticiones ni recorridos.
+    """
+    if facturas is None: facturas = obtener_facturas_para_estadisticas()
+    if clientes is None: clientes = sincronizar_clientes()
+    return {
+        'facturas_por_comercial': indexar_por(facturas, 'comercial_id'),
+        'facturas_por_estado': indexar_por(facturas, 'estado', 'desconocido'),
+        'clientes_por_comercial': indexar_por(clientes, 'comercial_id'),
+    }
+
+# ====================================================================
+# --- API ASÍNCRONA ---
+# ====================================================================
+# Las mismas operaciones como corutinas (api_client.aio.obtener_clientes(), ...), sobre un bucle
+# asyncio en un hilo auxiliar. Se importa al final: api.aio usa las funciones de este módulo.
+from api import aio  # noqa: E402
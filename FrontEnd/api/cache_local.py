@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from api.modelos import serializar
+
+# ====================================================================
+# --- CACHÉ LOCAL DE INSTANTÁNEAS (SQLite) ---
+# ====================================================================
+# Guarda la última respuesta correcta de cada colección (clientes, facturas...)
+# por usuario y endpoint, para pintar las tablas al arrancar sin esperar a la API
+# y para seguir mostrando datos (solo lectura) cuando el servlet está caído.
+# Cada registro es una fila (clave primaria -> JSON): un delta de sincronización
+# solo escribe los registros cambiados y borra los eliminados, nunca la colección entera.
+
+RUTA_CACHE = os.environ.get("CRM_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".crm_xtart"))
+ARCHIVO_SNAPSHOTS = "snapshots.sqlite3"
+
+# Si cambia el esquema se descarta la caché entera (son datos reconstruibles).
+VERSION_ESQUEMA = 3
+
+
+def clave_endpoint(endpoint, params=None):
+    # Clave estable para un endpoint con sus filtros (ej: "clientes?comercialId=2").
+    if not params:
+        return endpoint
+    filtros = "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] is not None)
+    return f"{endpoint}?{filtros}" if filtros else endpoint
+
+
+class CacheSnapshots:
+    """
+    Almacén persistente de la última instantánea de cada colección.
+    Es seguro usarlo desde varios hilos (la carga de datos corre en segundo plano).
+    """
+    def __init__(self, ruta_directorio=None):
+        self.ruta_directorio = ruta_directorio or RUTA_CACHE
+        self._lock = threading.Lock()
+        self._conexion = None
+
+    def _conectar(self):
+        # Abre la base de datos bajo demanda y recrea la tabla si el esquema es antiguo.
+        if self._conexion is not None:
+            return self._conexion
+
+        os.makedirs(self.ruta_directorio, exist_ok=True)
+        ruta = os.path.join(self.ruta_directorio, ARCHIVO_SNAPSHOTS)
+        conexion = sqlite3.connect(ruta, check_same_thread=False)
+
+        version = conexion.execute("PRAGMA user_version").fetchone()[0]
+        if version != VERSION_ESQUEMA:
+            conexion.execute("DROP TABLE IF EXISTS snapshots")
+            conexion.execute("DROP TABLE IF EXISTS registros")
+            conexion.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " usuario TEXT NOT NULL,"
+            " endpoint TEXT NOT NULL,"
+            " guardado_en REAL NOT NULL,"
+            " token_sync TEXT,"
+            " PRIMARY KEY (usuario, endpoint))"
+        )
+        # Sin WITHOUT ROWID: el rowid conserva el orden de llegada y un upsert no lo cambia
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS registros ("
+            " usuario TEXT NOT NULL,"
+            " endpoint TEXT NOT NULL,"
+            " clave TEXT NOT NULL,"
+            " datos TEXT NOT NULL,"
+            " PRIMARY KEY (usuario, endpoint, clave))"
+        )
+        conexion.commit()
+        self._conexion = conexion
+        return conexion
+
+    @staticmethod
+    def _filas(usuario, endpoint, datos, clave):
+        # (usuario, endpoint, clave, json) por registro; sin `clave` se usa la posición en la lista.
+        for posicion, registro in enumerate(datos):
+            valor = clave(registro) if clave else None
+            yield (usuario, endpoint, str(posicion) if valor is None else valor,
+                   json.dumps(registro, ensure_ascii=False, default=serializar))
+
+    @staticmethod
+    def _marcar(conexion, usuario, endpoint, token_sync):
+        conexion.execute(
+            "INSERT INTO snapshots (usuario, endpoint, guardado_en, token_sync) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (usuario, endpoint) DO UPDATE SET guardado_en = excluded.guardado_en, token_sync = excluded.token_sync",
+            (usuario, endpoint, time.time(), token_sync),
+        )
+
+    def guardar(self, usuario, endpoint, datos, token_sync=None, clave=None):
+        """
+        Sustituye la instantánea completa de (usuario, endpoint) y su token de sincronización.
+        `clave(registro)` da la clave primaria de cada registro (para poder aplicarle deltas después).
+        """
+        try:
+            filas = list(self._filas(usuario, endpoint, datos, clave))
+            with self._lock:
+                conexion = self._conectar()
+                with conexion:
+                    conexion.execute("DELETE FROM registros WHERE usuario = ? AND endpoint = ?", (usuario, endpoint))
+                    conexion.executemany(
+                        "INSERT OR REPLACE INTO registros (usuario, endpoint, clave, datos) VALUES (?, ?, ?, ?)", filas)
+                    self._marcar(conexion, usuario, endpoint, token_sync)
+            return True
+        except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+            print(f"AVISO: No se pudo guardar la instantánea local de '{endpoint}': {e}")
+            return False
+
+    def aplicar_delta(self, usuario, endpoint, cambiados, eliminados, token_sync, clave):
+        # Escribe solo los registros cambiados (upsert) y borra los eliminados, en una transacción.
+        try:
+            filas = list(self._filas(usuario, endpoint, cambiados, clave))
+            with self._lock:
+                conexion = self._conectar()
+                with conexion:
+                    conexion.executemany(
+                        "INSERT INTO registros (usuario, endpoint, clave, datos) VALUES (?, ?, ?, ?)"
+                        " ON CONFLICT (usuario, endpoint, clave) DO UPDATE SET datos = excluded.datos", filas)
+                    conexion.executemany(
+                        "DELETE FROM registros WHERE usuario = ? AND endpoint = ? AND clave = ?",
+                        [(usuario, endpoint, str(id_eliminado)) for id_eliminado in eliminados])
+                    self._marcar(conexion, usuario, endpoint, token_sync)
+            return True
+        except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+            print(f"AVISO: No se pudo actualizar la instantánea local de '{endpoint}': {e}")
+            return False
+
+    def guardar_token(self, usuario, endpoint, token_sync):
+        # Solo ha cambiado el token (delta vacío): no se toca ningún registro.
+        try:
+            with self._lock:
+                conexion = self._conectar()
+                with conexion:
+                    self._marcar(conexion, usuario, endpoint, token_sync)
+            return True
+        except (sqlite3.Error, OSError) as e:
+            print(f"AVISO: No se pudo guardar el token local de '{endpoint}': {e}")
+            return False
+
+    def leer(self, usuario, endpoint):
+        # Devuelve (datos, guardado_en, token_sync) o None si no hay instantánea.
+        try:
+            with self._lock:
+                conexion = self._conectar()
+                meta = conexion.execute(
+                    "SELECT guardado_en, token_sync FROM snapshots WHERE usuario = ? AND endpoint = ?",
+                    (usuario, endpoint),
+                ).fetchone()
+                if meta is None:
+                    return None
+                filas = conexion.execute(
+                    "SELECT datos FROM registros WHERE usuario = ? AND endpoint = ? ORDER BY rowid",
+                    (usuario, endpoint),
+                ).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            print(f"AVISO: No se pudo leer la instantánea local de '{endpoint}': {e}")
+            return None
+
+        try:
+            return [json.loads(fila[0]) for fila in filas], meta[0], meta[1]
+        except ValueError:
+            return None
+
+    def borrar_usuario(self, usuario):
+        # Elimina todas las instantáneas de un usuario.
+        try:
+            with self._lock:
+                conexion = self._conectar()
+                conexion.execute("DELETE FROM snapshots WHERE usuario = ?", (usuario,))
+                conexion.execute("DELETE FROM registros WHERE usuario = ?", (usuario,))
+                conexion.commit()
+        except (sqlite3.Error, OSError) as e:
+            print(f"AVISO: No se pudo limpiar la caché local: {e}")
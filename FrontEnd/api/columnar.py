@@ -0,0 +1,225 @@
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from api.modelos import convertir_fecha, limpiar_total
+
+# ====================================================================
+# --- DATASET COLUMNAR EN MEMORIA COMPARTIDA ---
+# ====================================================================
+# Las facturas y clientes se copian una vez (por versión del dataset) a columnas NumPy
+# sobre un único bloque de multiprocessing.shared_memory. Los procesos de informes se
+# adjuntan al bloque por su nombre y leen las mismas columnas sin copiarlas ni serializarlas.
+# Los textos (estados, nombres) y los IDs reales quedan en tablas pequeñas del proceso principal;
+# las columnas guardan códigos enteros densos (índices en esas tablas).
+# Si las facturas llegaron en formato compacto, sus columnas tipadas (ColumnasFacturas) se
+# acumulan bloque a bloque durante la descarga y la copia se hace sin recorrer los modelos.
+
+ALINEACION = 8
+
+ESQUEMA_FACTURAS = (
+    ('comercial', np.int32),   # código en ids_comerciales (0 = sin comercial)
+    ('cliente', np.int32),     # código en ids_clientes (0 = sin cliente)
+    ('mes', np.int32),         # año * 12 + mes - 1, -1 sin fecha
+    ('estado', np.int16),      # código en la tabla de estados
+    ('total', np.float64),
+)
+ESQUEMA_CLIENTES = (
+    ('cliente', np.int32),
+    ('comercial', np.int32),
+)
+
+
+class TablaCompartida:
+    """
+    Columnas NumPy sobre un único bloque de memoria compartida.
+    `descriptor()` es lo único que viaja a otro proceso (nombre del bloque, filas y desplazamientos);
+    allí `adjuntar(descriptor)` crea las mismas vistas sin copiar datos.
+    """
+    def __init__(self, memoria, filas, disposicion, propietaria):
+        self.memoria = memoria
+        self.filas = filas
+        self.disposicion = disposicion
+        self.propietaria = propietaria
+        self.columnas = {
+            nombre: np.ndarray((filas,), dtype=np.dtype(tipo), buffer=memoria.buf, offset=desplazamiento)
+            for nombre, tipo, desplazamiento in disposicion
+        }
+
+    @classmethod
+    def crear(cls, filas, esquema):
+        disposicion, tamano = [], 0
+        for nombre, tipo in esquema:
+            tipo = np.dtype(tipo)
+            disposicion.append((nombre, tipo.str, tamano))
+            tamano += -(-filas * tipo.itemsize // ALINEACION) * ALINEACION
+        memoria = shared_memory.SharedMemory(create=True, size=max(tamano, ALINEACION))
+        return cls(memoria, filas, disposicion, propietaria=True)
+
+    @classmethod
+    def adjuntar(cls, descriptor):
+        nombre_memoria, filas, disposicion = descriptor
+        return cls(shared_memory.SharedMemory(name=nombre_memoria), filas, disposicion, propietaria=False)
+
+    def descriptor(self):
+        return (self.memoria.name, self.filas, self.disposicion)
+
+    def __getitem__(self, columna):
+        return self.columnas[columna]
+
+    def cerrar(self):
+        # Las vistas deben soltarse antes de cerrar el bloque; solo la propietaria lo elimina.
+        self.columnas = {}
+        self.memoria.close()
+        if self.propietaria:
+            self.memoria.unlink()
+
+
+class _Codificador:
+    # Asigna códigos densos a valores (IDs, textos); la lista `valores` es la tabla de traducción.
+    def __init__(self, iniciales=()):
+        self.valores = list(iniciales)
+        self.codigos = {v: i for i, v in enumerate(self.valores)}
+
+    def __call__(self, valor):
+        codigo = self.codigos.get(valor)
+        if codigo is None:
+            codigo = self.codigos[valor] = len(self.valores)
+            self.valores.append(valor)
+        return codigo
+
+
+def _codificar(codificador, ids):
+    # Array de IDs (float, NaN = sin valor) -> códigos, llamando al codificador una vez por valor distinto.
+    unicos, inversa = np.unique(ids, return_inverse=True)
+    tabla = np.array([codificador(None if np.isnan(u) else int(u)) for u in unicos], dtype=np.int32)
+    return tabla[inversa] if len(tabla) else np.zeros(0, dtype=np.int32)
+
+
+class ColumnasFacturas:
+    """
+    Columnas tipadas de las facturas recibidas en bloques del formato compacto: IDs de comercial
+    y cliente (float, NaN = sin valor), mes (año * 12 + mes - 1), código de estado y total.
+    `anadir` convierte cada bloque con NumPy al llegar; los bloques originales no se guardan.
+    """
+    def __init__(self):
+        self.estados = _Codificador()
+        self.filas = 0
+        self._bloques = []
+
+    def anadir(self, columnas, filas):
+        # `columnas`: {campo snake_case: lista de valores} de un bloque de `filas` facturas.
+        vacia = [None] * filas
+        try:
+            comercial = np.array(columnas.get('comercial_id') or vacia, dtype=np.float64)
+            cliente = np.array(columnas.get('cliente_id') or vacia, dtype=np.float64)
+            total = np.nan_to_num(np.array(columnas.get('total') or vacia, dtype=np.float64))
+        except (TypeError, ValueError):
+            # Importes como texto ("1500.00€") o IDs no numéricos: conversión valor a valor
+            comercial = np.array([v if isinstance(v, (int, float)) else np.nan for v in columnas.get('comercial_id') or vacia])
+            cliente = np.array([v if isinstance(v, (int, float)) else np.nan for v in columnas.get('cliente_id') or vacia])
+            total = np.array([limpiar_total(v) if v is not None else 0.0 for v in columnas.get('total') or vacia])
+        fechas = columnas.get('fecha_emision') or vacia
+        try:
+            # "YYYY-MM-DD..." -> "YYYY-MM" -> meses desde 1970
+            meses_1970 = np.array(['NaT' if f is None else f for f in fechas], dtype='U7').astype('datetime64[M]')
+            mes = np.where(np.isnat(meses_1970), -1, meses_1970.astype(np.int64) + 1970 * 12)
+        except (TypeError, ValueError):
+            mes = np.array([-1 if f is None else f.year * 12 + f.month - 1
+                            for f in map(convertir_fecha, fechas)], dtype=np.int64)
+        estados = np.array([e or 'desconocido' for e in columnas.get('estado') or vacia], dtype=object)
+        unicos, inversa = np.unique(estados, return_inverse=True)
+        estado = np.array([self.estados(e) for e in unicos], dtype=np.int16)[inversa] if filas else np.zeros(0, np.int16)
+        self._bloques.append((comercial, cliente, mes.astype(np.int32), estado, total))
+        self.filas += filas
+
+    def columnas(self):
+        # (comercial, cliente, mes, estado, total) de todas las filas recibidas.
+        if not self._bloques:
+            return tuple(np.zeros(0) for _ in range(5))
+        return tuple(np.concatenate(partes) for partes in zip(*self._bloques))
+
+
+class DatasetColumnar:
+    """
+    Copia columnar (compartida) de facturas y clientes con sus tablas de IDs y textos.
+    El proceso principal mantiene una sola copia; los procesos del pool se adjuntan con `descriptores()`.
+    Quien la use fuera del candado que la protege (un informe en su hilo) la reserva con `reservar()`
+    y la suelta con `soltar()`: un `cerrar()` mientras tanto se aplaza hasta que la suelte el último.
+    """
+    def __init__(self, facturas, clientes, columnas_facturas=None):
+        # `columnas_facturas` (ColumnasFacturas, opcional) son las mismas facturas ya en columnas.
+        self._candado = threading.Lock()
+        self._reservas = 0
+        self._cierre_pendiente = False
+        comerciales = _Codificador([None])
+        clientes_cod = _Codificador([None])
+
+        self.facturas = TablaCompartida.crear(len(facturas), ESQUEMA_FACTURAS)
+        columnas = self.facturas.columnas
+        if columnas_facturas is not None and columnas_facturas.filas == len(facturas):
+            comercial, cliente, mes, estado, total = columnas_facturas.columnas()
+            columnas['comercial'][:] = _codificar(comerciales, comercial)
+            columnas['cliente'][:] = _codificar(clientes_cod, cliente)
+            columnas['mes'][:] = mes
+            columnas['estado'][:] = estado
+            columnas['total'][:] = total
+            estados = columnas_facturas.estados
+        else:
+            estados = _Codificador()
+            cod_comercial, cod_cliente, cod_estado = [], [], []
+            meses, totales = [], []
+            for f in facturas:
+                fecha = f.fecha_emision
+                cod_comercial.append(comerciales(f.comercial_id))
+                cod_cliente.append(clientes_cod(f.cliente_id))
+                meses.append(fecha.year * 12 + fecha.month - 1 if fecha is not None else -1)
+                cod_estado.append(estados(f.estado or 'desconocido'))
+                totales.append(f.total or 0.0)
+            columnas['comercial'][:] = cod_comercial
+            columnas['cliente'][:] = cod_cliente
+            columnas['mes'][:] = meses
+            columnas['estado'][:] = cod_estado
+            columnas['total'][:] = totales
+
+        self.clientes = TablaCompartida.crear(len(clientes), ESQUEMA_CLIENTES)
+        self.clientes['cliente'][:] = [clientes_cod(c.cliente_id) for c in clientes]
+        self.clientes['comercial'][:] = [comerciales(c.comercial_id) for c in clientes]
+
+        # Tablas de traducción (código -> valor) y nombres de clientes por código
+        self.ids_comerciales = comerciales.valores
+        self.ids_clientes = clientes_cod.valores
+        self.estados = list(estados.valores)
+        nombres = {c.cliente_id: f"{c.nombre or ''} {c.apellidos or ''}".strip() for c in clientes}
+        self.nombres_clientes = [nombres.get(cliente_id) for cliente_id in self.ids_clientes]
+
+    @property
+    def num_facturas(self):
+        return self.facturas.filas
+
+    def descriptores(self):
+        return self.facturas.descriptor(), self.clientes.descriptor()
+
+    def reservar(self):
+        with self._candado:
+            self._reservas += 1
+
+    def soltar(self):
+        with self._candado:
+            self._reservas -= 1
+            cerrar = self._reservas == 0 and self._cierre_pendiente
+        if cerrar:
+            self._cerrar()
+
+    def cerrar(self):
+        # Libera la memoria compartida ya, o al soltar la última reserva si aún se está usando.
+        with self._candado:
+            if self._reservas:
+                self._cierre_pendiente = True
+                return
+        self._cerrar()
+
+    def _cerrar(self):
+        self.facturas.cerrar()
+        self.clientes.cerrar()
@@ -0,0 +1,98 @@
+from urllib3.util import make_headers
+
+from api.json_incremental import LectorArrayJson
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# ====================================================================
+# --- NEGOCIACIÓN DE COMPRESIÓN Y FORMATO COMPACTO DE LISTADOS ---
+# ====================================================================
+# Compresión: se anuncian las codificaciones que urllib3 sabe descomprimir aquí
+# (gzip y deflate siempre; br con `brotli` y zstd con `zstandard` si están instalados).
+#
+# Formato compacto: en los listados el cliente acepta, por orden de preferencia,
+#   application/vnd.crm.columnas+msgpack   (solo si está instalado `msgpack`)
+#   application/vnd.crm.columnas+json
+#   application/json                       (respaldo: el servidor real actual)
+# Un listado compacto va en bloques de filas para poder decodificarlo según llega:
+# una cabecera {"columnas": ["facturaId", ...], ...} y después cada bloque como una lista de
+# valores por columna (importes como números). En un delta la cabecera lleva además "deleted"
+# y "syncToken"; un listado simple solo lleva "columnas".
+#   +json:    {"columnas": [...], "deleted": [...], "syncToken": "...", "bloques": [[[...], ...], ...]}
+#   +msgpack: la cabecera y cada bloque son objetos MessagePack consecutivos en el cuerpo.
+# El servidor elige: si responde application/json se usa el camino JSON de siempre.
+
+TIPO_COLUMNAS_JSON = "application/vnd.crm.columnas+json"
+TIPO_COLUMNAS_MSGPACK = "application/vnd.crm.columnas+msgpack"
+
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+
+
+def cabecera_accept():
+    # Cabecera Accept de los listados según las librerías disponibles.
+    tipos = [f"{TIPO_COLUMNAS_JSON};q=0.9", "application/json;q=0.5"]
+    if msgpack is not None:
+        tipos.insert(0, TIPO_COLUMNAS_MSGPACK)
+    return ", ".join(tipos)
+
+
+def tipo_contenido(respuesta):
+    # "application/json; charset=utf-8" -> "application/json"
+    return respuesta.headers.get("Content-Type", "").split(";")[0].strip().lower()
+
+
+def es_formato_compacto(tipo):
+    return tipo in (TIPO_COLUMNAS_JSON, TIPO_COLUMNAS_MSGPACK)
+
+
+def _objetos_msgpack(trozos):
+    # Objetos MessagePack completos según llegan los trozos del cuerpo.
+    desempaquetador = msgpack.Unpacker(raw=False)
+    for trozo in trozos:
+        desempaquetador.feed(trozo)
+        yield from desempaquetador
+
+
+class LectorBloques:
+    """
+    Iterador sobre los bloques de un listado compacto recibido por trozos (bytes): entrega
+    ({columna: lista de valores}, filas) por bloque, sin guardar el cuerpo ni el documento entero.
+    Al terminar, `raiz` es 'lista' u 'objeto' (delta) y `resto` las demás claves de la cabecera.
+    """
+    def __init__(self, tipo, trozos):
+        if tipo == TIPO_COLUMNAS_MSGPACK and msgpack is None:
+            raise ValueError("Respuesta MessagePack sin la librería msgpack instalada")
+        self.tipo = tipo
+        self.raiz = None
+        self.resto = {}
+        self._trozos = trozos
+
+    def __iter__(self):
+        if self.tipo == TIPO_COLUMNAS_MSGPACK:
+            objetos = _objetos_msgpack(self._trozos)
+            cabecera = next(objetos, None)
+            if not isinstance(cabecera, dict) or "columnas" not in cabecera:
+                raise ValueError("Listado compacto sin cabecera de columnas")
+            for bloque in objetos:
+                yield self._bloque(cabecera["columnas"], bloque)
+        else:
+            lector = LectorArrayJson(self._trozos, clave_lista="bloques")
+            cabecera = lector.resto
+            for bloque in lector:
+                # La cabecera (columnas) va antes que los bloques en el documento
+                if "columnas" not in cabecera:
+                    raise ValueError("Listado compacto sin cabecera de columnas")
+                yield self._bloque(cabecera["columnas"], bloque)
+            if lector.raiz != "objeto":
+                raise ValueError("Documento compacto no reconocido")
+        self.resto = {clave: valor for clave, valor in cabecera.items() if clave != "columnas"}
+        self.raiz = "objeto" if self.resto else "lista"
+
+    @staticmethod
+    def _bloque(columnas, valores):
+        if len(valores) != len(columnas):
+            raise ValueError("Bloque compacto con un número de columnas distinto de la cabecera")
+        return dict(zip(columnas, valores)), len(valores[0]) if valores else 0
@@ -0,0 +1,139 @@
+import codecs
+import json
+import re
+
+# ====================================================================
+# --- LECTOR INCREMENTAL DE LISTAS JSON ---
+# ====================================================================
+# Recorre una respuesta JSON según llegan sus trozos (bytes) y entrega uno a uno los elementos
+# de la lista principal: la raíz si es un array, o la clave `clave_lista` si la raíz es un objeto
+# ({"items": [...], "deleted": [...], "syncToken": "..."}). Cada elemento se decodifica con el
+# escáner de json (C); en memoria solo quedan el texto pendiente y el elemento en curso.
+
+_ESPACIOS = re.compile(r'[ \t\n\r]*')
+_DECODIFICADOR = json.JSONDecoder()
+_DELIMITADORES = frozenset(' \t\n\r,]}:')
+# Texto ya consumido a partir del cual se recorta el búfer
+_MAXIMO_CONSUMIDO = 1 << 16
+
+
+class LectorArrayJson:
+    """
+    Iterador sobre los elementos de la lista de un documento JSON recibido por trozos.
+    Al terminar, `raiz` indica si la raíz era una 'lista' o un 'objeto' y `resto` contiene
+    las demás claves del objeto raíz (vacío si la raíz era una lista).
+    """
+    def __init__(self, trozos, clave_lista='items'):
+        self.clave_lista = clave_lista
+        self.raiz = None
+        self.resto = {}
+        self._trozos = iter(trozos)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._pos = 0
+        self._fin = False
+
+    def _leer(self):
+        # Añade el siguiente trozo al búfer; False si ya no quedan.
+        if self._fin:
+            return False
+        for trozo in self._trozos:
+            texto = self._utf8.decode(trozo)
+            if texto:
+                self._anadir(texto)
+                return True
+        self._fin = True
+        texto = self._utf8.decode(b'', final=True)
+        if texto:
+            self._anadir(texto)
+        return bool(texto)
+
+    def _anadir(self, texto):
+        if self._pos > _MAXIMO_CONSUMIDO:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        self._buf += texto
+
+    def _caracter(self):
+        # Siguiente carácter significativo sin consumirlo ('' al final del documento).
+        while True:
+            self._pos = _ESPACIOS.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._leer():
+                return ''
+
+    def _consumir(self, esperados):
+        caracter = self._caracter()
+        if caracter == '' or caracter not in esperados:
+            raise ValueError(f"JSON no válido: se esperaba uno de {esperados!r} y llegó {caracter!r}")
+        self._pos += 1
+        return caracter
+
+    def _valor(self):
+        # Decodifica un valor completo; si el búfer lo corta, pide más trozos y reintenta.
+        self._caracter()
+        while True:
+            try:
+                valor, fin = _DECODIFICADOR.raw_decode(self._buf, self._pos)
+                # Un número cortado ("2" de "2.5") solo es completo si le sigue un delimitador
+                if (fin < len(self._buf) and self._buf[fin] in _DELIMITADORES) or self._fin:
+                    self._pos = fin
+                    return valor
+            except json.JSONDecodeError:
+                if self._fin:
+                    raise
+            self._leer()
+
+    def _elementos(self):
+        self._consumir('[')
+        if self._caracter() == ']':
+            self._pos += 1
+            return
+        decodificar = _DECODIFICADOR.raw_decode
+        espacios = _ESPACIOS.match
+        while True:
+            # Camino rápido: elemento completo y su separador ya están en el búfer
+            buf = self._buf
+            pos = espacios(buf, self._pos).end()
+            try:
+                valor, fin = decodificar(buf, pos)
+            except json.JSONDecodeError:
+                fin = len(buf)
+            if fin < len(buf) and buf[fin] in _DELIMITADORES:
+                siguiente = espacios(buf, fin).end()
+                if siguiente < len(buf) and buf[siguiente] in ',]':
+                    self._pos = siguiente + 1
+                    yield valor
+                    if buf[siguiente] == ']':
+                        return
+                    continue
+            # Camino lento: el elemento o el separador cruzan el final del trozo
+            yield self._valor()
+            if self._consumir(',]') == ']':
+                return
+
+    def __iter__(self):
+        caracter = self._caracter()
+        if caracter == '[':
+            self.raiz = 'lista'
+            yield from self._elementos()
+        elif caracter == '{':
+            self.raiz = 'objeto'
+            self._pos += 1
+            if self._caracter() == '}':
+                self._pos += 1
+            else:
+                while True:
+                    clave = self._valor()
+                    self._consumir(':')
+                    if clave == self.clave_lista and self._caracter() == '[':
+                        yield from self._elementos()
+                    else:
+                        self.resto[clave] = self._valor()
+                    if self._consumir(',}') == '}':
+                        break
+        else:
+            raise ValueError(f"JSON no válido: la raíz debe ser una lista o un objeto (llegó {caracter!r})")
+        if self._caracter() != '':
+            raise ValueError("JSON no válido: contenido tras el final del documento")
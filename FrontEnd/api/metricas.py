@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import defaultdict
+
+# ====================================================================
+# --- INSTRUMENTACIÓN DEL CLIENTE API ---
+# ====================================================================
+# Latencias por método y endpoint (histograma), bytes enviados/recibidos,
+# tiempo de parseo JSON y normalización, aciertos de caché y errores.
+
+# Límites superiores (ms) de cada cubo del histograma; el último cubo es "> 10000"
+LIMITES_HISTOGRAMA_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def plantilla_endpoint(endpoint):
+    # Los IDs del path se agrupan: "clientes/15" y "clientes/16" cuentan como "clientes/{id}"
+    base, _, resto = endpoint.partition('/')
+    return f"{base}/{{id}}" if resto else base
+
+
+class Histograma:
+    """Histograma de cubos fijos con contador, suma, mínimo y máximo."""
+    def __init__(self, limites=LIMITES_HISTOGRAMA_MS):
+        self.limites = limites
+        self.cubos = [0] * (len(limites) + 1)
+        self.cuenta = 0
+        self.suma = 0.0
+        self.minimo = None
+        self.maximo = None
+
+    def registrar(self, valor):
+        indice = len(self.limites)
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                indice = i
+                break
+        self.cubos[indice] += 1
+        self.cuenta += 1
+        self.suma += valor
+        self.minimo = valor if self.minimo is None else min(self.minimo, valor)
+        self.maximo = valor if self.maximo is None else max(self.maximo, valor)
+
+    def percentil(self, p):
+        # Aproximación: límite superior del cubo donde cae el percentil p (0-100).
+        if not self.cuenta:
+            return None
+        objetivo = self.cuenta * p / 100
+        acumulado = 0
+        for i, cantidad in enumerate(self.cubos):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return min(self.limites[i], self.maximo) if i < len(self.limites) else self.maximo
+        return self.maximo
+
+    def a_dict(self):
+        return {
+            'cuenta': self.cuenta,
+            'media_ms': self.suma / self.cuenta if self.cuenta else None,
+            'min_ms': self.minimo,
+            'max_ms': self.maximo,
+            'p50_ms': self.percentil(50),
+            'p95_ms': self.percentil(95),
+            'cubos': dict(zip([f"<={l}" for l in self.limites] + [f">{self.limites[-1]}"], self.cubos)),
+        }
+
+
+class _MetricasEndpoint:
+    def __init__(self):
+        self.latencia = Histograma()
+        self.parseo = Histograma()
+        self.normalizacion = Histograma()
+        self.bytes_enviados = 0
+        self.bytes_recibidos = 0
+        self.errores = defaultdict(int)
+
+
+class MetricasCliente:
+    """
+    Acumula métricas del cliente API. Es segura entre hilos (las peticiones corren en segundo plano).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._endpoints = defaultdict(_MetricasEndpoint)
+            self._cache = defaultdict(lambda: {'aciertos': 0, 'fallos': 0})
+            self._desde = time.time()
+
+    def registrar_peticion(self, metodo, endpoint, duracion_ms, bytes_enviados=0, bytes_recibidos=0,
+                           parseo_ms=None, normalizacion_ms=None, error=None):
+        with self._lock:
+            m = self._endpoints[(metodo, plantilla_endpoint(endpoint))]
+            m.latencia.registrar(duracion_ms)
+            m.bytes_enviados += bytes_enviados
+            m.bytes_recibidos += bytes_recibidos
+            if parseo_ms is not None: m.parseo.registrar(parseo_ms)
+            if normalizacion_ms is not None: m.normalizacion.registrar(normalizacion_ms)
+            if error is not None: m.errores[str(error)] += 1
+
+    def registrar_cache(self, nombre, acierto):
+        with self._lock:
+            self._cache[nombre]['aciertos' if acierto else 'fallos'] += 1
+
+    def resumen(self):
+        # Instantánea de todas las métricas como dict (para la API Python y el panel de diagnóstico).
+        with self._lock:
+            endpoints = {}
+            for (metodo, endpoint), m in sorted(self._endpoints.items()):
+                endpoints[f"{metodo} {endpoint}"] = {
+                    'latencia': m.latencia.a_dict(),
+                    'parseo_json': m.parseo.a_dict(),
+                    'normalizacion': m.normalizacion.a_dict(),
+                    'bytes_enviados': m.bytes_enviados,
+                    'bytes_recibidos': m.bytes_recibidos,
+                    'errores': dict(m.errores),
+                }
+            cache = {}
+            for nombre, c in sorted(self._cache.items()):
+                total = c['aciertos'] + c['fallos']
+                cache[nombre] = dict(c, tasa_acierto=c['aciertos'] / total if total else None)
+            return {'desde': self._desde, 'endpoints': endpoints, 'cache': cache}
+
+
+def formatear_resumen(resumen):
+    # Texto tabular del resumen (lo usa el panel de diagnóstico).
+    lineas = [f"{'Endpoint':<32}{'N':>6}{'p50':>8}{'p95':>8}{'máx':>9}{'parse':>8}{'norm':>8}{'KB in':>10}{'KB out':>9}{'err':>5}"]
+    for nombre, m in resumen['endpoints'].items():
+        lat = m['latencia']
+        fmt = lambda v: "-" if v is None else f"{v:.0f}"
+        lineas.append(
+            f"{nombre[:31]:<32}{lat['cuenta']:>6}{fmt(lat['p50_ms']):>8}{fmt(lat['p95_ms']):>8}{fmt(lat['max_ms']):>9}"
+            f"{fmt(m['parseo_json']['media_ms']):>8}{fmt(m['normalizacion']['media_ms']):>8}"
+            f"{m['bytes_recibidos'] / 1024:>10.1f}{m['bytes_enviados'] / 1024:>9.1f}{sum(m['errores'].values()):>5}"
+        )
+    lineas.append("")
+    lineas.append(f"{'Caché':<32}{'aciertos':>10}{'fallos':>8}{'tasa':>8}")
+    for nombre, c in resumen['cache'].items():
+        tasa = "-" if c['tasa_acierto'] is None else f"{100 * c['tasa_acierto']:.0f}%"
+        lineas.append(f"{nombre:<32}{c['aciertos']:>10}{c['fallos']:>8}{tasa:>8}")
+    return "\n".join(lineas)
@@ -0,0 +1,191 @@
+from datetime import date
+from itertools import repeat
+
+# ====================================================================
+# --- MODELOS COMPACTOS DE ENTIDADES (__slots__) ---
+# ====================================================================
+# Sustituyen a los dict que devolvía la API: ocupan mucha menos memoria por registro
+# y los campos se convierten una sola vez al cargar (total -> float, fecha -> date).
+# Ofrecen .get() / ['clave'] para que DataTable, ModalForm y las vistas sigan funcionando.
+
+
+def limpiar_total(total):
+    # Convierte "1500.00€" / "1,500.00" / 1500 a float (0.0 si no es válido).
+    if isinstance(total, (int, float)):
+        return float(total)
+    try: return float(str(total).replace('€', '').replace(',', ''))
+    except ValueError: return 0.0
+
+def convertir_fecha(valor):
+    # Acepta date, "YYYY-MM-DD" o el formato de Java "YYYY-MM-DDTHH:MM:SS".
+    if valor is None or isinstance(valor, date):
+        return valor
+    try:
+        # fromisoformat es mucho más rápido que strptime (importa con cientos de miles de facturas)
+        return date.fromisoformat(str(valor)[:10])
+    except ValueError:
+        return None
+
+def _id_anidado(datos, campo, objeto):
+    # Los objetos JPA pueden venir anidados: {"comercial": {"comercial_id": 1}}.
+    valor = datos.get(campo)
+    if valor is None and isinstance(datos.get(objeto), dict):
+        valor = datos[objeto].get(campo)
+    return valor
+
+
+class _Modelo:
+    __slots__ = ()
+
+    def get(self, clave, por_defecto=None):
+        if clave in self.__slots__:
+            valor = getattr(self, clave)
+            return por_defecto if valor is None else valor
+        return por_defecto
+
+    def __getitem__(self, clave):
+        if clave not in self.__slots__:
+            raise KeyError(clave)
+        return getattr(self, clave)
+
+    def __contains__(self, clave):
+        return clave in self.__slots__ and getattr(self, clave) is not None
+
+    def __eq__(self, otro):
+        return type(self) is type(otro) and self._valores() == otro._valores()
+
+    def __hash__(self):
+        # Por clave primaria (primer campo de __slots__): dos modelos iguales tienen el mismo id.
+        # No cambiar el id de un modelo mientras esté en un set o sea clave de un dict.
+        return hash((type(self), getattr(self, self.__slots__[0])))
+
+    def __repr__(self):
+        campos = ", ".join(f"{c}={getattr(self, c)!r}" for c in self.__slots__)
+        return f"{type(self).__name__}({campos})"
+
+    def _valores(self):
+        return tuple(getattr(self, c) for c in self.__slots__)
+
+    def a_dict(self):
+        # Representación serializable (snake_case) para la caché local.
+        resultado = {}
+        for campo in self.__slots__:
+            valor = getattr(self, campo)
+            resultado[campo] = valor.isoformat() if isinstance(valor, date) else valor
+        return resultado
+
+    @classmethod
+    def desde_dict(cls, datos):
+        modelo = cls.__new__(cls)
+        for campo in cls.__slots__:
+            setattr(modelo, campo, datos.get(campo))
+        return modelo
+
+    # Conversión de cada campo al construir desde columnas (campo -> función)
+    CONVERSORES = {}
+
+    @classmethod
+    def desde_columnas(cls, columnas, total):
+        # Modelos a partir de columnas {campo: lista de `total` valores}, sin dicts intermedios.
+        # Cada columna se convierte de una vez; las que faltan quedan a None.
+        listas = []
+        for campo in cls.__slots__:
+            valores = columnas.get(campo)
+            if valores is None:
+                valores = repeat(None, total)
+            elif campo in cls.CONVERSORES:
+                valores = map(cls.CONVERSORES[campo], valores)
+            listas.append(valores)
+        asignadores = [getattr(cls, campo).__set__ for campo in cls.__slots__]
+        modelos = []
+        for fila in zip(*listas):
+            modelo = cls.__new__(cls)
+            for asignar, valor in zip(asignadores, fila):
+                asignar(modelo, valor)
+            modelos.append(modelo)
+        return modelos
+
+
+class Comercial(_Modelo):
+    __slots__ = ('comercial_id', 'nombre', 'email', 'telefono', 'rol', 'username', 'password_hash')
+
+
+class Cliente(_Modelo):
+    __slots__ = ('cliente_id', 'nombre', 'apellidos', 'edad', 'email', 'telefono', 'direccion',
+                 'comercial_id', 'username', 'password_hash')
+
+    @classmethod
+    def desde_dict(cls, datos):
+        modelo = super().desde_dict(datos)
+        modelo.comercial_id = _id_anidado(datos, 'comercial_id', 'comercial')
+        return modelo
+
+
+class Seccion(_Modelo):
+    __slots__ = ('seccion_id', 'nombre')
+
+
+class Producto(_Modelo):
+    __slots__ = ('producto_id', 'nombre', 'precio_base', 'plazas_disponibles', 'seccion_id')
+    CONVERSORES = {'precio_base': limpiar_total}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        modelo = super().desde_dict(datos)
+        modelo.precio_base = limpiar_total(datos.get('precio_base', 0))
+        modelo.seccion_id = _id_anidado(datos, 'seccion_id', 'seccion')
+        return modelo
+
+
+class Factura(_Modelo):
+    __slots__ = ('factura_id', 'cliente_id', 'comercial_id', 'producto_id', 'fecha_emision', 'estado', 'total')
+    CONVERSORES = {'fecha_emision': convertir_fecha, 'total': limpiar_total}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        # Asignación directa (sin bucle genérico): es la entidad más numerosa
+        modelo = cls.__new__(cls)
+        modelo.factura_id = datos.get('factura_id')
+        modelo.cliente_id = _id_anidado(datos, 'cliente_id', 'cliente')
+        modelo.comercial_id = _id_anidado(datos, 'comercial_id', 'comercial')
+        modelo.producto_id = _id_anidado(datos, 'producto_id', 'producto')
+        modelo.fecha_emision = convertir_fecha(datos.get('fecha_emision'))
+        modelo.estado = datos.get('estado')
+        modelo.total = limpiar_total(datos.get('total', 0))
+        return modelo
+
+
+MODELOS_POR_ENTIDAD = {
+    'comerciales': Comercial,
+    'clientes': Cliente,
+    'secciones': Seccion,
+    'productos': Producto,
+    'facturas': Factura,
+}
+
+
+def a_modelos_desde_columnas(entidad, columnas, total):
+    # Como a_modelos, pero desde columnas {campo: lista}; None si la entidad no tiene modelo.
+    modelo = MODELOS_POR_ENTIDAD.get(entidad)
+    return modelo.desde_columnas(columnas, total) if modelo is not None else None
+
+
+def a_modelos(entidad, datos):
+    # Convierte la respuesta normalizada (lista o dict) en modelos; deja intacto lo que no reconoce.
+    modelo = MODELOS_POR_ENTIDAD.get(entidad)
+    if modelo is None:
+        return datos
+    if isinstance(datos, list):
+        return [modelo.desde_dict(d) if isinstance(d, dict) else d for d in datos]
+    if isinstance(datos, dict):
+        return modelo.desde_dict(datos)
+    return datos
+
+
+def serializar(valor):
+    # `default` para json.dumps: modelos y fechas a tipos JSON.
+    if isinstance(valor, _Modelo):
+        return valor.a_dict()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
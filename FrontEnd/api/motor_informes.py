@@ -0,0 +1,173 @@
+import heapq
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from api.columnar import TablaCompartida
+
+# ====================================================================
+# --- MOTOR LOCAL DE INFORMES (MULTIPROCESO) ---
+# ====================================================================
+# Parte las facturas en particiones (rangos de filas del DatasetColumnar), agrega cada una
+# en un proceso del pool (ingresos por comercial y mes, estados, ingresos por cliente) y fusiona
+# los parciales. Cada tarea solo envía el descriptor de la memoria compartida y su rango:
+# los procesos leen las columnas sin copiarlas.
+# Este módulo no importa api_client: los procesos hijos (spawn) lo cargan sin efectos secundarios.
+
+# Facturas por partición (una tarea del pool)
+TAMANO_PARTICION = 100_000
+# Por debajo de esto se agrega en el propio proceso: arrancar el pool costaría más que el cálculo
+MINIMO_FACTURAS_MULTIPROCESO = 200_000
+TOP_CLIENTES = 20
+
+
+def _agregar_columnas(columnas, inicio, fin, num_clientes, num_estados):
+    # Agregados vectorizados de las filas [inicio, fin). Solo devuelve arrays nuevos (no vistas del bloque).
+    comercial = columnas['comercial'][inicio:fin]
+    cliente = columnas['cliente'][inicio:fin]
+    mes = columnas['mes'][inicio:fin]
+    estado = columnas['estado'][inicio:fin]
+    total = columnas['total'][inicio:fin]
+
+    positivo = total > 0
+    con_mes = positivo & (mes >= 0)
+    # Clave comercial×mes en un int64; np.unique la agrupa y bincount suma por grupo
+    claves = (comercial[con_mes].astype(np.int64) << 32) | mes[con_mes].astype(np.int64)
+    claves_unicas, grupo = np.unique(claves, return_inverse=True)
+    return {
+        'num_facturas': fin - inicio,
+        'claves_comercial_mes': claves_unicas,
+        'ingresos_comercial_mes': np.bincount(grupo, weights=total[con_mes], minlength=len(claves_unicas)),
+        'ingresos_cliente': np.bincount(cliente[positivo], weights=total[positivo], minlength=num_clientes),
+        'conteo_estado': np.bincount(estado, minlength=num_estados),
+        'importe_estado': np.bincount(estado, weights=total, minlength=num_estados),
+    }
+
+
+def agregar_particion(descriptor, inicio, fin, num_clientes, num_estados):
+    """Agregados parciales de una partición (se ejecuta en un proceso del pool, adjunto a la memoria compartida)."""
+    tabla = TablaCompartida.adjuntar(descriptor)
+    try:
+        return _agregar_columnas(tabla.columnas, inicio, fin, num_clientes, num_estados)
+    finally:
+        tabla.cerrar()
+
+
+def _fusionar(acumulado, parcial):
+    acumulado['num_facturas'] += parcial['num_facturas']
+    acumulado['claves_comercial_mes'].append(parcial['claves_comercial_mes'])
+    acumulado['ingresos_comercial_mes'].append(parcial['ingresos_comercial_mes'])
+    for campo in ('ingresos_cliente', 'conteo_estado', 'importe_estado'):
+        acumulado[campo] = acumulado[campo] + parcial[campo]
+
+
+def _clave_mes(mes):
+    return f"{mes // 12}-{mes % 12 + 1:02d}"
+
+
+def generar_informe(dataset, comerciales, al_progreso=None, max_procesos=None,
+                    tamano_particion=TAMANO_PARTICION, minimo_multiproceso=MINIMO_FACTURAS_MULTIPROCESO):
+    """
+    Informe completo a partir de un DatasetColumnar (facturas y clientes) y los modelos Comercial.
+    `al_progreso(hechas, total)` se llama desde el hilo que ejecuta el informe tras fusionar cada partición.
+    Devuelve un dict con ingresos por comercial y mes, clientes por comercial, desglose por estado y top clientes.
+    """
+    inicio = time.perf_counter()
+    num_facturas = dataset.num_facturas
+    num_clientes, num_estados = len(dataset.ids_clientes), len(dataset.estados)
+    particiones = [(i, min(i + tamano_particion, num_facturas)) for i in range(0, num_facturas, tamano_particion)]
+    total_particiones = len(particiones)
+    acumulado = {'num_facturas': 0, 'claves_comercial_mes': [], 'ingresos_comercial_mes': [],
+                 'ingresos_cliente': np.zeros(num_clientes), 'conteo_estado': np.zeros(num_estados, dtype=np.int64),
+                 'importe_estado': np.zeros(num_estados)}
+
+    procesos = max_procesos or min(os.cpu_count() or 1, total_particiones)
+    if num_facturas < minimo_multiproceso or procesos <= 1:
+        procesos = 1
+        for hechas, (desde, hasta) in enumerate(particiones, start=1):
+            _fusionar(acumulado, _agregar_columnas(dataset.facturas.columnas, desde, hasta, num_clientes, num_estados))
+            if al_progreso: al_progreso(hechas, total_particiones)
+    else:
+        # spawn: hacer fork de un proceso con Tk e hilos en marcha no es seguro
+        contexto = multiprocessing.get_context("spawn")
+        descriptor = dataset.facturas.descriptor()
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+            futuros = [pool.submit(agregar_particion, descriptor, desde, hasta, num_clientes, num_estados)
+                       for desde, hasta in particiones]
+            for hechas, futuro in enumerate(as_completed(futuros), start=1):
+                _fusionar(acumulado, futuro.result())
+                if al_progreso: al_progreso(hechas, total_particiones)
+
+    nombres_comerciales = {c.comercial_id: c.nombre for c in comerciales}
+
+    # Fusión final de las claves comercial×mes de todas las particiones
+    claves = np.concatenate(acumulado['claves_comercial_mes']) if particiones else np.zeros(0, dtype=np.int64)
+    importes = np.concatenate(acumulado['ingresos_comercial_mes']) if particiones else np.zeros(0)
+    claves_unicas, grupo = np.unique(claves, return_inverse=True)
+    sumas = np.bincount(grupo, weights=importes, minlength=len(claves_unicas))
+    por_comercial_mes = [(dataset.ids_comerciales[int(clave >> 32)], int(clave & 0xFFFFFFFF), float(importe))
+                         for clave, importe in zip(claves_unicas, sumas)]
+    ingresos_comercial_mes = {}
+    for comercial_id, mes, importe in sorted(por_comercial_mes, key=lambda t: (str(t[0]), t[1])):
+        nombre = nombres_comerciales.get(comercial_id) or f"Comercial {comercial_id}"
+        ingresos_comercial_mes.setdefault(nombre, {})[_clave_mes(mes)] = importe
+
+    codigos_comercial = {comercial_id: codigo for codigo, comercial_id in enumerate(dataset.ids_comerciales)}
+    clientes_por_codigo = np.bincount(dataset.clientes['comercial'], minlength=len(dataset.ids_comerciales))
+    clientes_por_comercial = sorted(
+        ({"nombre": c.nombre or "Desconocido",
+          "clientes": int(clientes_por_codigo[codigos_comercial[c.comercial_id]]) if c.comercial_id in codigos_comercial else 0}
+         for c in comerciales),
+        key=lambda d: d["clientes"], reverse=True)
+
+    ingresos_cliente = acumulado['ingresos_cliente']
+    con_ingresos = np.flatnonzero(ingresos_cliente)
+    top = heapq.nlargest(TOP_CLIENTES, con_ingresos.tolist(), key=lambda codigo: ingresos_cliente[codigo])
+    top_clientes = [{"cliente_id": dataset.ids_clientes[codigo],
+                     "nombre": dataset.nombres_clientes[codigo] or f"Cliente {dataset.ids_clientes[codigo]}",
+                     "ingresos": float(ingresos_cliente[codigo])} for codigo in top]
+
+    estados = {estado: {"facturas": int(acumulado['conteo_estado'][codigo]),
+                        "importe": float(acumulado['importe_estado'][codigo])}
+               for codigo, estado in sorted(enumerate(dataset.estados), key=lambda par: par[1])}
+    return {
+        'num_facturas': acumulado['num_facturas'],
+        'ingresos_totales': float(ingresos_cliente.sum()),
+        'ingresos_por_comercial_mes': ingresos_comercial_mes,
+        'clientes_por_comercial': clientes_por_comercial,
+        'estados': estados,
+        'top_clientes': top_clientes,
+        'procesos': procesos,
+        'particiones': total_particiones,
+        'duracion_s': time.perf_counter() - inicio,
+    }
+
+
+def formatear_informe(informe):
+    # Texto del informe para la ventana de informes.
+    lineas = [
+        f"Facturas: {informe['num_facturas']:,}    Ingresos: {informe['ingresos_totales']:,.2f} €",
+        f"Calculado en {informe['duracion_s']:.2f} s ({informe['particiones']} particiones, {informe['procesos']} procesos)",
+        "",
+        "ESTADO DE FACTURAS",
+    ]
+    for estado, datos in informe['estados'].items():
+        lineas.append(f"  {estado:<14}{datos['facturas']:>10,}{datos['importe']:>18,.2f} €")
+
+    lineas += ["", f"TOP {len(informe['top_clientes'])} CLIENTES"]
+    for posicion, cliente in enumerate(informe['top_clientes'], start=1):
+        lineas.append(f"  {posicion:>2}. {cliente['nombre'][:34]:<36}{cliente['ingresos']:>16,.2f} €")
+
+    lineas += ["", "CLIENTES POR COMERCIAL"]
+    for fila in informe['clientes_por_comercial']:
+        lineas.append(f"  {fila['nombre'][:34]:<36}{fila['clientes']:>8,}")
+
+    lineas += ["", "INGRESOS POR COMERCIAL Y MES"]
+    for nombre, meses in informe['ingresos_por_comercial_mes'].items():
+        lineas.append(f"  {nombre}  (total {sum(meses.values()):,.2f} €)")
+        for mes, importe in meses.items():
+            lineas.append(f"      {mes}{importe:>16,.2f} €")
+    return "\n".join(lineas)
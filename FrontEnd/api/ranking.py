@@ -0,0 +1,111 @@
+import functools
+import heapq
+import threading
+
+# ====================================================================
+# --- RANKING TOP-N CON MONTÍCULO INCREMENTAL ---
+# ====================================================================
+# Para pintar "los N mejores + Otros" no hace falta ordenar todas las claves: basta un montículo
+# de mínimos con los N mayores (heapq.nlargest al construirlo, O(k log N)). Al sumar importes
+# sueltos (deltas de la sincronización) el montículo se mantiene sin reordenar nada; solo si uno
+# de los N baja (puede haberle adelantado alguien de fuera) se vuelve a seleccionar, perezosamente.
+# A igual total desempata la clave menor, igual que el orden (-total, clave) de los listados completos.
+
+
+@functools.total_ordering
+class _ClaveInversa:
+    # Envoltorio que invierte la comparación: en el montículo de mínimos, a igual total "pierde" la clave mayor.
+    __slots__ = ('clave',)
+
+    def __init__(self, clave):
+        self.clave = clave
+
+    def __eq__(self, otra):
+        return self.clave == otra.clave
+
+    def __lt__(self, otra):
+        return otra.clave < self.clave
+
+
+def orden_ranking(clave, total):
+    # Clave de ordenación de mayor a menor total y, a igual total, de menor a mayor clave.
+    return (-total, clave)
+
+
+class RankingTopN:
+    """
+    Totales por clave (p. ej. ingresos por comercial_id) con los `n` mayores siempre a mano.
+    A igual total va antes la clave menor (ver `orden_ranking`).
+    Es seguro usarlo desde varios hilos.
+    """
+    def __init__(self, n=10):
+        self.n = n
+        self.totales = {}
+        self.total = 0
+        self._monticulo = None  # [(total, _ClaveInversa(clave))] de los n mayores; None = recalcular
+        self._en_top = set()
+        self._lock = threading.Lock()
+
+    def sumar(self, clave, importe):
+        with self._lock:
+            nuevo = self.totales.get(clave, 0) + importe
+            self.totales[clave] = nuevo
+            self.total += importe
+            if self._monticulo is not None and importe:
+                self._actualizar_monticulo(clave, nuevo, importe)
+
+    def _actualizar_monticulo(self, clave, nuevo, importe):
+        entrada = (nuevo, _ClaveInversa(clave))
+        if clave in self._en_top:
+            if importe < 0:
+                # Un líder baja: alguien de fuera podría superarle
+                self._monticulo = None
+                return
+            indice = next(i for i, e in enumerate(self._monticulo) if e[1].clave == clave)
+            self._monticulo[indice] = entrada
+            heapq.heapify(self._monticulo)  # n elementos: barato
+        elif len(self._monticulo) < self.n:
+            heapq.heappush(self._monticulo, entrada)
+            self._en_top.add(clave)
+        elif entrada > self._monticulo[0]:
+            saliente = heapq.heapreplace(self._monticulo, entrada)
+            self._en_top.discard(saliente[1].clave)
+            self._en_top.add(clave)
+
+    def _seleccionar(self):
+        self._monticulo = heapq.nlargest(self.n, ((t, _ClaveInversa(c)) for c, t in self.totales.items()))
+        heapq.heapify(self._monticulo)
+        self._en_top = {e[1].clave for e in self._monticulo}
+
+    def lideres(self, n=None):
+        # [(clave, total)] de los n mayores, de mayor a menor.
+        with self._lock:
+            if n is not None and n != self.n:
+                self.n = n
+                self._monticulo = None
+            if self._monticulo is None:
+                self._seleccionar()
+            return [(inversa.clave, total) for total, inversa in sorted(self._monticulo, reverse=True)]
+
+
+def lideres_con_otros(ranking, nombres, n, clave_valor, nombre_otros="Otros"):
+    """
+    Filas {"id", "nombre", clave_valor} de los `n` primeros de `ranking` entre las claves de `nombres`
+    (dict clave -> nombre) y una fila final `nombre_otros` con la suma del resto y cuántos agrupa
+    ('agrupados'). Claves fuera de `nombres` (p. ej. comercial borrado) no cuentan, como en el listado
+    completo; los que no tienen total cuentan con 0 y el orden es siempre `orden_ranking`.
+    """
+    lideres = ranking.lideres(n)
+    if len(lideres) < n or lideres[-1][1] <= 0 or any(clave not in nombres for clave, _ in lideres):
+        # Sin n líderes conocidos con total positivo: selección entre todas las claves conocidas
+        totales = ranking.totales
+        lideres = [(c, totales.get(c, 0)) for c in
+                   heapq.nsmallest(n, nombres, key=lambda c: orden_ranking(c, totales.get(c, 0)))]
+
+    filas = [{"id": clave, "nombre": nombres[clave] or "Desconocido", clave_valor: total} for clave, total in lideres]
+    agrupados = len(nombres) - len(filas)
+    if agrupados > 0:
+        total_conocido = sum(ranking.totales.get(c, 0) for c in nombres)
+        filas.append({"id": None, "nombre": nombre_otros, clave_valor: total_conocido - sum(t for _, t in lideres),
+                      "agrupados": agrupados, "otros": True})
+    return filas
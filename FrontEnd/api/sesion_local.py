@@ -0,0 +1,76 @@
+import json
+import os
+import time
+
+from api.cache_local import RUTA_CACHE
+
+# ====================================================================
+# --- PERSISTENCIA DE LA SESIÓN ENTRE ARRANQUES ---
+# ====================================================================
+# Guarda las cookies de sesión del servlet (JSESSIONID...) y los datos del usuario
+# para reutilizar la sesión al volver a abrir la aplicación sin repetir el login.
+# Nunca se guarda la contraseña.
+
+ARCHIVO_SESION = "sesion.json"
+
+# Las cookies de sesión no traen caducidad: limitamos nosotros su vida útil.
+DURACION_MAXIMA_SESION_S = 12 * 60 * 60
+
+
+def _ruta_sesion(ruta_directorio=None):
+    return os.path.join(ruta_directorio or RUTA_CACHE, ARCHIVO_SESION)
+
+
+def guardar_sesion(cookies, usuario, ruta_directorio=None):
+    # Escribe las cookies (RequestsCookieJar) y los datos del usuario con permisos solo de lectura propia.
+    contenido = {
+        "guardada_en": time.time(),
+        "usuario": usuario,
+        "cookies": [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path,
+             "expires": c.expires, "secure": c.secure}
+            for c in cookies
+        ],
+    }
+    ruta = _ruta_sesion(ruta_directorio)
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        descriptor = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w", encoding="utf-8") as archivo:
+            json.dump(contenido, archivo)
+        return True
+    except OSError as e:
+        print(f"AVISO: No se pudo guardar la sesión local: {e}")
+        return False
+
+
+def cargar_sesion(ruta_directorio=None):
+    """
+    Devuelve (usuario, cookies) si hay una sesión guardada y vigente, o None.
+    Descarta las cookies caducadas y la sesión entera si supera DURACION_MAXIMA_SESION_S.
+    """
+    try:
+        with open(_ruta_sesion(ruta_directorio), encoding="utf-8") as archivo:
+            contenido = json.load(archivo)
+    except (OSError, ValueError):
+        return None
+
+    ahora = time.time()
+    if ahora - contenido.get("guardada_en", 0) > DURACION_MAXIMA_SESION_S:
+        borrar_sesion(ruta_directorio)
+        return None
+
+    cookies = [c for c in contenido.get("cookies", []) if not c.get("expires") or c["expires"] > ahora]
+    usuario = contenido.get("usuario")
+    if not cookies or not usuario:
+        return None
+    return usuario, cookies
+
+
+def borrar_sesion(ruta_directorio=None):
+    try:
+        os.remove(_ruta_sesion(ruta_directorio))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"AVISO: No se pudo borrar la sesión local: {e}")
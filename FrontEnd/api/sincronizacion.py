@@ -0,0 +1,254 @@
+import asyncio
+import threading
+
+from api.cache_local import clave_endpoint
+from api.vuelo_unico import VueloUnico
+
+# ====================================================================
+# --- SINCRONIZACIÓN INCREMENTAL (DELTA) POR ENTIDAD ---
+# ====================================================================
+# Protocolo con el servidor:
+#   GET /clientes?modifiedSince=<token>
+# Si el servidor soporta deltas responde con un objeto:
+#   {"items": [...cambiados/nuevos...], "deleted": [ids...], "syncToken": "<nuevo token>"}
+# Si responde con una lista simple (servidor antiguo), se trata como recarga completa.
+# La primera carga envía TOKEN_INICIAL para obtener ya un syncToken (un servidor antiguo lo ignora).
+
+PARAM_TOKEN = "modifiedSince"
+TOKEN_INICIAL = "0"
+
+CLAVES_PRIMARIAS = {
+    'clientes': 'cliente_id',
+    'comerciales': 'comercial_id',
+    'facturas': 'factura_id',
+    'productos': 'producto_id',
+    'secciones': 'seccion_id',
+}
+
+
+class ConjuntoSincronizado:
+    """
+    Copia local de una colección (indexada por clave primaria) con su token de sincronización.
+    `version` se incrementa solo cuando el contenido cambia de verdad.
+    """
+    def __init__(self, entidad):
+        self.entidad = entidad
+        self.clave_primaria = CLAVES_PRIMARIAS.get(entidad, 'id')
+        self.registros = {}
+        self.token_sync = None
+        self.version = 0
+        self.cargado = False
+        self._lista = None
+        # Columnas tipadas (p. ej. api.columnar.ColumnasFacturas) de la primera descarga, en el orden
+        # de como_lista(); se descartan con el primer cambio de contenido.
+        self.columnas = None
+
+    def _clave(self, registro):
+        valor = registro.get(self.clave_primaria) if hasattr(registro, 'get') else None
+        return str(valor) if valor is not None else None
+
+    def reemplazar(self, lista, token_sync=None):
+        # Sustituye el contenido completo (recarga total o instantánea de disco).
+        nuevos = {}
+        for registro in lista:
+            clave = self._clave(registro)
+            if clave is not None:
+                nuevos[clave] = registro
+        cambiado = nuevos != self.registros
+        self.registros = nuevos
+        self.token_sync = token_sync
+        self.cargado = True
+        if cambiado:
+            self._marcar_cambio()
+        return cambiado
+
+    def fusionar(self, cambiados, eliminados, token_sync=None, cambios=None):
+        # Aplica un delta: upsert de los cambiados y borrado de los eliminados.
+        # Se trabaja sobre una copia para que el hilo de Tk nunca vea el dict a medias.
+        # Si se pasa la lista `cambios`, se le añade (anterior, nuevo) por registro (None = no existía / borrado).
+        registros = dict(self.registros)
+        cambiado = False
+        for registro in cambiados or []:
+            clave = self._clave(registro)
+            if clave is not None and registros.get(clave) != registro:
+                if cambios is not None:
+                    cambios.append((registros.get(clave), registro))
+                registros[clave] = registro
+                cambiado = True
+        for id_eliminado in eliminados or []:
+            anterior = registros.pop(str(id_eliminado), None)
+            if anterior is not None:
+                if cambios is not None:
+                    cambios.append((anterior, None))
+                cambiado = True
+        self.registros = registros
+        if token_sync is not None:
+            self.token_sync = token_sync
+        self.cargado = True
+        if cambiado:
+            self._marcar_cambio()
+        return cambiado
+
+    def _marcar_cambio(self):
+        self.version += 1
+        self._lista = None
+        self.columnas = None
+
+    def es_lista_actual(self, lista):
+        # True si `lista` es la que devuelve ahora como_lista() (sirve para reutilizar agregados).
+        return self._lista is not None and self._lista is lista
+
+    def como_lista(self):
+        # Lista (cacheada hasta el siguiente cambio) que alimenta DataTable y las estadísticas.
+        if self._lista is None:
+            self._lista = list(self.registros.values())
+        return self._lista
+
+
+class GestorSincronizacion:
+    """
+    Mantiene un ConjuntoSincronizado por endpoint (entidad + filtros) y lo reconcilia con la API.
+    `peticion_get(endpoint, params, al_lote)` devuelve la respuesta normalizada o None si falla la conexión
+    (`al_lote`, si no es None, recibe los registros por lotes según llegan).
+    `cache` es opcional (CacheSnapshots), `usuario` una función que devuelve el usuario actual
+    y `convertir(entidad, lista)` transforma los registros (p. ej. a modelos) antes de guardarlos.
+    Los observadores (`observar`) reciben cada cambio de contenido para mantener agregados sin recorrer todo.
+    Las sincronizaciones simultáneas de un mismo endpoint comparten una sola petición (`metricas`, opcional,
+    cuenta cuántas se reutilizaron).
+    """
+    def __init__(self, peticion_get, cache=None, usuario=None, convertir=None, metricas=None):
+        self.peticion_get = peticion_get
+        self.cache = cache
+        self.usuario = usuario or (lambda: "anonimo")
+        self.convertir = convertir or (lambda entidad, datos: datos)
+        self.metricas = metricas
+        self.conjuntos = {}
+        self._lock = threading.Lock()
+        self._vuelos = VueloUnico()
+        self._observadores = []
+
+    def observar(self, funcion):
+        """
+        Registra `funcion(entidad, params, conjunto, cambios)`, llamada tras cada cambio de contenido:
+        `cambios` es la lista de (anterior, nuevo) de un delta, o None si el contenido se sustituyó entero
+        (primera carga, instantánea de disco o recarga completa). No debe llamar de vuelta al gestor.
+        """
+        self._observadores.append(funcion)
+
+    def _notificar(self, entidad, params, conjunto, cambios):
+        for funcion in self._observadores:
+            try:
+                funcion(entidad, params, conjunto, cambios)
+            except Exception as e:
+                print(f"AVISO: Fallo en un observador de '{entidad}': {e}")
+
+    def _obtener_conjunto(self, entidad, params):
+        # Devuelve (clave, conjunto) creando el conjunto desde disco si aún no existe.
+        clave = (self.usuario(), clave_endpoint(entidad, params))
+        with self._lock:
+            conjunto = self.conjuntos.get(clave)
+            if conjunto is None:
+                conjunto = ConjuntoSincronizado(entidad)
+                if self.cache is not None:
+                    snapshot = self.cache.leer(clave[0], clave[1])
+                    if snapshot is not None:
+                        conjunto.reemplazar(self.convertir(entidad, snapshot[0]), snapshot[2])
+                        self._notificar(entidad, params, conjunto, None)
+                self.conjuntos[clave] = conjunto
+            return clave, conjunto
+
+    def datos_locales(self, entidad, params=None):
+        # Datos conocidos sin tocar la red (memoria o disco). None si nunca se cargaron.
+        _, conjunto = self._obtener_conjunto(entidad, params)
+        if not conjunto.cargado:
+            return None
+        return conjunto.como_lista()
+
+    def version(self, entidad, params=None):
+        return self._obtener_conjunto(entidad, params)[1].version
+
+    def columnas(self, entidad, params=None, lista=None):
+        # Columnas tipadas de la descarga completa si `lista` sigue siendo el contenido actual; si no, None.
+        _, conjunto = self._obtener_conjunto(entidad, params)
+        return conjunto.columnas if conjunto.es_lista_actual(lista) else None
+
+    def sincronizar(self, entidad, params=None, al_lote=None):
+        """
+        Pide al servidor solo los cambios desde el último token y los fusiona.
+        Devuelve la lista completa actualizada, o None si no hay servidor ni datos locales.
+        Si ya hay una sincronización del mismo endpoint en curso, espera a esa y devuelve su resultado.
+        `al_lote(registros)` solo se usa en la primera descarga (sin datos locales), cuando los lotes
+        son el dataset completo; no se llama si se comparte una sincronización en curso.
+        """
+        clave, conjunto = self._obtener_conjunto(entidad, params)
+        resultado, compartida = self._vuelos.ejecutar(
+            clave, lambda: self._sincronizar(entidad, params, clave, conjunto, al_lote))
+        if self.metricas is not None:
+            self.metricas.registrar_cache('sincronización compartida (en vuelo)', compartida)
+        return resultado
+
+    async def sincronizar_asincrono(self, entidad, params, peticion_get):
+        """
+        Como sincronizar(), desde un bucle asyncio: `peticion_get(endpoint, params)` es una corutina y
+        comparte la sincronización en vuelo con los hilos que usen sincronizar() (mismo VueloUnico).
+        La fusión y la escritura en disco se hacen en un hilo para no bloquear el bucle.
+        """
+        clave, conjunto = await asyncio.to_thread(self._obtener_conjunto, entidad, params)
+
+        async def _sincronizar():
+            respuesta = await peticion_get(entidad, self._params_peticion(params, conjunto))
+            return await asyncio.to_thread(self._aplicar_respuesta, entidad, params, clave, conjunto, respuesta)
+
+        resultado, compartida = await self._vuelos.ejecutar_asincrono(clave, _sincronizar)
+        if self.metricas is not None:
+            self.metricas.registrar_cache('sincronización compartida (en vuelo)', compartida)
+        return resultado
+
+    def _params_peticion(self, params, conjunto):
+        params_peticion = dict(params or {})
+        params_peticion[PARAM_TOKEN] = conjunto.token_sync or TOKEN_INICIAL
+        return params_peticion
+
+    def _sincronizar(self, entidad, params, clave, conjunto, al_lote):
+        # Una sola a la vez por endpoint (la garantiza VueloUnico), así el token no se pisa.
+        respuesta = self.peticion_get(entidad, self._params_peticion(params, conjunto),
+                                      None if conjunto.cargado else al_lote)
+        return self._aplicar_respuesta(entidad, params, clave, conjunto, respuesta)
+
+    def _aplicar_respuesta(self, entidad, params, clave, conjunto, respuesta):
+        # Fusiona la respuesta (delta o lista completa) y la guarda en disco; devuelve la lista actual.
+        if respuesta is None:
+            # Sin servidor: seguimos con lo que haya en local (modo solo lectura)
+            return self.datos_locales(entidad, params)
+
+        token_previo = conjunto.token_sync
+        if isinstance(respuesta, dict) and ('items' in respuesta or 'deleted' in respuesta):
+            cambiados = self.convertir(entidad, respuesta.get('items') or [])
+            eliminados = respuesta.get('deleted') or []
+            cambios = [] if self._observadores else None
+            primera_carga = not conjunto.cargado
+            cambiado = conjunto.fusionar(cambiados, eliminados, respuesta.get('sync_token'), cambios)
+            columnas = respuesta.get('columnas')
+            if primera_carga and columnas is not None and columnas.filas == len(conjunto.registros):
+                conjunto.como_lista()
+                conjunto.columnas = columnas
+            if cambiado:
+                self._notificar(entidad, params, conjunto, cambios)
+            if self.cache is not None:
+                # En disco solo se escriben las filas del delta; si no cambió nada, solo el token
+                if cambiado:
+                    self.cache.aplicar_delta(clave[0], clave[1], cambiados, eliminados,
+                                             conjunto.token_sync, conjunto._clave)
+                elif conjunto.token_sync != token_previo:
+                    self.cache.guardar_token(clave[0], clave[1], conjunto.token_sync)
+        elif isinstance(respuesta, list):
+            cambiado = conjunto.reemplazar(self.convertir(entidad, respuesta))
+            if cambiado:
+                self._notificar(entidad, params, conjunto, None)
+            if self.cache is not None and (cambiado or conjunto.token_sync != token_previo):
+                self.cache.guardar(clave[0], clave[1], conjunto.como_lista(), conjunto.token_sync, conjunto._clave)
+        else:
+            print(f"AVISO: Respuesta de sincronización no reconocida para '{entidad}'.")
+            return self.datos_locales(entidad, params)
+
+        return conjunto.como_lista()
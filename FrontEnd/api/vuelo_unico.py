@@ -0,0 +1,83 @@
+import asyncio
+import threading
+
+# ====================================================================
+# --- AGRUPACIÓN DE PETICIONES IDÉNTICAS (SINGLE-FLIGHT) ---
+# ====================================================================
+# Si varias partes de la interfaz piden lo mismo a la vez (gráficos, cachés de FKs, la vista activa),
+# solo la primera llamada hace la petición; las demás esperan a que termine y reciben el mismo resultado.
+# Hilos y corutinas (ejecutar_asincrono) comparten el mismo registro de llamadas en vuelo.
+
+
+class _Llamada:
+    def __init__(self):
+        self.terminada = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class VueloUnico:
+    """
+    Llamadas en vuelo por clave. `ejecutar(clave, funcion)` ejecuta `funcion` si no hay otra
+    llamada con esa clave en curso; si la hay, espera y comparte su resultado (o su excepción).
+    El resultado compartido es el mismo objeto para todos los que esperaban: no debe modificarse.
+    """
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._en_vuelo = {}
+
+    def ejecutar(self, clave, funcion):
+        # Devuelve (resultado, compartido): compartido=True si se reutilizó una llamada en curso.
+        with self._candado:
+            llamada = self._en_vuelo.get(clave)
+            propia = llamada is None
+            if propia:
+                llamada = self._en_vuelo[clave] = _Llamada()
+
+        if not propia:
+            llamada.terminada.wait()
+            if llamada.error is not None:
+                raise llamada.error
+            return llamada.resultado, True
+
+        try:
+            llamada.resultado = funcion()
+        except BaseException as e:
+            llamada.error = e
+            raise
+        finally:
+            # Se retira antes de avisar: quien llegue después ya hace su propia petición
+            with self._candado:
+                del self._en_vuelo[clave]
+            llamada.terminada.set()
+        return llamada.resultado, False
+
+    async def ejecutar_asincrono(self, clave, funcion):
+        # Igual que ejecutar(), pero `funcion()` devuelve una corutina; se llama desde un bucle asyncio.
+        with self._candado:
+            llamada = self._en_vuelo.get(clave)
+            propia = llamada is None
+            if propia:
+                llamada = self._en_vuelo[clave] = _Llamada()
+
+        if not propia:
+            # La llamada en curso puede ser de otro hilo: se espera sin bloquear el bucle
+            await asyncio.to_thread(llamada.terminada.wait)
+            if llamada.error is not None:
+                raise llamada.error
+            return llamada.resultado, True
+
+        try:
+            llamada.resultado = await funcion()
+        except BaseException as e:
+            llamada.error = e
+            raise
+        finally:
+            with self._candado:
+                del self._en_vuelo[clave]
+            llamada.terminada.set()
+        return llamada.resultado, False
+
+    def en_vuelo(self):
+        with self._candado:
+            return len(self._en_vuelo)
@@ -0,0 +1,65 @@
+"""
+Benchmark de memoria: facturas como dict normalizado vs. modelo Factura (__slots__).
+
+Uso (desde la carpeta FrontEnd):
+    python -m benchmarks.bench_memoria_modelos [num_registros]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from api.api_client import _normalizar_datos_desde_api
+from api.modelos import Factura
+
+ESTADOS = ("pagada", "pendiente", "cancelada")
+
+
+def generar_payload(n):
+    # Respuesta tal y como la envía la API Java (camelCase, total como texto con €).
+    return [
+        {
+            "facturaId": f"F-{i:07d}",
+            "clienteId": i % 5000 + 1,
+            "comercialId": i % 50 + 1,
+            "productoId": i % 200 + 101,
+            "fechaEmision": f"20{20 + i % 6}-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "estado": ESTADOS[i % 3],
+            "total": f"{(i % 9000) + 100}.{i % 100:02d}€",
+        }
+        for i in range(n)
+    ]
+
+
+def medir(nombre, construir):
+    # Devuelve (MB retenidos, segundos) de construir la colección.
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    datos = construir()
+    duracion = time.perf_counter() - inicio
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    mb = actual / (1024 * 1024)
+    print(f"{nombre:<28} {mb:9.1f} MB  {actual / len(datos):7.0f} B/registro  {duracion:6.2f} s")
+    return datos, mb
+
+
+def main(n=500_000):
+    print(f"Generando payload de {n:,} facturas...")
+    payload = generar_payload(n)
+    normalizado = _normalizar_datos_desde_api(payload)
+    del payload
+
+    print(f"{'Representación':<28} {'Memoria':>12}  {'Por registro':>18}  {'Tiempo':>8}")
+    # Copias para medir solo lo que retiene cada representación
+    dicts, mb_dict = medir("dict normalizado", lambda: [dict(f) for f in normalizado])
+    del dicts
+    modelos, mb_modelo = medir("Factura (__slots__)", lambda: [Factura.desde_dict(f) for f in normalizado])
+    del modelos
+
+    print(f"Ahorro: {100 * (1 - mb_modelo / mb_dict):.0f}% de memoria con modelos compactos.")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -0,0 +1,427 @@
+"""
+Suite de benchmarks reproducible de los caminos críticos del cliente:
+normalización de la API, conversión a modelos, agregados del dashboard, informe completo, relleno de DataTable,
+render y caché de los gráficos del dashboard,
+descarga de listados por formato/compresión, cambio de vista en VentanaDashboard y arranque
+en frío contra el servidor simulado.
+Los resultados se guardan en JSON para comparar entre commits.
+
+Uso (desde la carpeta FrontEnd):
+    python -m benchmarks.suite                                 # 10k / 100k / 1M facturas
+    python -m benchmarks.suite --tamanos 10000,100000 --salida base.json
+    python -m benchmarks.suite --comparar base.json            # marca regresiones frente a base.json
+Sin display se usa un Treeview simulado (solo coste Python) y se omite el cambio de vista;
+con `xvfb-run python -m benchmarks.suite` se mide con Tk real.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from api.columnar import DatasetColumnar
+from api.motor_informes import generar_informe
+from components.formato import MONEDA, FECHA
+from herramientas.generador_datos import generar_dataset
+from herramientas.servidor_simulado import arrancar_en_segundo_plano
+
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+TAMANOS_POR_DEFECTO = (10_000, 100_000, 1_000_000)
+COLUMNAS_FACTURAS = ["factura_id", "cliente_id", "comercial_id", "producto_id", "fecha_emision", "estado", "total"]
+FORMATOS_FACTURAS = {"fecha_emision": FECHA, "total": MONEDA}
+
+# Código que ejecuta el intérprete nuevo en la medida de arranque en frío
+CODIGO_ARRANQUE = """
+import json, time
+t0 = time.perf_counter()
+from api import api_client
+from components.vistadashboard import calcular_datos_dashboard
+import ui.dashboard
+t1 = time.perf_counter()
+api_client.login_autenticacion('admin', '1234')
+calcular_datos_dashboard(api_client.sincronizar_facturas(), api_client.sincronizar_comerciales())
+t2 = time.perf_counter()
+print(json.dumps({'importacion_s': t1 - t0, 'primera_carga_s': t2 - t1}))
+"""
+
+
+def medir(funcion, repeticiones=3, calentamiento=1):
+    # Ejecuta `funcion` varias veces y devuelve estadísticas en segundos.
+    for _ in range(calentamiento):
+        funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {
+        'repeticiones': repeticiones,
+        'mediana_s': statistics.median(tiempos),
+        'min_s': min(tiempos),
+        'max_s': max(tiempos),
+    }
+
+
+class TreeviewSimulado:
+    """
+    Sustituto de ttk.Treeview sin display: guarda filas y cuenta llamadas para medir
+    solo el coste Python de DataTable. Los métodos que no afectan a las filas son no-op.
+    """
+    def __init__(self):
+        self.filas = {}   # iid -> valores, en el orden de la tabla
+        self.llamadas = 0
+        self._siguiente = 0
+
+    def insert(self, padre, indice, iid=None, values=(), **opciones):
+        self.llamadas += 1
+        if iid is None:
+            self._siguiente += 1
+            iid = f"I{self._siguiente:06X}"
+        if indice == 'end' or int(indice) >= len(self.filas):
+            self.filas[iid] = list(values)
+        else:
+            orden = list(self.filas.items())
+            orden.insert(int(indice), (iid, list(values)))
+            self.filas = dict(orden)
+        return iid
+
+    def delete(self, *items):
+        self.llamadas += 1
+        for iid in items:
+            self.filas.pop(iid, None)
+
+    def get_children(self, item=''):
+        self.llamadas += 1
+        return tuple(self.filas)
+
+    def item(self, iid, opcion=None, **opciones):
+        self.llamadas += 1
+        if 'values' in opciones:
+            self.filas[iid] = list(opciones['values'])
+        if opcion == 'values':
+            return tuple(self.filas.get(iid, ()))
+        return {'values': tuple(self.filas.get(iid, ()))}
+
+    def exists(self, iid):
+        return iid in self.filas
+
+    def __getattr__(self, nombre):
+        def no_op(*args, **kwargs):
+            self.llamadas += 1
+            return ()
+        return no_op
+
+
+def _tk_disponible():
+    try:
+        import tkinter as tk
+        raiz = tk.Tk()
+        raiz.destroy()
+        return True
+    except Exception:
+        return False
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Suite:
+    def __init__(self, tamanos, repeticiones, max_filas_tabla, usar_tk, facturas_servidor):
+        self.tamanos = tamanos
+        self.repeticiones = repeticiones
+        self.max_filas_tabla = max_filas_tabla
+        self.usar_tk = usar_tk
+        self.facturas_servidor = facturas_servidor
+        self.resultados = []
+        self.raiz = None
+
+    def _registrar(self, nombre, n, estadisticas, **extra):
+        resultado = dict(nombre=nombre, n=n, **estadisticas, **extra)
+        self.resultados.append(resultado)
+        print(f"  {nombre:<34} n={n:<9,} mediana {resultado['mediana_s'] * 1000:10.1f} ms"
+              f"  (min {resultado['min_s'] * 1000:.1f}, máx {resultado['max_s'] * 1000:.1f})")
+
+    # --- Preparación ---
+
+    def _crear_tabla(self, columnas, formatos=None):
+        from components.data_table import DataTable
+        if self.usar_tk:
+            return DataTable(self.raiz, columnas, formatos=formatos)
+        tabla = DataTable.sin_interfaz(columnas, TreeviewSimulado(), formatos=formatos)
+        # Sin bucle de Tk las tandas se encadenan de inmediato y no hay barra de progreso
+        tabla.after = lambda ms, funcion, *args: funcion(*args)
+        tabla.after_cancel = lambda tarea: None
+        # El diff se calcula en el propio hilo (en la aplicación va a un hilo de trabajo)
+        tabla._en_segundo_plano = lambda funcion, al_terminar, al_fallar: al_terminar(funcion())
+        tabla._actualizar_progreso = lambda: None
+        return tabla
+
+    def _esperar_relleno(self, tabla):
+        # Con Tk real el diff llega del hilo de trabajo y el relleno sigue en tandas programadas
+        # con after: se bombea el bucle hasta acabar.
+        while tabla._calculando or tabla._operaciones:
+            self.raiz.update()
+        self.raiz.update_idletasks()
+
+    # --- Benchmarks ---
+
+    def bench_datos(self, n):
+        # Normalización, modelos, agregados del dashboard y relleno de la tabla para n facturas.
+        from api import api_client
+        from api.modelos import a_modelos
+
+        print(f"Generando dataset sintético de {n:,} facturas...")
+        dataset = generar_dataset(num_comerciales=50, num_clientes=max(n // 20, 100), num_facturas=n)
+        payload = dataset['facturas']
+
+        self._registrar("normalizar_datos_desde_api", n,
+                        medir(lambda: api_client._normalizar_datos_desde_api(payload), self.repeticiones))
+        normalizado = api_client._normalizar_datos_desde_api(payload)
+        del payload
+        self._registrar("a_modelos(facturas)", n, medir(lambda: a_modelos('facturas', normalizado), self.repeticiones))
+
+        facturas = a_modelos('facturas', normalizado)
+        del normalizado
+        comerciales = a_modelos('comerciales', api_client._normalizar_datos_desde_api(dataset['comerciales']))
+        clientes = a_modelos('clientes', api_client._normalizar_datos_desde_api(dataset['clientes']))
+        del dataset
+
+        self._registrar("get_invoice_counts", n, medir(lambda: api_client.get_invoice_counts(facturas), self.repeticiones))
+        self._registrar("get_ingresos_mensuales", n,
+                        medir(lambda: api_client.get_ingresos_mensuales(facturas), self.repeticiones))
+        self._registrar("get_ranking_comerciales", n,
+                        medir(lambda: api_client.get_ranking_comerciales(comerciales, facturas), self.repeticiones))
+        self._registrar("get_ranking_comerciales (top 10)", n,
+                        medir(lambda: api_client.get_ranking_comerciales(comerciales, facturas, top_n=10), self.repeticiones))
+        self._registrar("get_clientes_por_comercial", len(clientes),
+                        medir(lambda: api_client.get_clientes_por_comercial(comerciales, clientes), self.repeticiones))
+
+        # Informe completo: copia a memoria compartida y agregación sobre las columnas (en el propio proceso)
+        self._registrar("DatasetColumnar", n,
+                        medir(lambda: DatasetColumnar(facturas, clientes).cerrar(), self.repeticiones))
+        columnar = DatasetColumnar(facturas, clientes)
+        self._registrar("generar_informe", n,
+                        medir(lambda: generar_informe(columnar, comerciales, max_procesos=1), self.repeticiones))
+        columnar.cerrar()
+
+        if n <= self.max_filas_tabla:
+            tabla = self._crear_tabla(COLUMNAS_FACTURAS, FORMATOS_FACTURAS)
+
+            def rellenar():
+                tabla.actualizar_datos(facturas)
+                if self.usar_tk:
+                    self._esperar_relleno(tabla)
+            def rellenar_desde_cero():
+                tabla.actualizar_datos([])
+                if self.usar_tk:
+                    self._esperar_relleno(tabla)
+                rellenar()
+            self._registrar("DataTable.actualizar_datos", n, medir(rellenar_desde_cero, self.repeticiones),
+                            tk="real" if self.usar_tk else "simulado")
+
+            # Refresco con cinco facturas modificadas: el diff solo debe tocar esas filas
+            modificadas = list(facturas)
+            for i in range(0, len(modificadas), max(len(modificadas) // 5, 1))[:5]:
+                modificadas[i] = a_modelos('facturas', dict(modificadas[i].a_dict(), estado='cancelada'))
+            def refrescar():
+                # Alterna entre ambas versiones: cada llamada aplica cinco cambios
+                tabla.actualizar_datos(modificadas if tabla.datos is facturas else facturas)
+                if self.usar_tk:
+                    self._esperar_relleno(tabla)
+            self._registrar("DataTable.actualizar_datos (5 cambios)", n, medir(refrescar, self.repeticiones),
+                            tk="real" if self.usar_tk else "simulado")
+            if self.usar_tk:
+                tabla.destroy()
+
+    def bench_cambio_vista(self):
+        # Tiempo de VentanaDashboard.cambiar_vista (construcción + primer pintado con datos locales).
+        if not self.usar_tk:
+            print("  cambiar_vista: omitido (sin display; usar xvfb-run)")
+            return
+        from api import api_client
+        from ui.dashboard import VentanaDashboard
+
+        api_client.login_autenticacion('admin', '1234')
+        for entidad in ('facturas', 'comerciales', 'clientes'):
+            api_client.sincronizar_entidad(entidad)
+        ventana = VentanaDashboard(self.raiz, username="Benchmark")
+        ventana.planificador.detener()
+        ventana.precargador.detener()
+        for nombre_vista in ("Clientes", "Comerciales", "Facturas", "Dashboard"):
+            def cambiar():
+                ventana.cambiar_vista(nombre_vista)
+                ventana.update()
+            self._registrar(f"cambiar_vista({nombre_vista})", self.facturas_servidor, medir(cambiar, self.repeticiones))
+        ventana.destroy()
+
+    def bench_graficos(self):
+        # Gráficos del dashboard a 700x250 px: render con Agg a PNG frente a acierto en la caché de imágenes.
+        from api import api_client
+        from api.modelos import a_modelos
+        from components.grafico_cacheado import CacheGraficos, clave_grafico, renderizar
+        from components.vistadashboard import VistaDashboard, calcular_datos_dashboard
+
+        dataset = generar_dataset(num_facturas=self.facturas_servidor, num_clientes=max(self.facturas_servidor // 20, 100))
+        datos = calcular_datos_dashboard(a_modelos('facturas', api_client._normalizar_datos_desde_api(dataset['facturas'])),
+                                         a_modelos('comerciales', api_client._normalizar_datos_desde_api(dataset['comerciales'])))
+        graficos = (
+            ("ingresos_mensuales", VistaDashboard.create_top_chart, (datos['periodos'], datos['ingresos'])),
+            ("ranking_comerciales", VistaDashboard.create_bar_chart, (datos['nombres'], datos['valores'])),
+            ("estado_facturas", VistaDashboard.create_invoice_status_pie, (datos['conteo_facturas'],)),
+        )
+        cache = CacheGraficos(en_disco=False)
+        for nombre, metodo, datos_grafico in graficos:
+            def dibujar(fig, *valores, metodo=metodo):
+                metodo(None, fig, *valores)
+            clave = clave_grafico(nombre, datos_grafico, 700, 250)
+            cache.guardar(clave, renderizar(dibujar, datos_grafico, 700, 250))
+            self._registrar(f"render gráfico ({nombre})", len(datos_grafico[0]),
+                            medir(lambda: renderizar(dibujar, datos_grafico, 700, 250), self.repeticiones))
+            self._registrar(f"caché gráfico ({nombre})", len(datos_grafico[0]),
+                            medir(lambda: cache.leer_memoria(clave_grafico(nombre, datos_grafico, 700, 250)),
+                                  self.repeticiones))
+
+    def bench_transferencia(self, servidor):
+        # Descarga inicial de facturas (sincronización) con cada combinación de formato y compresión
+        # del servidor: tiempo total, bytes por la red y tiempos de parseo y conversión a modelos.
+        from api import api_client
+
+        for compresion in (False, True):
+            for compacto in (False, True):
+                servidor.compresion, servidor.formatos_compactos = compresion, compacto
+                nombre = f"descarga facturas ({'columnas' if compacto else 'json'}{', comprimido' if compresion else ''})"
+                api_client._peticion_sincronizacion('facturas', {'modifiedSince': '0'})  # caché del servidor
+                api_client.reiniciar_metricas()
+                estadisticas = medir(lambda: api_client._peticion_sincronizacion('facturas', {'modifiedSince': '0'}),
+                                     self.repeticiones, calentamiento=0)
+                metricas = api_client.obtener_metricas()['endpoints']['GET facturas']
+                self._registrar(nombre, self.facturas_servidor, estadisticas,
+                                bytes_por_descarga=metricas['bytes_recibidos'] // estadisticas['repeticiones'],
+                                parseo_ms=metricas['parseo_json']['media_ms'],
+                                conversion_ms=metricas['normalizacion']['media_ms'])
+        servidor.compresion = servidor.formatos_compactos = True
+
+    def bench_arranque(self, url_base):
+        # Intérprete nuevo: importaciones + login + primera carga del dashboard, en frío y con caché local.
+        directorio_cache = tempfile.mkdtemp(prefix="crm_bench_cache_")
+        entorno = dict(os.environ, CRM_BASE_URL=url_base, CRM_CACHE_DIR=directorio_cache,
+                       PYTHONPATH=os.getcwd())
+        for modo in ("frio", "con_cache"):
+            inicio = time.perf_counter()
+            proceso = subprocess.run([sys.executable, "-c", CODIGO_ARRANQUE], env=entorno,
+                                     capture_output=True, text=True)
+            total = time.perf_counter() - inicio
+            if proceso.returncode != 0:
+                print(f"  arranque ({modo}) falló:\n{proceso.stderr}")
+                continue
+            fases = json.loads(proceso.stdout.strip().splitlines()[-1])
+            self._registrar(f"arranque_{modo}", self.facturas_servidor,
+                            {'repeticiones': 1, 'mediana_s': total, 'min_s': total, 'max_s': total}, **fases)
+
+    # --- Ejecución ---
+
+    def ejecutar(self):
+        # El servidor y la caché temporal deben existir antes de importar api_client.
+        print(f"Arrancando servidor simulado con {self.facturas_servidor:,} facturas...")
+        servidor = arrancar_en_segundo_plano(generar_dataset(num_facturas=self.facturas_servidor,
+                                                             num_clientes=max(self.facturas_servidor // 20, 100)))
+        os.environ["CRM_BASE_URL"] = servidor.url_base
+        os.environ["CRM_CACHE_DIR"] = tempfile.mkdtemp(prefix="crm_bench_")
+
+        if self.usar_tk:
+            import customtkinter
+            self.raiz = customtkinter.CTk()
+            self.raiz.withdraw()
+        try:
+            for n in self.tamanos:
+                self.bench_datos(n)
+            print("Gráficos del dashboard:")
+            self.bench_graficos()
+            print("Red (formato y compresión):")
+            self.bench_transferencia(servidor)
+            print("Interfaz y arranque:")
+            self.bench_cambio_vista()
+            self.bench_arranque(servidor.url_base)
+        finally:
+            if self.raiz is not None:
+                self.raiz.destroy()
+            servidor.shutdown()
+
+        return {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'tk': "real" if self.usar_tk else "simulado",
+            'resultados': self.resultados,
+        }
+
+
+def comparar(base, actual, umbral=0.10):
+    # Imprime la relación actual/base por benchmark y devuelve cuántos empeoran más del umbral.
+    previos = {(r['nombre'], r['n']): r for r in base['resultados']}
+    print(f"\nComparación con {base.get('commit') or 'base'} ({base.get('fecha')}):")
+    regresiones = 0
+    for r in actual['resultados']:
+        previo = previos.get((r['nombre'], r['n']))
+        if previo is None or not previo['mediana_s']:
+            continue
+        relacion = r['mediana_s'] / previo['mediana_s']
+        marca = ""
+        if relacion > 1 + umbral:
+            marca = "  << REGRESIÓN"
+            regresiones += 1
+        elif relacion < 1 - umbral:
+            marca = "  mejora"
+        print(f"  {r['nombre']:<34} n={r['n']:<9,} {previo['mediana_s'] * 1000:10.1f} -> "
+              f"{r['mediana_s'] * 1000:10.1f} ms  x{relacion:.2f}{marca}")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del cliente CRM.")
+    parser.add_argument("--tamanos", default=",".join(str(t) for t in TAMANOS_POR_DEFECTO),
+                        help="Números de facturas separados por comas")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--max-filas-tabla", type=int, default=100_000,
+                        help="No medir DataTable por encima de este número de filas")
+    parser.add_argument("--facturas-servidor", type=int, default=50_000,
+                        help="Tamaño del dataset del servidor simulado (cambio de vista y arranque)")
+    parser.add_argument("--sin-tk", action="store_true", help="Forzar el Treeview simulado")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto en benchmarks/resultados/)")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--umbral", type=float, default=0.10, help="Empeoramiento tolerado (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    usar_tk = not args.sin_tk and _tk_disponible()
+    tamanos = [int(t) for t in args.tamanos.split(",") if t.strip()]
+    informe = Suite(tamanos, args.repeticiones, args.max_filas_tabla, usar_tk, args.facturas_servidor).ejecutar()
+
+    salida = args.salida
+    if salida is None:
+        os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+        nombre = f"{datetime.now():%Y%m%d_%H%M%S}_{informe['commit'] or 'sin_commit'}.json"
+        salida = os.path.join(DIRECTORIO_RESULTADOS, nombre)
+    with open(salida, "w", encoding="utf-8") as archivo:
+        json.dump(informe, archivo, ensure_ascii=False, indent=2)
+    print(f"\nResultados guardados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            regresiones = comparar(json.load(archivo), informe, args.umbral)
+        if regresiones:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,118 @@
-from customtkinter import CTkFrame, CTkScrollbar 
+from customtkinter import CTkFrame, CTkScrollbar, CTkProgressBar, CTkLabel, CTkOptionMenu, CTkEntry, ThemeManager
 from tkinter import ttk 
 import tkinter as tk
+import time
+from collections import deque
+from operator import attrgetter
+
+from api.modelos import convertir_fecha
+from components.facetas import IndiceFacetas
+from components.formato import formateadores_columnas
+from components.segundo_plano import ejecutar_en_segundo_plano
+
+# Tiempo máximo (ms) de cada tanda de operaciones sobre el Treeview; entre tandas Tk atiende
+# eventos, así que se puede hacer scroll y seleccionar mientras la tabla se sigue rellenando.
+PRESUPUESTO_TANDA_MS = 8
+# Las filas borradas se envían al Treeview en una sola llamada por lote
+FILAS_POR_BORRADO = 500
+# Con más operaciones pendientes que esto se muestra la barra de progreso
+MINIMO_OPERACIONES_PROGRESO = 2000
+# Con menos filas (y el índice de facetas ya hecho) el diff se calcula directamente en el hilo de Tk
+MINIMO_FILAS_SEGUNDO_PLANO = 1000
+
+# Valor de la opción "Todos" en los menús de facetas
+_TODOS = object()
+
+def _titulo_columna(columna):
+    return columna.replace('_', ' ').title()
 
 class DataTable(CTkFrame):
     # Componente reutilizable para mostrar datos tabulares (Requisito DataTabel).
-    def __init__(self, maestro, columnas, al_seleccionar_item=None, **kwargs):
+    # `facetas`: columnas con filtro por valor (con conteos en vivo); `rangos`: columnas de fecha con filtro desde/hasta.
+    # `formatos`: {columna: tipo} de components.formato (MONEDA, FECHA); solo cambia el texto mostrado.
+    def __init__(self, maestro, columnas, al_seleccionar_item=None, facetas=None, rangos=None, formatos=None, **kwargs):
         super().__init__(maestro, **kwargs)
-        self.columnas = columnas
-        self.al_seleccionar_item = al_seleccionar_item
-        self.datos = []
+        self._iniciar_estado(columnas, al_seleccionar_item, facetas, rangos, formatos)
         
+        # Con filtros: barra de filtros (fila 0), tabla (fila 1) y progreso (fila 2)
+        self._fila_tabla = 1 if self.facetas or self.rangos else 0
         self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(0, weight=1) # La tabla debe expandirse
+        self.grid_rowconfigure(self._fila_tabla, weight=1) # La tabla debe expandirse
 
+        if self._fila_tabla:
+            self._crear_barra_filtros()
         self._crear_vista_tabla()
 
+    @classmethod
+    def sin_interfaz(cls, columnas, arbol, facetas=None, rangos=None, formatos=None):
+        """
+        Tabla sin widgets de CustomTkinter sobre `arbol` (un Treeview o un sustituto con la misma API),
+        con el mismo estado que el constructor. La usan los benchmarks sin display.
+        """
+        tabla = cls.__new__(cls)
+        tabla._iniciar_estado(columnas, None, facetas, rangos, formatos)
+        tabla.arbol = arbol
+        return tabla
+
+    def _iniciar_estado(self, columnas, al_seleccionar_item, facetas, rangos, formatos):
+        # Estado del componente que no depende de los widgets.
+        self.columnas = columnas
+        self.al_seleccionar_item = al_seleccionar_item
+        self.datos = []
+        self.facetas = list(facetas or [])
+        self.rangos = list(rangos or [])
+        self._formateadores = formateadores_columnas(columnas, formatos)
+        # Índice de facetas del dataset actual y filtros activos ({columna: set(valores) | (desde, hasta)})
+        self._indice = None
+        self._filtros = {}
+        # Cada dataset o filtro nuevo invalida el cálculo en segundo plano que siga pendiente
+        self._generacion = 0
+        self._calculando = False
+        # Filas de una descarga en curso ya encoladas por mostrar_parcial
+        self._parciales = 0
+        # Filas mostradas: iid (ID de la primera columna) -> valores. None si no se pueden indexar por ID.
+        self._filas = {}
+        self._filas_destino = {}
+        self._operaciones = deque()
+        self._tarea_tanda = None
+        self._total_operaciones = 0
+        self._operaciones_hechas = 0
+        # Filas ya insertadas por una descarga por lotes: el diff final sigue contando desde ahí
+        self._hechas_parciales = 0
+
+    def _crear_barra_filtros(self):
+        # Un menú por faceta de valores ("valor (n)") y dos campos desde/hasta por rango de fechas.
+        self.marco_filtros = CTkFrame(self, fg_color="transparent")
+        self.marco_filtros.grid(row=0, column=0, sticky="ew", padx=5, pady=(5, 0))
+        self._menus_faceta = {}
+        self._etiquetas_faceta = {}
+        self._campos_rango = {}
+
+        for col in self.facetas:
+            CTkLabel(self.marco_filtros, text=f"{_titulo_columna(col)}:").pack(side="left", padx=(5, 2))
+            menu = CTkOptionMenu(self.marco_filtros, values=["Todos"], width=140, dynamic_resizing=False,
+                                 command=lambda etiqueta, c=col: self._al_elegir_faceta(c, etiqueta))
+            menu.pack(side="left", padx=(0, 10))
+            self._menus_faceta[col] = menu
+
+        for col in self.rangos:
+            CTkLabel(self.marco_filtros, text=f"{_titulo_columna(col)}:").pack(side="left", padx=(5, 2))
+            campos = []
+            for texto in ("Desde AAAA-MM-DD", "Hasta AAAA-MM-DD"):
+                campo = CTkEntry(self.marco_filtros, placeholder_text=texto, width=130)
+                campo.pack(side="left", padx=(0, 5))
+                campo.bind("<Return>", lambda evento, c=col: self._al_cambiar_rango(c))
+                campo.bind("<FocusOut>", lambda evento, c=col: self._al_cambiar_rango(c))
+                campos.append(campo)
+            self._campos_rango[col] = campos
+
+        self.etiqueta_resultados = CTkLabel(self.marco_filtros, text="")
+        self.etiqueta_resultados.pack(side="right", padx=5)
+
     def _crear_vista_tabla(self):
         # Configura el Frame contenedor y el Treeview
         self.marco_tabla = CTkFrame(self)
-        self.marco_tabla.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
+        self.marco_tabla.grid(row=self._fila_tabla, column=0, sticky="nsew", padx=5, pady=5)
         self.marco_tabla.grid_rowconfigure(0, weight=1)
         self.marco_tabla.grid_columnconfigure(0, weight=1)
 
@@ -42,6 +136,14 @@ class DataTable(CTkFrame):
         # Conecta el evento de selección al método handler
         self.arbol.bind('<<TreeviewSelect>>', self._al_seleccionar)
 
+        # Progreso del relleno por tandas (oculto salvo en cargas grandes)
+        self.marco_progreso = CTkFrame(self, fg_color="transparent")
+        self.marco_progreso.grid_columnconfigure(0, weight=1)
+        self.barra_progreso = CTkProgressBar(self.marco_progreso, height=8)
+        self.barra_progreso.grid(row=0, column=0, sticky="ew", padx=(5, 10))
+        self.etiqueta_progreso = CTkLabel(self.marco_progreso, text="")
+        self.etiqueta_progreso.grid(row=0, column=1, sticky="e", padx=5)
+
     def _al_seleccionar(self, evento):
         # Maneja la selección de fila y devuelve el ID (primera columna).
         item_seleccionado = self.arbol.focus()
@@ -53,15 +155,292 @@ class DataTable(CTkFrame):
                 self.al_seleccionar_item(str(valores[0])) 
 
     def actualizar_datos(self, nuevos_datos):
-        # Limpia la tabla y la rellena con los nuevos datos.
-        self.datos = nuevos_datos
-        for item in self.arbol.get_children():
-            self.arbol.delete(item)
-
-        for item in self.datos:
-            # Inserta solo los valores que coinciden con las columnas
-            valores_a_insertar = [item.get(col, "") for col in self.columnas]
-            self.arbol.insert('', tk.END, values=valores_a_insertar)
+        # Muestra un nuevo dataset. Con filtros, el índice de facetas se construye una vez por dataset.
+        if nuevos_datos is not self.datos:
+            self.datos = nuevos_datos
+            self._indice = None
+        self._preparar_filas()
+
+    def mostrar_parcial(self, filas):
+        """
+        Descarga en curso: `filas` es la lista (creciente) de registros recibidos hasta ahora.
+        Las nuevas desde la llamada anterior se añaden al final, sin diff ni facetas; la llamada
+        final a actualizar_datos() reconcilia la tabla con el dataset completo.
+        """
+        if self._filas is None or self._calculando or any(self._filtros.values()):
+            return
+        if not self._operaciones:
+            self._filas_destino = dict(self._filas)
+            if not self._parciales:
+                # Empieza una carga por lotes: el progreso se cuenta desde cero
+                self._total_operaciones = self._operaciones_hechas = 0
+        total = len(filas)
+        nuevas = filas[self._parciales:total]
+        self._parciales = total
+        extraer = self._extractor_valores(nuevas)
+        for item in nuevas:
+            valores = extraer(item)
+            iid = str(valores[0]) if valores else ""
+            if iid and iid not in self._filas_destino:
+                self._operaciones.append(('insertar', iid, valores, len(self._filas_destino)))
+                self._filas_destino[iid] = valores
+                self._total_operaciones += 1
+        if self._tarea_tanda is None and self._operaciones:
+            self._aplicar_tanda()
+
+    # --- Cálculo de las filas visibles (fuera del hilo de Tk) ---
+
+    def _preparar_filas(self):
+        # Índice, filtros, valores de las filas y diff se calculan en segundo plano; el hilo de Tk
+        # solo aplica después las operaciones resultantes, en tandas. Si entretanto llegan otros
+        # datos o filtros, el resultado anterior se descarta (contador de generación).
+        self._interrumpir_tandas()
+        self._generacion += 1
+        # Lo ya insertado por mostrar_parcial cuenta como hecho en el progreso del diff final
+        self._hechas_parciales = self._operaciones_hechas if self._parciales else 0
+        self._parciales = 0
+        generacion = self._generacion
+        # Copia de las filas actuales: el hilo de una generación anterior puede seguir leyendo la suya
+        # mientras las tandas o mostrar_parcial modifican self._filas
+        actuales = dict(self._filas) if self._filas is not None else None
+        datos, indice, filtros = self.datos, self._indice, dict(self._filtros)
+        calcular = lambda: self._calcular_cambios(datos, indice, filtros, actuales)
+        if len(datos) < MINIMO_FILAS_SEGUNDO_PLANO and (indice is not None or not (self.facetas or self.rangos)):
+            # Tablas pequeñas: lanzar un hilo y sondear costaría más que el propio cálculo
+            self._aplicar_cambios(generacion, calcular())
+            return
+        self._calculando = True
+        self._en_segundo_plano(calcular, lambda cambios: self._aplicar_cambios(generacion, cambios),
+                               lambda error: self._al_fallar_calculo(generacion, error))
+
+    def _en_segundo_plano(self, funcion, al_terminar, al_fallar):
+        ejecutar_en_segundo_plano(self, funcion, al_terminar, al_fallar)
+
+    def _al_fallar_calculo(self, generacion, error):
+        # Hilo de Tk: si el diff falla, se muestra el dataset completo (sin filtros) reconstruyendo la tabla.
+        if generacion != self._generacion:
+            return
+        self._calculando = False
+        print(f"ERROR al calcular las filas de la tabla: {error!r}; se reconstruye entera.")
+        self._reconstruir_sin_claves(self.datos)
+
+    def _calcular_cambios(self, datos, indice, filtros, actuales):
+        # Hilo de trabajo: no toca ningún widget. Devuelve (indice, controles, visibles, filas_nuevas, operaciones);
+        # operaciones es None si las filas no tienen un ID único y hay que reconstruir la tabla.
+        controles = None
+        visibles = datos
+        if self.facetas or self.rangos:
+            if indice is None:
+                indice = IndiceFacetas(datos, self.facetas, self.rangos,
+                                       claves={col: convertir_fecha for col in self.rangos})
+            # Intersección de bitsets del índice (sin recorrer las filas)
+            seleccion = indice.seleccion(filtros)
+            if seleccion != indice.todos:
+                visibles = [datos[i] for i in indice.posiciones(seleccion)]
+            # Conteo en vivo de cada valor con el resto de filtros aplicados
+            controles = {col: (indice.valores(col), indice.conteos(col, filtros)) for col in self.facetas}
+
+        filas_nuevas = {}
+        extraer = self._extractor_valores(visibles)
+        for item in visibles:
+            # Solo los valores que coinciden con las columnas
+            valores = extraer(item)
+            filas_nuevas[str(valores[0]) if valores else ""] = valores
+        if "" in filas_nuevas or len(filas_nuevas) != len(visibles):
+            return indice, controles, visibles, None, None
+        return indice, controles, visibles, filas_nuevas, self._calcular_diff(actuales or {}, filas_nuevas)
+
+    def _aplicar_cambios(self, generacion, cambios):
+        # Hilo de Tk: actualiza los controles de filtro y encola las operaciones del diff.
+        if generacion != self._generacion:
+            return
+        self._calculando = False
+        indice, controles, visibles, filas_nuevas, operaciones = cambios
+        if indice is not None and indice is not self._indice:
+            self._indice = indice
+            self._actualizar_limites_rango()
+        if controles is not None:
+            self._actualizar_controles_filtro(controles, len(visibles))
+        self._mostrar_filas(visibles, filas_nuevas, operaciones)
+
+    # --- Filtros por facetas ---
+
+    def _actualizar_controles_filtro(self, controles, num_visibles):
+        # Menús "valor (n)" a partir de los conteos ya calculados.
+        for col, menu in self._menus_faceta.items():
+            valores, conteos = controles[col]
+            etiquetas = {f"Todos ({sum(conteos.values()):,})": _TODOS}
+            for valor in valores:
+                etiquetas[f"{'(vacío)' if valor is None else valor} ({conteos[valor]:,})"] = valor
+            elegidos = self._filtros.get(col)
+            actual = next(iter(etiquetas))
+            if elegidos:
+                valor = next(iter(elegidos))
+                actual = next((e for e, v in etiquetas.items() if v is not _TODOS and v == valor), f"{valor} (0)")
+                etiquetas.setdefault(actual, valor)
+            self._etiquetas_faceta[col] = etiquetas
+            menu.configure(values=list(etiquetas))
+            menu.set(actual)
+        self.etiqueta_resultados.configure(text=f"Mostrando {num_visibles:,} de {len(self.datos):,}")
+
+    def _actualizar_limites_rango(self):
+        # Los campos desde/hasta vacíos muestran la primera y la última fecha del dataset.
+        for col, (campo_desde, campo_hasta) in self._campos_rango.items():
+            minimo, maximo = self._indice.extremos(col)
+            campo_desde.configure(placeholder_text=f"Desde {minimo or 'AAAA-MM-DD'}")
+            campo_hasta.configure(placeholder_text=f"Hasta {maximo or 'AAAA-MM-DD'}")
+
+    def _al_elegir_faceta(self, columna, etiqueta):
+        valor = self._etiquetas_faceta[columna].get(etiqueta, _TODOS)
+        self._filtros[columna] = None if valor is _TODOS else {valor}
+        self._preparar_filas()
+
+    def _al_cambiar_rango(self, columna):
+        # Fechas vacías = extremo abierto; una fecha no válida se marca en rojo y no filtra.
+        extremos = []
+        for campo in self._campos_rango[columna]:
+            texto = campo.get().strip()
+            fecha = convertir_fecha(texto) if texto else None
+            campo.configure(border_color="red" if texto and fecha is None else ThemeManager.theme["CTkEntry"]["border_color"])
+            extremos.append(fecha)
+        filtro = tuple(extremos) if any(extremos) else None
+        if filtro != self._filtros.get(columna):
+            self._filtros[columna] = filtro
+            self._preparar_filas()
+
+    # --- Relleno de la tabla ---
+
+    def _mostrar_filas(self, visibles, filas_nuevas, operaciones):
+        # Aplica el diff por ID (primera columna): solo se tocan las filas nuevas, borradas
+        # o modificadas, y se conservan la selección y el scroll.
+        hechas_parciales, self._hechas_parciales = self._hechas_parciales, 0
+        if operaciones is None:
+            # IDs vacíos o repetidos: no hay clave estable, se reconstruye la tabla entera
+            self._reconstruir_sin_claves(visibles)
+            return
+        if self._filas is None:
+            self.arbol.delete(*self.arbol.get_children())
+            self._filas = {}
+
+        self._operaciones.extend(operaciones)
+        # Tras una carga por lotes, el total incluye lo ya insertado: la barra no retrocede
+        self._operaciones_hechas = hechas_parciales
+        self._total_operaciones = hechas_parciales + sum(len(op[1]) if op[0] == 'borrar' else 1 for op in operaciones)
+        self._filas_destino = filas_nuevas
+        self._aplicar_tanda()
+
+    def _extractor_valores(self, datos):
+        # Con modelos (__slots__) un attrgetter saca toda la fila en C; con dicts, .get por columna.
+        columnas = self.columnas
+        slots = getattr(type(datos[0]), '__slots__', ()) if datos else ()
+        if len(columnas) > 1 and all(col in slots for col in columnas):
+            obtener = attrgetter(*columnas)
+            def extraer(item):
+                if type(item) is not type(datos[0]):
+                    return tuple(item.get(col, "") for col in columnas)
+                valores = obtener(item)
+                return tuple("" if v is None else v for v in valores) if None in valores else valores
+            return extraer
+        return lambda item: tuple(item.get(col, "") for col in columnas)
+
+    def _calcular_diff(self, actuales, nuevas):
+        # Lista de operaciones (borrar, cambiar, insertar, mover) que transforma `actuales` en `nuevas`.
+        operaciones = []
+        eliminados = [iid for iid in actuales if iid not in nuevas]
+        for i in range(0, len(eliminados), FILAS_POR_BORRADO):
+            operaciones.append(('borrar', eliminados[i:i + FILAS_POR_BORRADO]))
+
+        for iid, valores in nuevas.items():
+            previos = actuales.get(iid)
+            if previos is not None and previos != valores:
+                operaciones.append(('cambiar', iid, valores))
+
+        # Insertando en orden ascendente, cada índice es ya su posición final
+        for indice, (iid, valores) in enumerate(nuevas.items()):
+            if iid not in actuales:
+                operaciones.append(('insertar', iid, valores, indice))
+
+        # Si cambia el orden relativo de las filas conservadas, se recolocan todas
+        conservadas_antes = [iid for iid in actuales if iid in nuevas]
+        conservadas_despues = [iid for iid in nuevas if iid in actuales]
+        if conservadas_antes != conservadas_despues:
+            operaciones.extend(('mover', iid, indice) for indice, iid in enumerate(nuevas))
+        return operaciones
+
+    def _aplicar_tanda(self):
+        # Aplica operaciones durante PRESUPUESTO_TANDA_MS y programa el resto para el siguiente tick.
+        self._tarea_tanda = None
+        limite = time.perf_counter() + PRESUPUESTO_TANDA_MS / 1000
+        hechas = 0
+        while self._operaciones and time.perf_counter() < limite:
+            operacion = self._operaciones.popleft()
+            tipo = operacion[0]
+            if tipo == 'borrar':
+                self.arbol.delete(*operacion[1])
+                for iid in operacion[1]:
+                    del self._filas[iid]
+                hechas += len(operacion[1])
+                continue
+            if tipo == 'cambiar':
+                _, iid, valores = operacion
+                self.arbol.item(iid, values=self._formatear(valores))
+                self._filas[iid] = valores
+            elif tipo == 'insertar':
+                _, iid, valores, indice = operacion
+                self.arbol.insert('', indice if indice < len(self._filas) else tk.END, iid=iid,
+                                  values=self._formatear(valores))
+                self._filas[iid] = valores
+            elif tipo == 'mover':
+                self.arbol.move(operacion[1], '', operacion[2])
+            hechas += 1
+
+        self._operaciones_hechas += hechas
+        if self._operaciones:
+            self._tarea_tanda = self.after(1, self._aplicar_tanda)
+        else:
+            # Tabla al día: el orden de las filas es exactamente el de los datos
+            self._filas = self._filas_destino
+        self._actualizar_progreso()
+
+    def _formatear(self, valores):
+        # Texto de una fila al materializarla en el Treeview. El diff trabaja con los valores
+        # sin formatear, así que las filas que no llegan a insertarse nunca se formatean.
+        if not self._formateadores:
+            return valores
+        valores = list(valores)
+        for indice, formatear in self._formateadores:
+            valores[indice] = formatear(valores[indice])
+        return valores
+
+    def _actualizar_progreso(self):
+        # Barra y contador "hechas / total" mientras queden tandas de una carga grande.
+        if not self._operaciones or self._total_operaciones < MINIMO_OPERACIONES_PROGRESO:
+            self.marco_progreso.grid_remove()
+            return
+        self.barra_progreso.set(self._operaciones_hechas / self._total_operaciones)
+        self.etiqueta_progreso.configure(text=f"Cargando {self._operaciones_hechas:,} / {self._total_operaciones:,}")
+        self.marco_progreso.grid(row=self._fila_tabla + 1, column=0, sticky="ew", padx=5, pady=(0, 5))
+
+    def _interrumpir_tandas(self):
+        # Cancela las tandas pendientes; las filas ya aplicadas se toman como estado actual.
+        if self._tarea_tanda is not None:
+            self.after_cancel(self._tarea_tanda)
+            self._tarea_tanda = None
+        if self._operaciones:
+            self._operaciones.clear()
+            if self._filas is not None:
+                self._filas = {iid: self._filas[iid] for iid in self.arbol.get_children()}
+            self._actualizar_progreso()
+
+    def _reconstruir_sin_claves(self, nuevos_datos):
+        self.arbol.delete(*self.arbol.get_children())
+        for item in nuevos_datos:
+            self.arbol.insert('', tk.END, values=self._formatear([item.get(col, "") for col in self.columnas]))
+        self._filas = None
+
+    def destroy(self):
+        self._interrumpir_tandas()
+        super().destroy()
 
     def _ordenar_datos(self, columna):
         # Función placeholder para ordenar datos (requerido en DataTabel).
@@ -0,0 +1,123 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+# ====================================================================
+# --- ÍNDICES DE FACETAS PARA FILTRAR TABLAS ---
+# ====================================================================
+# Facetas de valores: valor -> bitset (un int de Python con un bit por fila).
+# Facetas de rango (fechas): posiciones ordenadas por valor; un rango es un corte por bisect.
+# Combinar filtros es un AND de enteros y contar filas es int.bit_count(): no se recorre la tabla.
+
+
+def _a_bitset(posiciones):
+    # Posiciones ascendentes -> int con esos bits activos (bit i = fila i).
+    # Solo se reserva el tramo entre la primera y la última posición, a un bit por fila.
+    if len(posiciones) == 0:
+        return 0
+    inicio = int(posiciones[0]) & ~7
+    relativas = np.asarray(posiciones, dtype=np.int64) - inicio
+    bytes_ = np.zeros(int(relativas[-1]) // 8 + 1, dtype=np.uint8)
+    np.bitwise_or.at(bytes_, relativas >> 3, np.left_shift(1, relativas & 7).astype(np.uint8))
+    return int.from_bytes(bytes_.tobytes(), 'little') << inicio
+
+
+def _agrupar(codigos, num_grupos):
+    # Posiciones de cada código en una sola pasada: orden estable por código y cortes por conteo.
+    orden = np.argsort(codigos, kind='stable')
+    cortes = np.cumsum(np.bincount(codigos, minlength=num_grupos))[:-1]
+    return np.split(orden, cortes)
+
+
+def _orden_valores(valor):
+    # Orden estable para valores de tipos mezclados; None (vacío) al final.
+    return (valor is None, type(valor).__name__, valor if valor is not None else 0)
+
+
+class IndiceFacetas:
+    """
+    Índice de facetas de un dataset, construido una vez por dataset.
+    `filas` son los registros (modelos o dicts), `columnas` las facetas de valores y `rangos`
+    las de rango. `claves` normaliza el valor de una columna (p. ej. texto -> date).
+
+    Filtros: {columna: set(valores)} para facetas de valores y {columna: (desde, hasta)}
+    para rangos (extremos incluidos, None = abierto).
+    """
+    def __init__(self, filas, columnas=(), rangos=(), claves=None):
+        claves = claves or {}
+        self.total = len(filas)
+        self.todos = (1 << self.total) - 1
+        self.indices = {}
+        self.rangos = {}
+
+        for columna in columnas:
+            # Cada valor distinto recibe un código; los bitsets salen de agrupar los códigos una vez
+            normalizar = claves.get(columna)
+            codigo_por_valor = {}
+            codigos = np.empty(self.total, dtype=np.int64)
+            for posicion, fila in enumerate(filas):
+                valor = fila.get(columna)
+                if normalizar is not None:
+                    valor = normalizar(valor)
+                codigo = codigo_por_valor.get(valor)
+                if codigo is None:
+                    codigo = codigo_por_valor[valor] = len(codigo_por_valor)
+                codigos[posicion] = codigo
+            grupos = _agrupar(codigos, len(codigo_por_valor)) if self.total else []
+            self.indices[columna] = {valor: _a_bitset(grupos[codigo]) for valor, codigo in codigo_por_valor.items()}
+
+        for columna in rangos:
+            normalizar = claves.get(columna)
+            pares = []
+            for posicion, fila in enumerate(filas):
+                valor = fila.get(columna)
+                if normalizar is not None:
+                    valor = normalizar(valor)
+                if valor is not None:
+                    pares.append((valor, posicion))
+            pares.sort()
+            self.rangos[columna] = ([v for v, _ in pares], np.array([p for _, p in pares], dtype=np.int64))
+
+    def valores(self, columna):
+        # Valores distintos de una faceta de valores, ordenados.
+        return sorted(self.indices[columna], key=_orden_valores)
+
+    def extremos(self, columna):
+        # (mínimo, máximo) de una faceta de rango, o (None, None) si está vacía.
+        valores = self.rangos[columna][0]
+        return (valores[0], valores[-1]) if valores else (None, None)
+
+    def _bitset_filtro(self, columna, filtro):
+        if columna in self.rangos:
+            valores, posiciones = self.rangos[columna]
+            desde, hasta = filtro
+            inicio = 0 if desde is None else bisect_left(valores, desde)
+            fin = len(valores) if hasta is None else bisect_right(valores, hasta)
+            return _a_bitset(np.sort(posiciones[inicio:fin]))
+        indice = self.indices[columna]
+        resultado = 0
+        for valor in filtro:
+            resultado |= indice.get(valor, 0)
+        return resultado
+
+    def seleccion(self, filtros, excepto=None):
+        # Bitset de las filas que cumplen todos los filtros (salvo el de `excepto`).
+        resultado = self.todos
+        for columna, filtro in filtros.items():
+            if columna == excepto or filtro is None:
+                continue
+            if columna in self.indices or columna in self.rangos:
+                resultado &= self._bitset_filtro(columna, filtro)
+        return resultado
+
+    def conteos(self, columna, filtros):
+        # Filas por valor de `columna` con el resto de filtros aplicados (conteo en vivo de la faceta).
+        base = self.seleccion(filtros, excepto=columna)
+        return {valor: (bitset & base).bit_count() for valor, bitset in self.indices[columna].items()}
+
+    def posiciones(self, bitset):
+        # Posiciones ascendentes de los bits activos.
+        if bitset == self.todos:
+            return range(self.total)
+        bytes_ = np.frombuffer(bitset.to_bytes((self.total + 7) // 8, 'little'), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(bytes_, bitorder='little')[:self.total]).tolist()
@@ -0,0 +1,66 @@
+import os
+from functools import lru_cache
+
+from api.modelos import convertir_fecha
+
+# ====================================================================
+# --- FORMATO DE IMPORTES Y FECHAS PARA MOSTRAR ---
+# ====================================================================
+# Tablas y KPI muestran importes y fechas según el idioma ("1.500,00 €", "05/01/2025").
+# Hay un formateador por (tipo, idioma), creado una sola vez, y cada uno recuerda en una LRU
+# los últimos valores formateados: en un listado de facturas se repiten mucho los mismos
+# importes y, sobre todo, las mismas fechas. DataTable solo formatea las filas que llega a
+# insertar o cambiar en el Treeview, nunca el dataset entero.
+
+MONEDA = "moneda"
+FECHA = "fecha"
+
+IDIOMA_POR_DEFECTO = os.environ.get("CRM_IDIOMA", "es")
+# Idioma -> (separador de miles, separador decimal, formato de fecha)
+IDIOMAS = {
+    "es": (".", ",", "%d/%m/%Y"),
+    "en": (",", ".", "%Y-%m-%d"),
+}
+SIMBOLO_MONEDA = "€"
+# Valores distintos que recuerda cada formateador
+TAMANO_CACHE_VALORES = 8192
+
+
+def formateador(tipo, idioma=None):
+    """
+    Función valor -> texto para una columna de tipo MONEDA o FECHA en `idioma` (por defecto
+    IDIOMA_POR_DEFECTO). Acepta tanto los valores de los modelos (float, date) como los textos
+    del backend ("1500.00€", "2025-01-05"); lo que no se puede interpretar se muestra tal cual.
+    """
+    return _crear_formateador(tipo, idioma or IDIOMA_POR_DEFECTO)
+
+
+@lru_cache(maxsize=None)
+def _crear_formateador(tipo, idioma):
+    miles, decimal, formato_fecha = IDIOMAS.get(idioma, IDIOMAS["es"])
+    # f"{:,.2f}" siempre usa ',' y '.': se traducen a los separadores del idioma
+    separadores = str.maketrans({",": miles, ".": decimal})
+
+    if tipo == MONEDA:
+        def formatear(valor):
+            if isinstance(valor, str):
+                try: valor = float(valor.replace(SIMBOLO_MONEDA, "").replace(",", ""))
+                except ValueError: return valor
+            elif valor is None:
+                return ""
+            return f"{valor:,.2f}".translate(separadores) + f" {SIMBOLO_MONEDA}"
+    elif tipo == FECHA:
+        def formatear(valor):
+            fecha = convertir_fecha(valor)
+            if fecha is None:
+                return "" if valor is None else str(valor)
+            return fecha.strftime(formato_fecha)
+    else:
+        raise ValueError(f"Tipo de formato desconocido: {tipo}")
+    return lru_cache(maxsize=TAMANO_CACHE_VALORES)(formatear)
+
+
+def formateadores_columnas(columnas, formatos):
+    # [(índice, formateador)] de las columnas de `columnas` que tienen tipo en `formatos` ({columna: tipo}).
+    formatos = formatos or {}
+    return [(indice, formateador(formatos[col])) for indice, col in enumerate(columnas) if col in formatos]
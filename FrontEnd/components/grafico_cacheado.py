@@ -0,0 +1,302 @@
+import hashlib
+import io
+import json
+import math
+import os
+import threading
+import time
+import tkinter as tk
+from collections import OrderedDict
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Wedge
+
+from api.api_client import METRICAS
+from api.cache_local import RUTA_CACHE
+from components.segundo_plano import ejecutar_en_segundo_plano
+
+# ====================================================================
+# --- GRÁFICOS PRE-RENDERIZADOS CON CACHÉ POR HASH DE DATOS ---
+# ====================================================================
+# Cada gráfico se renderiza con Agg (sin pyplot) en un hilo aparte a PNG, y el widget solo
+# muestra ese PNG como PhotoImage. La clave es un hash de (estilo, gráfico, datos, tamaño en píxeles):
+# si no cambian ni los datos ni el tamaño, reabrir el Dashboard es copiar una imagen ya hecha.
+# Las imágenes se guardan en memoria (LRU) y, opcionalmente, en disco junto a la caché local.
+# Con cada imagen van sus zonas pulsables (barras, sectores) en píxeles, para poder hacer clic
+# en una imagen que ya no tiene detrás la figura de matplotlib.
+
+# Subir al cambiar el aspecto de los gráficos: invalida las imágenes guardadas en disco
+VERSION_ESTILO = 2
+DPI = 100
+MAX_MEMORIA = 24
+MAX_ARCHIVOS = 96
+# Redimensionado: se redibuja cuando el tamaño lleva este tiempo quieto...
+RETARDO_REDIMENSION_MS = 150
+# ...o, si el usuario sigue arrastrando el borde, como mucho una vez cada este intervalo
+INTERVALO_MAXIMO_REDIMENSION_MS = 500
+DIRECTORIO_GRAFICOS = os.path.join(RUTA_CACHE, "graficos")
+
+# Agg con figuras independientes sirve fuera del hilo principal, pero el caché de fuentes
+# de matplotlib no está pensado para varios hilos a la vez: se renderiza de uno en uno.
+_CANDADO_RENDER = threading.Lock()
+
+
+def clave_grafico(nombre, datos, ancho, alto):
+    contenido = repr((VERSION_ESTILO, DPI, nombre, datos, ancho, alto)).encode()
+    return hashlib.blake2b(contenido, digest_size=16).hexdigest()
+
+
+def _zona(valor, artista, alto):
+    # Zona pulsable en píxeles del widget (origen arriba a la izquierda).
+    transformar = artista.axes.transData.transform
+    if isinstance(artista, Wedge):
+        cx, cy = transformar(artista.center)
+        borde_x, _ = transformar((artista.center[0] + artista.r, artista.center[1]))
+        return {'valor': valor, 'sector': [float(v) for v in (cx, alto - cy, borde_x - cx, artista.theta1, artista.theta2)]}
+    # Barras: toda la columna del eje, para que también se puedan pulsar las barras bajas
+    caja, ejes = artista.get_window_extent(), artista.axes.bbox
+    return {'valor': valor, 'caja': [float(v) for v in (caja.x0, alto - ejes.y1, caja.x1, alto - ejes.y0)]}
+
+
+def zona_en(zonas, x, y):
+    # Zona que contiene el punto (x, y) del widget, o None.
+    for zona in zonas:
+        if 'caja' in zona:
+            x0, y0, x1, y1 = zona['caja']
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                return zona
+        else:
+            cx, cy, radio, desde, hasta = zona['sector']
+            dx, dy = x - cx, cy - y
+            if dx * dx + dy * dy <= radio * radio:
+                angulo = math.degrees(math.atan2(dy, dx))
+                if (angulo - desde) % 360 <= hasta - desde:
+                    return zona
+    return None
+
+
+def renderizar(dibujar, datos, ancho, alto):
+    """
+    Dibuja `dibujar(fig, *datos)` en una figura del tamaño exacto del widget y devuelve (png, zonas).
+    `dibujar` puede devolver [(valor, artista)] con las barras o sectores pulsables.
+    """
+    fig = Figure(figsize=(ancho / DPI, alto / DPI), dpi=DPI)
+    FigureCanvasAgg(fig)
+    with _CANDADO_RENDER:
+        pulsables = dibujar(fig, *datos) or []
+        salida = io.BytesIO()
+        fig.savefig(salida, format="png", dpi=DPI)
+        # Tras dibujar, los ejes ya tienen sus límites definitivos
+        zonas = [_zona(valor, artista, alto) for valor, artista in pulsables]
+    return salida.getvalue(), zonas
+
+
+class CacheGraficos:
+    """
+    Gráficos renderizados (png, zonas) por clave (ver `clave_grafico`): LRU en memoria y copia opcional
+    en disco (el PNG y sus zonas en un .json al lado).
+    `leer_memoria` es la consulta barata del hilo de Tk; `leer` también mira el disco (en segundo plano).
+    """
+    def __init__(self, ruta_directorio=None, max_memoria=MAX_MEMORIA, en_disco=True, max_archivos=MAX_ARCHIVOS):
+        self.ruta_directorio = ruta_directorio or DIRECTORIO_GRAFICOS
+        self.max_memoria = max_memoria
+        self.en_disco = en_disco
+        self.max_archivos = max_archivos
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _ruta(self, clave, extension=".png"):
+        return os.path.join(self.ruta_directorio, f"{clave}{extension}")
+
+    def leer_memoria(self, clave):
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                self._memoria.move_to_end(clave)
+        METRICAS.registrar_cache('gráficos (memoria)', entrada is not None)
+        return entrada
+
+    def leer(self, clave):
+        entrada = self.leer_memoria(clave)
+        if entrada is not None or not self.en_disco:
+            return entrada
+        try:
+            with open(self._ruta(clave), "rb") as archivo:
+                png = archivo.read()
+            with open(self._ruta(clave, ".json"), "rb") as archivo:
+                entrada = (png, json.loads(archivo.read()))
+        except (OSError, ValueError):
+            entrada = None
+        METRICAS.registrar_cache('gráficos (disco)', entrada is not None)
+        if entrada is not None:
+            self._guardar_memoria(clave, entrada)
+        return entrada
+
+    def guardar(self, clave, entrada):
+        self._guardar_memoria(clave, entrada)
+        if not self.en_disco:
+            return
+        png, zonas = entrada
+        try:
+            os.makedirs(self.ruta_directorio, exist_ok=True)
+            # Primero las zonas: un PNG en disco siempre tiene su .json
+            for extension, contenido in ((".json", json.dumps(zonas).encode("utf-8")), (".png", png)):
+                temporal = self._ruta(clave, extension) + ".tmp"
+                with open(temporal, "wb") as archivo:
+                    archivo.write(contenido)
+                os.replace(temporal, self._ruta(clave, extension))
+            self._podar_disco()
+        except OSError as e:
+            print(f"AVISO: No se pudo guardar el gráfico en disco: {e}")
+
+    def _guardar_memoria(self, clave, entrada):
+        with self._lock:
+            self._memoria[clave] = entrada
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.max_memoria:
+                self._memoria.popitem(last=False)
+
+    def _podar_disco(self):
+        # Conserva solo las `max_archivos` imágenes usadas más recientemente.
+        archivos = [os.path.join(self.ruta_directorio, n) for n in os.listdir(self.ruta_directorio) if n.endswith(".png")]
+        if len(archivos) <= self.max_archivos:
+            return
+        archivos.sort(key=os.path.getmtime)
+        for ruta in archivos[:-self.max_archivos]:
+            for ruta_archivo in (ruta, ruta[:-len(".png")] + ".json"):
+                try:
+                    os.remove(ruta_archivo)
+                except OSError:
+                    pass
+
+    def vaciar(self):
+        with self._lock:
+            self._memoria.clear()
+
+
+CACHE_GRAFICOS = CacheGraficos()
+
+
+class GraficoCacheado(tk.Canvas):
+    """
+    Lienzo que muestra un gráfico como imagen. `dibujar(fig, *datos)` pinta sobre una Figure de
+    matplotlib; solo se llama (en un hilo aparte) cuando no hay imagen en caché para esos datos
+    y ese tamaño. Mientras tanto se mantiene la imagen anterior. Con `al_pulsar`, un clic sobre
+    una zona pulsable (barra, sector) llama a `al_pulsar(valor)`.
+
+    Los <Configure> de un arrastre se agrupan: solo se redibuja cuando el tamaño en píxeles
+    cambia de verdad y, o bien se queda quieto `RETARDO_REDIMENSION_MS`, o bien han pasado
+    `INTERVALO_MAXIMO_REDIMENSION_MS` desde el primer evento sin atender.
+    """
+    def __init__(self, master, nombre, dibujar, datos, cache=None, fondo="#FFFFFF", al_pulsar=None, **kwargs):
+        super().__init__(master, width=1, height=1, bg=fondo, highlightthickness=0, bd=0, **kwargs)
+        self.nombre = nombre
+        self.dibujar = dibujar
+        self.datos = datos
+        self.cache = cache or CACHE_GRAFICOS
+        self.al_pulsar = al_pulsar
+
+        self._imagen = None          # PhotoImage mostrada (hay que conservar la referencia)
+        self._id_imagen = self.create_image(0, 0, anchor="nw")
+        self._zonas = []
+        self._clave_mostrada = None
+        self._clave_en_curso = None
+        self._tamano_pendiente = None
+        self._tamano = None              # último tamaño atendido
+        self._tamano_redimension = None  # último tamaño recibido durante un arrastre
+        self._id_redimension = None
+        self._inicio_redimension = None
+        self.bind("<Configure>", self._al_redimensionar)
+        if al_pulsar is not None:
+            self.bind("<Motion>", self._al_mover)
+            self.bind("<Button-1>", self._al_hacer_clic)
+
+    def _al_mover(self, evento):
+        self.configure(cursor="hand2" if zona_en(self._zonas, evento.x, evento.y) else "")
+
+    def _al_hacer_clic(self, evento):
+        zona = zona_en(self._zonas, evento.x, evento.y)
+        if zona is not None:
+            self.al_pulsar(zona['valor'])
+
+    def _al_redimensionar(self, evento):
+        tamano = (evento.width, evento.height)
+        if tamano == self._tamano and self._id_redimension is None:
+            return  # Solo se ha movido, o el evento no cambia los píxeles
+        if self._clave_mostrada is None:
+            self.actualizar(*tamano)  # Primer pintado: sin esperas
+            return
+
+        self._tamano_redimension = tamano
+        if self._id_redimension is not None:
+            self.after_cancel(self._id_redimension)
+        ahora = time.monotonic()
+        if self._inicio_redimension is None:
+            self._inicio_redimension = ahora
+        transcurrido_ms = (ahora - self._inicio_redimension) * 1000
+        retardo = 0 if transcurrido_ms >= INTERVALO_MAXIMO_REDIMENSION_MS else RETARDO_REDIMENSION_MS
+        self._id_redimension = self.after(retardo, self._aplicar_redimension)
+
+    def _aplicar_redimension(self):
+        self._id_redimension = None
+        self._inicio_redimension = None
+        self.actualizar(*self._tamano_redimension)
+
+    def destroy(self):
+        # El Dashboard se reconstruye en cada refresco: no dejamos redibujados programados huérfanos
+        if self._id_redimension is not None:
+            self.after_cancel(self._id_redimension)
+            self._id_redimension = None
+        super().destroy()
+
+    def actualizar(self, ancho, alto):
+        # Muestra la imagen para este tamaño: al instante si está en memoria, si no la renderiza.
+        if ancho < 2 or alto < 2:
+            return
+        self._tamano = (ancho, alto)
+        clave = clave_grafico(self.nombre, self.datos, ancho, alto)
+        if clave in (self._clave_mostrada, self._clave_en_curso):
+            return
+        entrada = self.cache.leer_memoria(clave)
+        if entrada is not None:
+            self._tamano_pendiente = None
+            self._mostrar(clave, entrada)
+            return
+        if self._clave_en_curso is not None:
+            # Un render a la vez por gráfico: el último tamaño pedido se atiende al terminar
+            self._tamano_pendiente = (ancho, alto)
+            return
+        self._renderizar(clave, ancho, alto)
+
+    def _renderizar(self, clave, ancho, alto):
+        self._clave_en_curso = clave
+
+        def _trabajo():
+            entrada = self.cache.leer(clave)
+            if entrada is None:
+                entrada = renderizar(self.dibujar, self.datos, ancho, alto)
+                self.cache.guardar(clave, entrada)
+            return entrada
+
+        def _al_terminar(entrada):
+            self._clave_en_curso = None
+            # Si entretanto cambió el tamaño, la imagen ya no vale (salvo que no haya ninguna)
+            if self._tamano == (ancho, alto) or self._clave_mostrada is None:
+                self._mostrar(clave, entrada)
+            if self._tamano_pendiente is not None:
+                ancho_pendiente, alto_pendiente = self._tamano_pendiente
+                self._tamano_pendiente = None
+                self.actualizar(ancho_pendiente, alto_pendiente)
+
+        def _al_fallar(error):
+            self._clave_en_curso = None
+            print(f"ERROR al renderizar el gráfico '{self.nombre}': {error}")
+
+        ejecutar_en_segundo_plano(self, _trabajo, _al_terminar, _al_fallar)
+
+    def _mostrar(self, clave, entrada):
+        png, self._zonas = entrada
+        self._imagen = tk.PhotoImage(master=self, data=png)
+        self.itemconfigure(self._id_imagen, image=self._imagen)
+        self._clave_mostrada = clave
@@ -0,0 +1,52 @@
+from customtkinter import CTkToplevel, CTkFrame, CTkButton, CTkTextbox, CTkFont
+
+from api import api_client
+from api.metricas import formatear_resumen
+
+# Cada cuánto se repinta el panel mientras está abierto
+INTERVALO_REFRESCO_MS = 2000
+
+
+class PanelDiagnostico(CTkToplevel):
+    """
+    Panel oculto de diagnóstico (Ctrl+Shift+D en el Dashboard) con las métricas del cliente API:
+    latencias por endpoint, bytes, tiempos de parseo/normalización, cachés y errores.
+    """
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.title("Diagnóstico - Cliente API")
+        self.geometry("900x420")
+        self.transient(master)
+
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.texto = CTkTextbox(self, font=CTkFont(family="Courier", size=12), wrap="none")
+        self.texto.grid(row=0, column=0, sticky="nsew", padx=10, pady=(10, 5))
+
+        marco_botones = CTkFrame(self, fg_color="transparent")
+        marco_botones.grid(row=1, column=0, sticky="e", padx=10, pady=(0, 10))
+        CTkButton(marco_botones, text="Reiniciar", fg_color="gray", command=self._reiniciar).pack(side="right", padx=5)
+        CTkButton(marco_botones, text="Cerrar", command=self.destroy).pack(side="right", padx=5)
+
+        self._actualizar()
+
+    def _actualizar(self):
+        # Repinta el resumen y se reprograma mientras la ventana exista.
+        if not self.winfo_exists():
+            return
+        self._pintar()
+        self.after(INTERVALO_REFRESCO_MS, self._actualizar)
+
+    def _pintar(self):
+        resumen = formatear_resumen(api_client.obtener_metricas())
+        if api_client.esta_sin_conexion():
+            resumen = "MODO SIN CONEXIÓN (datos desde la caché local)\n\n" + resumen
+        self.texto.configure(state="normal")
+        self.texto.delete("1.0", "end")
+        self.texto.insert("1.0", resumen)
+        self.texto.configure(state="disabled")
+
+    def _reiniciar(self):
+        api_client.reiniciar_metricas()
+        self._pintar()
@@ -0,0 +1,146 @@
+import time
+import tkinter as tk
+
+from components.segundo_plano import ejecutar_asincrono, ejecutar_en_segundo_plano
+
+
+class PlanificadorRefresco:
+    """
+    Refresca periódicamente la vista visible de una ventana sin bloquear Tk.
+
+    La vista debe ofrecer:
+      - obtener_datos_refresco(): se ejecuta en un hilo aparte y devuelve (firma, datos); o bien
+        obtener_datos_refresco_asincrono(), corutina que corre en el bucle de api.aio (sin hilo propio).
+      - aplicar_refresco((firma, datos)): se ejecuta en el hilo de Tk y guarda `firma_datos`.
+    Solo se toca la interfaz si la firma (versión del dataset) ha cambiado.
+
+    El intervalo es adaptativo: se duplica mientras no hay cambios ni actividad del usuario
+    (hasta `intervalo_max_ms`), pasa al máximo si la ventana está minimizada y vuelve
+    al intervalo base en cuanto hay cambios o el usuario interactúa.
+    """
+    def __init__(self, ventana, obtener_vista, intervalo_base_ms=15000, intervalo_max_ms=300000, inactividad_ms=120000):
+        self.ventana = ventana
+        self.obtener_vista = obtener_vista
+        self.intervalo_base_ms = intervalo_base_ms
+        self.intervalo_max_ms = intervalo_max_ms
+        self.inactividad_ms = inactividad_ms
+
+        self.intervalo_actual_ms = intervalo_base_ms
+        self._id_after = None
+        self._en_curso = False
+        # refrescar_pronto() llegó con un refresco en curso: se repite en cuanto este termine
+        self._pendiente = False
+        self._activo = False
+        self._ultima_actividad = time.monotonic()
+
+        # Cualquier evento dentro de la ventana cuenta como actividad del usuario
+        for evento in ('<Motion>', '<Any-KeyPress>', '<Any-ButtonPress>'):
+            self.ventana.bind(evento, self.registrar_actividad, add='+')
+
+    # --- Ciclo de vida ---
+
+    def iniciar(self):
+        self._activo = True
+        self._programar(self.intervalo_base_ms)
+
+    def detener(self):
+        self._activo = False
+        if self._id_after is not None:
+            try:
+                self.ventana.after_cancel(self._id_after)
+            except tk.TclError:
+                pass
+            self._id_after = None
+
+    def refrescar_pronto(self):
+        # Fuerza un refresco inmediato (p. ej. justo después de cambiar de vista). Si hay uno en curso
+        # (quizá de la vista anterior), el nuevo sale en cuanto termine, sin esperar al intervalo.
+        self.intervalo_actual_ms = self.intervalo_base_ms
+        if self._en_curso:
+            self._pendiente = True
+        else:
+            self._programar(0)
+
+    def registrar_actividad(self, evento=None):
+        estaba_inactivo = self._usuario_inactivo()
+        self._ultima_actividad = time.monotonic()
+        if estaba_inactivo:
+            # El usuario vuelve tras un rato inactivo: refrescamos ya
+            self.refrescar_pronto()
+        else:
+            self.intervalo_actual_ms = self.intervalo_base_ms
+
+    # --- Lógica interna ---
+
+    def _programar(self, retardo_ms):
+        if not self._activo:
+            return
+        if self._id_after is not None:
+            try:
+                self.ventana.after_cancel(self._id_after)
+            except tk.TclError:
+                pass
+        self._id_after = self.ventana.after(retardo_ms, self._tick)
+
+    def _usuario_inactivo(self):
+        return (time.monotonic() - self._ultima_actividad) * 1000 >= self.inactividad_ms
+
+    def _ventana_minimizada(self):
+        try:
+            return self.ventana.state() in ('iconic', 'withdrawn')
+        except tk.TclError:
+            return True
+
+    def _tick(self):
+        self._id_after = None
+
+        vista = self.obtener_vista()
+        asincrona = hasattr(vista, 'obtener_datos_refresco_asincrono')
+        if self._en_curso or vista is None or not (asincrona or hasattr(vista, 'obtener_datos_refresco')):
+            self._programar(self.intervalo_actual_ms)
+            return
+
+        if self._ventana_minimizada():
+            # Minimizada: refrescamos al ritmo más lento posible
+            self.intervalo_actual_ms = self.intervalo_max_ms
+            self._programar(self.intervalo_actual_ms)
+            return
+
+        self._en_curso = True
+        self._pendiente = False
+        # El sondeo se ancla a la ventana (no a la vista) para recibir siempre la respuesta
+        al_recibir = lambda resultado: self._al_recibir(vista, resultado)
+        if asincrona:
+            ejecutar_asincrono(self.ventana, vista.obtener_datos_refresco_asincrono(), al_recibir, self._al_fallar)
+        else:
+            ejecutar_en_segundo_plano(self.ventana, vista.obtener_datos_refresco, al_recibir, self._al_fallar)
+
+    def _al_recibir(self, vista, resultado):
+        self._en_curso = False
+        firma, _ = resultado
+        try:
+            vista_viva = vista.winfo_exists() and vista is self.obtener_vista()
+        except tk.TclError:
+            vista_viva = False
+
+        if vista_viva and firma != getattr(vista, 'firma_datos', None):
+            vista.aplicar_refresco(resultado)
+            self.intervalo_actual_ms = self.intervalo_base_ms
+        elif self._usuario_inactivo():
+            # Sin cambios y usuario inactivo: espaciamos los refrescos (backoff exponencial)
+            self.intervalo_actual_ms = min(self.intervalo_actual_ms * 2, self.intervalo_max_ms)
+        self._programar_siguiente()
+
+    def _al_fallar(self, error):
+        self._en_curso = False
+        print(f"ERROR en el refresco automático: {error}")
+        self.intervalo_actual_ms = min(self.intervalo_actual_ms * 2, self.intervalo_max_ms)
+        self._programar_siguiente()
+
+    def _programar_siguiente(self):
+        # Tras un refresco: inmediato si se pidió otro mientras tanto, si no al intervalo actual.
+        if self._pendiente:
+            self._pendiente = False
+            self._programar(0)
+        else:
+            self._programar(self.intervalo_actual_ms)
@@ -0,0 +1,184 @@
+import heapq
+import itertools
+import threading
+import time
+import tkinter as tk
+
+from api import api_client
+
+# Prioridades de la cola (menor = antes). La vista pulsada no pasa por la cola: se carga en su propio
+# hilo y, al navegar, se descartan las precargas especulativas pendientes.
+PRIORIDAD_HOVER = 1
+PRIORIDAD_INACTIVIDAD = 2
+
+
+class Precargador:
+    """
+    Precarga especulativa de los datos de las vistas del panel lateral.
+
+    Al pasar el ratón por un botón (tras `retardo_hover_ms`) o tras un rato sin actividad después
+    del login, las entidades de esa vista se sincronizan en un hilo de baja prioridad con
+    `api_client.sincronizar_entidad`. Así, al pulsar, `obtener_datos_locales` ya tiene el dataset
+    al día y la sincronización de la vista es un delta vacío.
+
+    La cola es un heap de (prioridad, secuencia, entidad). Salir del botón cancela lo que aún no
+    ha empezado; navegar vacía la cola y pausa la precarga `pausa_navegacion_ms` para no competir
+    con la carga de la vista pulsada.
+    """
+    def __init__(self, ventana, entidades_por_vista, retardo_hover_ms=250, retardo_inactividad_ms=3000,
+                 pausa_navegacion_ms=2000, vigencia_s=30):
+        self.ventana = ventana
+        self.entidades_por_vista = entidades_por_vista
+        self.retardo_hover_ms = retardo_hover_ms
+        self.retardo_inactividad_ms = retardo_inactividad_ms
+        self.pausa_navegacion_ms = pausa_navegacion_ms
+        self.vigencia_s = vigencia_s
+
+        self._cola = []
+        self._pendientes = {}        # entidad -> entrada viva en la cola
+        self._secuencia = itertools.count()
+        self._condicion = threading.Condition()
+        self._pausado_hasta = 0.0
+        self._ultima_precarga = {}   # entidad -> instante de la última precarga
+        self._afters_hover = {}      # vista -> id de after() pendiente
+        self._id_inactividad = None
+        self._activo = False
+        self._hilo = None
+
+    # --- Ciclo de vida ---
+
+    def iniciar(self):
+        self._activo = True
+        self._hilo = threading.Thread(target=self._trabajar, daemon=True)
+        self._hilo.start()
+        self._id_inactividad = self.ventana.after(self.retardo_inactividad_ms, self._precargar_inactivo)
+
+    def detener(self):
+        self._activo = False
+        self._cancelar_afters()
+        with self._condicion:
+            self._vaciar_cola()
+            self._condicion.notify()
+
+    # --- Eventos de la interfaz (hilo de Tk) ---
+
+    def vincular(self, boton, vista):
+        # Engancha el hover de un botón de navegación sin quitar el efecto visual de CustomTkinter.
+        boton.bind('<Enter>', lambda event: self.al_entrar(vista), add='+')
+        boton.bind('<Leave>', lambda event: self.al_salir(vista), add='+')
+
+    def al_entrar(self, vista):
+        if not self._activo or vista in self._afters_hover:
+            return
+        self._afters_hover[vista] = self.ventana.after(self.retardo_hover_ms,
+                                                       lambda: self._precargar_hover(vista))
+
+    def al_salir(self, vista):
+        # El usuario se va a otro sitio: cancelamos lo que aún no ha empezado para esa vista.
+        id_after = self._afters_hover.pop(vista, None)
+        if id_after is not None:
+            self._cancelar_after(id_after)
+        with self._condicion:
+            for entidad in self.entidades_por_vista.get(vista, ()):
+                entrada = self._pendientes.get(entidad)
+                if entrada is not None and entrada[0] == PRIORIDAD_HOVER:
+                    self._descartar(entidad)
+
+    def al_navegar(self, vista):
+        """
+        La vista pulsada tiene preferencia: se descartan las precargas especulativas pendientes y
+        la cola queda en pausa un momento. Si ya se estaba precargando esa vista, su sincronización
+        comparte la petición en curso del mismo endpoint en lugar de repetirla.
+        """
+        self._cancelar_afters()
+        with self._condicion:
+            self._vaciar_cola()
+            self._pausado_hasta = time.monotonic() + self.pausa_navegacion_ms / 1000
+        # Las entidades de la vista pulsada las acaba de cargar la propia vista
+        ahora = time.monotonic()
+        for entidad in self.entidades_por_vista.get(vista, ()):
+            self._ultima_precarga[entidad] = ahora
+        if self._activo:
+            self._id_inactividad = self.ventana.after(self.pausa_navegacion_ms + self.retardo_inactividad_ms,
+                                                      self._precargar_inactivo)
+
+    def _precargar_hover(self, vista):
+        self._afters_hover.pop(vista, None)
+        self.encolar(self.entidades_por_vista.get(vista, ()), PRIORIDAD_HOVER)
+
+    def _precargar_inactivo(self):
+        # Tras el login (o tras navegar) precargamos el resto de vistas con la prioridad más baja.
+        self._id_inactividad = None
+        entidades = [e for entidades in self.entidades_por_vista.values() for e in entidades]
+        self.encolar(dict.fromkeys(entidades), PRIORIDAD_INACTIVIDAD)
+
+    # --- Cola de prioridad ---
+
+    def encolar(self, entidades, prioridad):
+        ahora = time.monotonic()
+        with self._condicion:
+            for entidad in entidades:
+                if ahora - self._ultima_precarga.get(entidad, float('-inf')) < self.vigencia_s:
+                    continue  # Recién sincronizada: nada que ganar
+                entrada = self._pendientes.get(entidad)
+                if entrada is not None:
+                    if entrada[0] <= prioridad:
+                        continue
+                    self._descartar(entidad)
+                entrada = [prioridad, next(self._secuencia), entidad]
+                self._pendientes[entidad] = entrada
+                heapq.heappush(self._cola, entrada)
+            self._condicion.notify()
+
+    def _descartar(self, entidad):
+        # Borrado perezoso: la entrada queda en el heap marcada como cancelada (entidad None).
+        entrada = self._pendientes.pop(entidad)
+        entrada[-1] = None
+
+    def _vaciar_cola(self):
+        self._cola.clear()
+        self._pendientes.clear()
+
+    def _siguiente(self):
+        # Espera (bajo la condición) la siguiente entidad viva; None al detener.
+        while self._activo:
+            espera = self._pausado_hasta - time.monotonic()
+            if espera > 0:
+                self._condicion.wait(espera)
+                continue
+            while self._cola and self._cola[0][-1] is None:
+                heapq.heappop(self._cola)
+            if self._cola:
+                entidad = heapq.heappop(self._cola)[-1]
+                del self._pendientes[entidad]
+                return entidad
+            self._condicion.wait()
+        return None
+
+    def _trabajar(self):
+        while True:
+            with self._condicion:
+                entidad = self._siguiente()
+            if entidad is None:
+                return
+            self._ultima_precarga[entidad] = time.monotonic()
+            try:
+                api_client.sincronizar_entidad(entidad)
+            except Exception as e:
+                print(f"AVISO: Fallo al precargar '{entidad}': {e}")
+
+    # --- Utilidades ---
+
+    def _cancelar_after(self, id_after):
+        try:
+            self.ventana.after_cancel(id_after)
+        except tk.TclError:
+            pass
+
+    def _cancelar_afters(self):
+        for id_after in self._afters_hover.values():
+            self._cancelar_after(id_after)
+        self._afters_hover.clear()
+        if self._id_inactividad is not None:
+            self._cancelar_after(self._id_inactividad)
+            self._id_inactividad = None
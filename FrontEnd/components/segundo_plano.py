@@ -0,0 +1,94 @@
+import threading
+import queue
+import tkinter as tk
+
+from api import aio
+
+# Intervalo (ms) con el que el hilo de Tk revisa si el trabajo ha terminado.
+INTERVALO_SONDEO_MS = 50
+
+
+def ejecutar_en_segundo_plano(widget, funcion, al_terminar=None, al_fallar=None, al_progreso=None):
+    """
+    Ejecuta `funcion()` en un hilo aparte y entrega el resultado
+    a `al_terminar(resultado)` dentro del hilo de Tk (Tk no admite llamadas desde otros hilos).
+    Con `al_progreso`, la función recibe `notificar(*datos)` y el último progreso notificado
+    llega a `al_progreso(*datos)` en el hilo de Tk en cada sondeo.
+    Si el widget se destruye antes de terminar, el resultado se descarta.
+    """
+    cola_resultado = queue.Queue(maxsize=1)
+    ultimo_progreso = []
+
+    def _notificar(*datos):
+        ultimo_progreso[:] = [datos]
+
+    def _trabajo():
+        try:
+            cola_resultado.put((True, funcion(_notificar) if al_progreso else funcion()))
+        except Exception as e:
+            cola_resultado.put((False, e))
+
+    def _sondear():
+        try:
+            if not widget.winfo_exists():
+                return
+        except tk.TclError:
+            return
+
+        if ultimo_progreso:
+            # Solo interesa el más reciente: los intermedios se descartan
+            datos = ultimo_progreso.pop()
+            al_progreso(*datos)
+
+        try:
+            exito, valor = cola_resultado.get_nowait()
+        except queue.Empty:
+            widget.after(INTERVALO_SONDEO_MS, _sondear)
+            return
+
+        if exito:
+            if al_terminar: al_terminar(valor)
+        elif al_fallar:
+            al_fallar(valor)
+        else:
+            print(f"ERROR en tarea de segundo plano: {valor}")
+
+    hilo = threading.Thread(target=_trabajo, daemon=True)
+    hilo.start()
+    widget.after(INTERVALO_SONDEO_MS, _sondear)
+    return hilo
+
+
+def ejecutar_asincrono(widget, corutina, al_terminar=None, al_fallar=None):
+    """
+    Lanza `corutina` (p. ej. api_client.aio.obtener_clientes()) en el bucle asyncio auxiliar
+    y entrega el resultado a `al_terminar(resultado)` en el hilo de Tk, sondeando con after().
+    Varias corutinas lanzadas a la vez comparten el bucle: no se crea un hilo por petición.
+    """
+    futuro = aio.lanzar(corutina)
+
+    def _sondear():
+        try:
+            if not widget.winfo_exists():
+                futuro.cancel()
+                return
+        except tk.TclError:
+            futuro.cancel()
+            return
+
+        if not futuro.done():
+            widget.after(INTERVALO_SONDEO_MS, _sondear)
+            return
+        if futuro.cancelled():
+            return
+
+        error = futuro.exception()
+        if error is None:
+            if al_terminar: al_terminar(futuro.result())
+        elif al_fallar:
+            al_fallar(error)
+        else:
+            print(f"ERROR en tarea asíncrona: {error}")
+
+    widget.after(INTERVALO_SONDEO_MS, _sondear)
+    return futuro
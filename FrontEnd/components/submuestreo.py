@@ -0,0 +1,77 @@
+import math
+
+import numpy as np
+
+# ====================================================================
+# --- SUBMUESTREO DE SERIES PARA GRÁFICOS ---
+# ====================================================================
+# Una línea no puede mostrar más detalle que píxeles tiene: por encima de ~1 punto cada
+# `PIXELES_POR_PUNTO` px la serie se reduce con Largest-Triangle-Three-Buckets (LTTB), que conserva
+# picos y valles, y las etiquetas del eje X se aclaran para que no se monten. Así el coste de
+# dibujar depende del ancho del gráfico y no de la longitud de la serie.
+
+PIXELES_POR_PUNTO = 2
+# Por debajo de esta separación (px) entre puntos no se dibujan marcadores
+PIXELES_POR_MARCADOR = 12
+# Ancho aproximado que ocupa una etiqueta de periodo girada ("ene 2024")
+PIXELES_POR_ETIQUETA = 50
+
+
+def lttb(x, y, puntos):
+    """
+    Índices de los `puntos` elementos que conserva LTTB (siempre el primero y el último).
+    Si la serie ya cabe, devuelve todos los índices.
+    El vértice fijo de cada triángulo es la media del cubo anterior (en lugar del punto elegido en él):
+    así ningún cubo depende del anterior y todos se evalúan a la vez con NumPy, sin bucle en Python.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if puntos >= n or puntos < 3:
+        return np.arange(n)
+
+    # Cubos intermedios [inicios[i], fines[i]) de tamaño ~`cada`; el primero y el último punto van aparte
+    cada = (n - 2) / (puntos - 2)
+    limites = (np.floor(np.arange(puntos - 1) * cada) + 1).astype(np.intp)
+    limites[-1] = n - 1
+    inicios, fines = limites[:-1], limites[1:]
+    tamanos = fines - inicios
+    medias_x = np.add.reduceat(x[1:n - 1], inicios - 1) / tamanos
+    medias_y = np.add.reduceat(y[1:n - 1], inicios - 1) / tamanos
+
+    # Vértices de cada triángulo: media del cubo anterior (o el primer punto) y del siguiente (o el último)
+    anterior_x = np.concatenate(([x[0]], medias_x[:-1]))
+    anterior_y = np.concatenate(([y[0]], medias_y[:-1]))
+    siguiente_x = np.concatenate((medias_x[1:], [x[-1]]))
+    siguiente_y = np.concatenate((medias_y[1:], [y[-1]]))
+
+    # El doble del área es lineal en el candidato: |a·y + b·x + c| con a, b, c propios de cada cubo
+    a = np.repeat(anterior_x - siguiente_x, tamanos)
+    b = np.repeat(siguiente_y - anterior_y, tamanos)
+    c = np.repeat(anterior_y * (siguiente_x - anterior_x) - anterior_x * (siguiente_y - anterior_y), tamanos)
+    areas = np.abs(a * y[1:n - 1] + b * x[1:n - 1] + c)
+
+    # Primer máximo de cada cubo: posiciones que igualan el máximo del cubo, quedándose con la primera
+    maximos = np.repeat(np.maximum.reduceat(areas, inicios - 1), tamanos)
+    candidatos = np.flatnonzero(areas == maximos) + 1
+    primeros = np.searchsorted(candidatos, inicios)
+
+    indices = np.empty(puntos, dtype=np.intp)
+    indices[0], indices[-1] = 0, n - 1
+    indices[1:-1] = candidatos[primeros]
+    return indices
+
+
+def puntos_para_ancho(ancho_px):
+    return max(3, int(ancho_px // PIXELES_POR_PUNTO))
+
+
+def indices_etiquetas(n, ancho_px):
+    # Posiciones (de 0 a n-1) que llevan etiqueta: repartidas con paso fijo y sin solaparse.
+    maximo = max(2, int(ancho_px // PIXELES_POR_ETIQUETA))
+    paso = max(1, math.ceil(n / maximo))
+    return np.arange(0, n, paso)
+
+
+def con_marcadores(puntos, ancho_px):
+    return puntos * PIXELES_POR_MARCADOR <= ancho_px
@@ -0,0 +1,36 @@
+from customtkinter import CTkToplevel, CTkTabview, CTkButton
+
+from components.data_table import DataTable
+from components.formato import MONEDA, FECHA
+
+COLUMNAS_FACTURAS = ["factura_id", "cliente_id", "comercial_id", "fecha_emision", "estado", "total"]
+COLUMNAS_CLIENTES = ["cliente_id", "nombre", "apellidos", "edad", "email", "telefono", "direccion", "comercial_id"]
+FORMATOS_COLUMNAS = {"fecha_emision": FECHA, "total": MONEDA}
+
+
+class VentanaDetalle(CTkToplevel):
+    """
+    Detalle (drill-down) de un elemento del dashboard: una pestaña con un DataTable por conjunto de filas.
+    `tablas` es una lista de (título, columnas, filas, facetas, rangos); las filas llegan ya filtradas
+    desde los índices del dashboard, así que abrir la ventana no hace peticiones.
+    """
+    def __init__(self, master, titulo, tablas, **kwargs):
+        super().__init__(master, **kwargs)
+        self.title(titulo)
+        self.geometry("980x560")
+        self.transient(master)
+
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        pestanas = CTkTabview(self)
+        pestanas.grid(row=0, column=0, sticky="nsew", padx=10, pady=(10, 5))
+        for titulo_tabla, columnas, filas, facetas, rangos in tablas:
+            pestana = pestanas.add(f"{titulo_tabla} ({len(filas):,})")
+            pestana.grid_rowconfigure(0, weight=1)
+            pestana.grid_columnconfigure(0, weight=1)
+            tabla = DataTable(pestana, columnas=columnas, facetas=facetas, rangos=rangos, formatos=FORMATOS_COLUMNAS)
+            tabla.grid(row=0, column=0, sticky="nsew")
+            tabla.actualizar_datos(filas)
+
+        CTkButton(self, text="Cerrar", command=self.destroy).grid(row=1, column=0, sticky="e", padx=10, pady=(0, 10))
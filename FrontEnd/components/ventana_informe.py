@@ -0,0 +1,71 @@
+from customtkinter import CTkToplevel, CTkFrame, CTkButton, CTkTextbox, CTkFont, CTkProgressBar, CTkLabel
+
+from api import api_client
+from api.motor_informes import formatear_informe
+from components.segundo_plano import ejecutar_en_segundo_plano
+
+
+class VentanaInforme(CTkToplevel):
+    """
+    Informe completo calculado en local (ingresos por comercial y mes, clientes por comercial,
+    estados y top clientes). El cálculo corre fuera del hilo de Tk y el progreso se muestra por partición.
+    """
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.title("Informe Completo")
+        self.geometry("760x560")
+        self.transient(master)
+
+        self.grid_rowconfigure(2, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.etiqueta_estado = CTkLabel(self, text="", anchor="w")
+        self.etiqueta_estado.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 0))
+        self.barra_progreso = CTkProgressBar(self)
+        self.barra_progreso.grid(row=1, column=0, sticky="ew", padx=10, pady=5)
+
+        self.texto = CTkTextbox(self, font=CTkFont(family="Courier", size=12), wrap="none")
+        self.texto.grid(row=2, column=0, sticky="nsew", padx=10, pady=5)
+
+        marco_botones = CTkFrame(self, fg_color="transparent")
+        marco_botones.grid(row=3, column=0, sticky="e", padx=10, pady=(0, 10))
+        self.boton_recalcular = CTkButton(marco_botones, text="Recalcular", fg_color="gray", command=self._calcular)
+        self.boton_recalcular.pack(side="right", padx=5)
+        CTkButton(marco_botones, text="Cerrar", command=self.destroy).pack(side="right", padx=5)
+
+        self._calcular()
+
+    def _calcular(self):
+        # Mientras se sincronizan los datos la barra es indeterminada; después avanza por partición.
+        self.boton_recalcular.configure(state="disabled")
+        self.etiqueta_estado.configure(text="Cargando datos...")
+        self.barra_progreso.configure(mode="indeterminate")
+        self.barra_progreso.start()
+        ejecutar_en_segundo_plano(self, lambda notificar: api_client.generar_informe_local(al_progreso=notificar),
+                                  al_terminar=self._mostrar_informe, al_fallar=self._mostrar_error,
+                                  al_progreso=self._mostrar_progreso)
+
+    def _mostrar_progreso(self, hechas, total):
+        # Primer aviso: termina la descarga y empieza la agregación por particiones.
+        if str(self.barra_progreso.cget("mode")) == "indeterminate":
+            self.barra_progreso.stop()
+            self.barra_progreso.configure(mode="determinate")
+        self.barra_progreso.set(hechas / total if total else 1)
+        self.etiqueta_estado.configure(text=f"Agregando particiones: {hechas} / {total}")
+
+    def _mostrar_informe(self, informe):
+        self._mostrar_progreso(1, 1)
+        self.etiqueta_estado.configure(text="Informe completado.")
+        self._pintar(formatear_informe(informe))
+
+    def _mostrar_error(self, error):
+        self.barra_progreso.stop()
+        self.etiqueta_estado.configure(text="No se pudo generar el informe.")
+        self._pintar(f"ERROR: {error}")
+
+    def _pintar(self, texto):
+        self.boton_recalcular.configure(state="normal")
+        self.texto.configure(state="normal")
+        self.texto.delete("1.0", "end")
+        self.texto.insert("1.0", texto)
+        self.texto.configure(state="disabled")
@@ -1,11 +1,20 @@
+import asyncio
+
 import customtkinter as ctk
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
 from customtkinter import CTkFrame
 
+from components.formato import formateador, MONEDA
+from components.grafico_cacheado import GraficoCacheado
+from components.segundo_plano import ejecutar_asincrono
+from components.submuestreo import lttb, puntos_para_ancho, indices_etiquetas, con_marcadores
+from components.ventana_detalle import VentanaDetalle, COLUMNAS_FACTURAS, COLUMNAS_CLIENTES
+
 # Importaciones del API (Funciones de obtención de datos)
-from api.api_client import get_ingresos_mensuales, get_ranking_comerciales, get_invoice_counts
+from api import aio
+from api.api_client import (get_ingresos_mensuales, get_ranking_comerciales, get_clientes_por_comercial, get_invoice_counts,
+                            obtener_datos_locales, version_datos, get_indices_detalle)
 
 # =================================================================
 # 1. CONFIGURACIÓN DE ESTILOS (Tema Claro y Colores Limpios)
@@ -14,6 +23,14 @@ CARD_COLOR = "#FFFFFF" # Fondo de las tarjetas (Blanco)
 TEXT_COLOR_DARK = "#0D0D0D" # Texto oscuro para fondo claro
 LINE_COLORS = ["#0085FF", "#FF7F50", "#3CB371", "#7B68EE"] # Azules y complementarios
 GRID_COLOR = "#DDDDDD" # Líneas de la cuadrícula suaves
+OTROS_COLOR = "#A0A0A0" # Barra agregada "Otros" del ranking
+
+# Comerciales que muestra el ranking (el resto se agrupa en "Otros"); None = todos
+TOP_COMERCIALES_POR_DEFECTO = 10
+OPCIONES_TOP_COMERCIALES = {"Top 5": 5, "Top 10": 10, "Top 20": 20, "Todos": None}
+# Métrica del ranking: texto del selector -> clave de get_ranking_comerciales / get_clientes_por_comercial
+METRICA_RANKING_POR_DEFECTO = "ingresos"
+OPCIONES_METRICA_RANKING = {"Ingresos": "ingresos", "Clientes": "clientes"}
 
 plt.rcParams.update({
     "figure.facecolor": CARD_COLOR,
@@ -27,13 +44,40 @@ plt.rcParams.update({
     "font.size": 9
 })
 
+def calcular_datos_dashboard(facturas, comerciales, top_n=TOP_COMERCIALES_POR_DEFECTO, clientes=(),
+                             metrica=METRICA_RANKING_POR_DEFECTO):
+    # Agrega los datasets en los valores que pintan el KPI y los tres gráficos,
+    # junto con los índices que sirven el detalle al pulsar una barra o un sector.
+    # El ranking ordena a los comerciales por ingresos o por número de clientes (`metrica`).
+    periodos, ingresos = get_ingresos_mensuales(facturas)
+    if metrica == "clientes":
+        ranking = get_clientes_por_comercial(comerciales, clientes, top_n=top_n)
+    else:
+        ranking = get_ranking_comerciales(comerciales, facturas, top_n=top_n)
+    return {
+        'periodos': periodos,
+        'ingresos': ingresos,
+        'total_ingresos': sum(ingresos),
+        'nombres': [d['nombre'] for d in ranking],
+        'metrica': metrica,
+        'valores': [d[metrica] for d in ranking],
+        'ids': [d['id'] for d in ranking],
+        'con_otros': bool(ranking) and ranking[-1].get('otros', False),
+        'conteo_facturas': get_invoice_counts(facturas),
+        'detalle': get_indices_detalle(facturas, clientes),
+    }
+
 # =================================================================
 # 2. CLASE MODULAR DE LA VISTA
 # =================================================================
 class VistaDashboard(CTkFrame):
     
-    def __init__(self, master, **kwargs):
+    def __init__(self, master, preferencias=None, **kwargs):
         super().__init__(master, **kwargs)
+        # Preferencias del usuario (dict de la ventana): conservan el ranking elegido al recrear la vista
+        self.preferencias = preferencias if preferencias is not None else {}
+        self.top_comerciales = self.preferencias.get("top_comerciales", TOP_COMERCIALES_POR_DEFECTO)
+        self.metrica_ranking = self.preferencias.get("metrica_ranking", METRICA_RANKING_POR_DEFECTO)
         
         # Configuración de Grid: 3 columnas, 3 filas
         self.grid_columnconfigure((0, 1, 2), weight=1)
@@ -41,31 +85,121 @@ class VistaDashboard(CTkFrame):
         self.grid_rowconfigure(1, weight=2) # Fila media (Línea)
         self.grid_rowconfigure(2, weight=2) # Fila inferior (Barras y Donut)
 
+        # Versión de los datasets mostrados (la usa el refresco automático de VentanaDashboard)
+        self.firma_datos = None
+        # Índices del detalle (drill-down) y nombres de los comerciales del ranking mostrado
+        self.detalle = {}
+        self.nombres_por_id = {}
+
         # --- 1. LLAMADA A LA API Y PROCESAMIENTO DE DATOS ---
-        periodos, ingresos = get_ingresos_mensuales()
-        ranking = get_ranking_comerciales()
-        conteo_facturas = get_invoice_counts() 
-        
-        nombres = [d['nombre'] for d in ranking]
-        valores = [d['ingresos'] for d in ranking]
-        total_ingresos = sum(ingresos)
+        # Si ya hay datos locales se pinta al instante; el planificador reconcilia después.
+        # Sin datos locales se muestra un aviso y la primera carga la hace el planificador
+        # (VentanaDashboard pide refrescar_pronto() al crear la vista), fuera del hilo de Tk.
+        facturas = obtener_datos_locales('facturas')
+        comerciales = obtener_datos_locales('comerciales')
+        clientes = obtener_datos_locales('clientes') or []
+        if facturas is not None and comerciales is not None:
+            self.aplicar_refresco((self._firma_actual(),
+                                   calcular_datos_dashboard(facturas, comerciales, self.top_comerciales, clientes,
+                                                            self.metrica_ranking)))
+        else:
+            ctk.CTkLabel(self, text="Cargando datos...", text_color=TEXT_COLOR_DARK,
+                         font=ctk.CTkFont(size=16)).grid(row=0, column=0, rowspan=3, columnspan=3)
+
+    # --- Refresco (usado por el PlanificadorRefresco) ---
+
+    def _firma_actual(self):
+        return (version_datos('facturas'), version_datos('comerciales'), version_datos('clientes'))
+
+    async def obtener_datos_refresco_asincrono(self):
+        # En el bucle de api.aio: una sincronización (delta) por colección, las tres a la vez (una sola
+        # espera de red en lugar de tres seguidas); los agregados se calculan en un hilo del bucle.
+        facturas, comerciales, clientes = await aio.reunir(
+            aio.sincronizar_facturas(), aio.sincronizar_comerciales(), aio.sincronizar_clientes())
+        return await asyncio.to_thread(self._calcular_refresco, facturas, comerciales, clientes)
+
+    def _calcular_refresco(self, facturas, comerciales, clientes):
+        return self._firma_actual(), calcular_datos_dashboard(facturas, comerciales, self.top_comerciales, clientes,
+                                                              self.metrica_ranking)
+
+    def aplicar_refresco(self, resultado):
+        # Hilo de Tk: reconstruye KPIs y gráficos con los datos ya calculados.
+        self.firma_datos, datos = resultado
+        for widget in self.winfo_children():
+            widget.destroy()
+
+        periodos, ingresos = datos['periodos'], datos['ingresos']
+        nombres, valores = datos['nombres'], datos['valores']
+        conteo_facturas = datos['conteo_facturas']
+        self.detalle = datos['detalle']
+        self.nombres_por_id = dict(zip(datos['ids'], nombres))
 
         # --- 2. CONFIGURACIÓN DE GRÁFICOS Y KPIS ---
         
         # Fila 0: KPI Grande (Total de Ingresos)
-        self._add_kpi_card(self, total_ingresos, 0, 0, 3)
+        self._add_kpi_card(self, datos['total_ingresos'], 0, 0, 3)
 
+        # Cada gráfico es (nombre, función de dibujo, datos): la imagen se cachea por hash de datos y tamaño
         # Fila 1: Ingresos Mensuales (Ocupa 3 columnas)
-        chart_func_line = lambda: self.create_top_chart(periodos, ingresos)
-        self._add_chart_to_dashboard(self, chart_func_line, 1, 0, 3, "📈 Evolución de Ingresos Mensuales (€)", None, None)
+        chart_line = ("ingresos_mensuales", self.create_top_chart, (periodos, ingresos))
+        self._add_chart_to_dashboard(self, chart_line, 1, 0, 3, "📈 Evolución de Ingresos Mensuales (€)", None, None)
         
         # Fila 2: Ranking (Barras) y Estado de Facturas (Donut)
-        chart_func_bar = lambda: self.create_bar_chart(nombres, valores)
-        self._add_chart_to_dashboard(self, chart_func_bar, 2, 0, 2, "📊 Ranking Comercial por Ingresos", "Total facturado por cada comercial.", None)
+        # Por clientes se abre el mismo detalle (pestaña Clientes primero) al pulsar una barra
+        chart_bar = ("ranking_comerciales", self.create_bar_chart, (nombres, valores, datos['con_otros'], datos['ids']))
+        if datos['metrica'] == "clientes":
+            titulo_ranking = "📊 Ranking Comercial por Clientes"
+            texto_ranking = "Número de clientes de cada comercial. Pulse una barra para ver sus clientes y facturas."
+        else:
+            titulo_ranking = "📊 Ranking Comercial por Ingresos"
+            texto_ranking = "Total facturado por cada comercial. Pulse una barra para ver sus clientes y facturas."
+        self._add_chart_to_dashboard(self, chart_bar, 2, 0, 2, titulo_ranking, texto_ranking, None,
+                                     control=self._controles_ranking, al_pulsar=self._detalle_comercial)
         
-        chart_func_donut = lambda: self.create_invoice_status_pie(conteo_facturas)
-        self._add_chart_to_dashboard(self, chart_func_donut, 2, 2, 1, "📑 Estado de Facturas", "Distribución Pagadas vs. Pendientes.", None)
+        chart_donut = ("estado_facturas", self.create_invoice_status_pie, (conteo_facturas,))
+        self._add_chart_to_dashboard(self, chart_donut, 2, 2, 1, "📑 Estado de Facturas", "Distribución Pagadas vs. Pendientes.", None,
+                                     al_pulsar=self._detalle_estado)
+
+
+    def _controles_ranking(self, parent_frame):
+        # Desplegables del ranking: métrica (Ingresos / Clientes) y "Top N".
+        controles = ctk.CTkFrame(parent_frame, fg_color="transparent")
+        metrica = ctk.CTkOptionMenu(controles, values=list(OPCIONES_METRICA_RANKING), width=100,
+                                    command=self._cambiar_metrica)
+        metrica.set(next(texto for texto, m in OPCIONES_METRICA_RANKING.items() if m == self.metrica_ranking))
+        metrica.grid(row=0, column=0, padx=(0, 5))
+        top = ctk.CTkOptionMenu(controles, values=list(OPCIONES_TOP_COMERCIALES), width=100,
+                                command=self._cambiar_top)
+        top.set(next(texto for texto, n in OPCIONES_TOP_COMERCIALES.items() if n == self.top_comerciales))
+        top.grid(row=0, column=1)
+        return controles
+
+    def _cambiar_metrica(self, texto):
+        # Recalcula el ranking con la nueva métrica fuera del hilo de Tk.
+        self.metrica_ranking = self.preferencias["metrica_ranking"] = OPCIONES_METRICA_RANKING[texto]
+        ejecutar_asincrono(self, self.obtener_datos_refresco_asincrono(), self.aplicar_refresco)
 
+    def _cambiar_top(self, texto):
+        # Recalcula el dashboard con el nuevo tamaño de ranking fuera del hilo de Tk.
+        self.top_comerciales = self.preferencias["top_comerciales"] = OPCIONES_TOP_COMERCIALES[texto]
+        ejecutar_asincrono(self, self.obtener_datos_refresco_asincrono(), self.aplicar_refresco)
+
+    # --- Detalle (drill-down) desde los gráficos ---
+
+    def _detalle_comercial(self, comercial_id):
+        # Clientes y facturas del comercial pulsado, servidos desde los índices ya calculados.
+        nombre = self.nombres_por_id.get(comercial_id) or comercial_id
+        VentanaDetalle(self.winfo_toplevel(), f"Detalle del comercial {nombre}", [
+            ("Clientes", COLUMNAS_CLIENTES, self.detalle['clientes_por_comercial'].get(comercial_id, []), None, None),
+            ("Facturas", COLUMNAS_FACTURAS, self.detalle['facturas_por_comercial'].get(comercial_id, []),
+             ["estado"], ["fecha_emision"]),
+        ])
+
+    def _detalle_estado(self, estado):
+        facturas = self.detalle['facturas_por_estado'].get(estado, [])
+        VentanaDetalle(self.winfo_toplevel(), f"Facturas en estado '{estado}'", [
+            ("Facturas", COLUMNAS_FACTURAS, facturas, ["comercial_id"], ["fecha_emision"]),
+        ])
 
     # --- Métodos de Layout ---
 
@@ -83,13 +217,14 @@ class VistaDashboard(CTkFrame):
         ).grid(row=0, column=0, sticky="nw", padx=20, pady=(15, 0))
 
         ctk.CTkLabel(kpi_frame, 
-                     text=f"{total_ingresos:,.2f} €", 
+                     text=formateador(MONEDA)(total_ingresos), 
                      text_color="white", 
                      font=ctk.CTkFont(size=40, weight="bold")
         ).grid(row=1, column=0, sticky="w", padx=20, pady=(0, 15))
 
 
-    def _add_chart_to_dashboard(self, parent_frame, chart_function, row, column, columnspan, title_text, text_above, text_below):
+    def _add_chart_to_dashboard(self, parent_frame, chart, row, column, columnspan, title_text, text_above, text_below, control=None,
+                                al_pulsar=None):
         # Contenedor para los gráficos (tarjeta blanca)
         container = ctk.CTkFrame(parent_frame, fg_color=CARD_COLOR, corner_radius=10, border_color=GRID_COLOR, border_width=1)
         container.grid(row=row, column=column, columnspan=columnspan, sticky="nsew", padx=5, pady=5)
@@ -101,57 +236,62 @@ class VistaDashboard(CTkFrame):
         # Título principal del gráfico
         label = ctk.CTkLabel(container, text=title_text, text_color=TEXT_COLOR_DARK, font=ctk.CTkFont(size=14, weight="bold"))
         label.grid(row=current_row, column=0, sticky="w", padx=PAD_X_INNER, pady=(15, 5))
+        if control is not None:
+            # Control opcional a la derecha del título (p. ej. el selector Top N)
+            control(container).grid(row=current_row, column=1, sticky="e", padx=PAD_X_INNER, pady=(15, 5))
         current_row += 1
 
         # Frame contenedor para el widget Matplotlib
         chart_frame = ctk.CTkFrame(container, fg_color="transparent")
-        chart_frame.grid(row=current_row, column=0, sticky="nsew", padx=5, pady=5)
+        chart_frame.grid(row=current_row, column=0, columnspan=2, sticky="nsew", padx=5, pady=5)
         container.grid_rowconfigure(current_row, weight=1) 
         current_row += 1
         
         # Inserta el gráfico
-        self._create_matplotlib_widget(chart_frame, chart_function())
+        self._create_matplotlib_widget(chart_frame, chart, al_pulsar)
 
         # Etiqueta de texto inferior (si existe)
         if text_above or text_below:
             info_text = text_above if text_above else text_below
             label = ctk.CTkLabel(container, text=info_text, text_color=GRID_COLOR, wraplength=450, font=ctk.CTkFont(size=10))
-            label.grid(row=current_row, column=0, sticky="w", padx=PAD_X_INNER, pady=(0, 10))
+            label.grid(row=current_row, column=0, columnspan=2, sticky="w", padx=PAD_X_INNER, pady=(0, 10))
             current_row += 1
 
     
-    def _create_matplotlib_widget(self, parent_frame, fig):
-        # Configura y empaqueta el widget Matplotlib.
-        fig.patch.set_alpha(0.0)
-        canvas_widget = FigureCanvasTkAgg(fig, master=parent_frame)
-        canvas_widget.draw()
-        widget = canvas_widget.get_tk_widget()
-        
+    def _create_matplotlib_widget(self, parent_frame, chart, al_pulsar=None):
+        # Empaqueta el gráfico como imagen cacheada: se renderiza en segundo plano solo si
+        # cambian los datos o el tamaño; si no, se muestra al instante la imagen ya hecha.
+        nombre, dibujar, datos = chart
+        widget = GraficoCacheado(parent_frame, nombre, dibujar, datos, fondo=CARD_COLOR, al_pulsar=al_pulsar)
         widget.pack(fill="both", expand=True, padx=0, pady=0)
 
 
     # =================================================================
     # 4. FUNCIONES DE MATPLOTLIB (Tres gráficos clave)
     # =================================================================
+    # Dibujan sobre la Figure que reciben (ya con el tamaño del widget) sin usar pyplot,
+    # porque se ejecutan fuera del hilo de Tk. Devuelven [(valor, artista)] con las zonas pulsables.
     
-    def create_invoice_status_pie(self, conteo_facturas):
+    def create_invoice_status_pie(self, fig, conteo_facturas):
         # Gráfico Donut de estado de facturas.
-        fig, ax = plt.subplots(figsize=(1, 1))
+        ax = fig.subplots()
         
+        estados = ['pagada', 'pendiente', 'cancelada']
         labels = ['Pagadas', 'Pendientes', 'Canceladas']
-        sizes = [conteo_facturas['pagada'], conteo_facturas['pendiente'], conteo_facturas['cancelada']]
+        sizes = [conteo_facturas[estado] for estado in estados]
         colors = [LINE_COLORS[2], LINE_COLORS[1], LINE_COLORS[3]] # Verde, Naranja, Púrpura
         
+        estados_filt = [estados[i] for i, size in enumerate(sizes) if size > 0]
         labels_filt = [labels[i] for i, size in enumerate(sizes) if size > 0]
         sizes_filt = [size for size in sizes if size > 0]
         colors_filt = [colors[i] for i, size in enumerate(sizes) if size > 0]
         
         if not sizes_filt: 
             ax.text(0.5, 0.5, 'Sin Datos', ha='center', va='center', color=TEXT_COLOR_DARK)
-            return fig
+            return []
             
-        ax.pie(sizes_filt, labels=None, colors=colors_filt, autopct='%1.1f%%', startangle=90,
-               wedgeprops={'edgecolor': CARD_COLOR, 'linewidth': 3}, pctdistance=0.85)
+        sectores, _, _ = ax.pie(sizes_filt, labels=None, colors=colors_filt, autopct='%1.1f%%', startangle=90,
+                                wedgeprops={'edgecolor': CARD_COLOR, 'linewidth': 3}, pctdistance=0.85)
 
         # Círculo central (Donut)
         centre_circle = plt.Circle((0,0), 0.65, fc=CARD_COLOR)
@@ -160,23 +300,29 @@ class VistaDashboard(CTkFrame):
         ax.legend(labels_filt, loc="center", bbox_to_anchor=(0.5, 0.5), fontsize=8, frameon=False)
         
         fig.subplots_adjust(left=0.01, right=0.99, top=0.99, bottom=0.01)
-        return fig
+        return list(zip(estados_filt, sectores))
     
-    def create_top_chart(self, periodos, ingresos):
+    def create_top_chart(self, fig, periodos, ingresos):
         # Gráfico de línea de Ingresos Mensuales.
-        fig, ax = plt.subplots(figsize=(1, 1))
+        ax = fig.subplots()
         if not ingresos: 
             ax.text(0.5, 0.5, 'Sin Datos', ha='center', va='center', color=TEXT_COLOR_DARK)
-            return fig
+            return []
         
         x_indices = np.arange(len(periodos))
+        # Series largas: tantos puntos como admite el ancho en píxeles (LTTB conserva los picos)
+        ancho_px = fig.get_figwidth() * fig.dpi
+        visibles = lttb(x_indices, ingresos, puntos_para_ancho(ancho_px))
+        marcador = 'o' if con_marcadores(len(visibles), ancho_px) else None
         
         # Trazado de línea azul
-        ax.plot(x_indices, ingresos, color=LINE_COLORS[0], linewidth=2.5, marker='o', markersize=5)
+        ax.plot(x_indices[visibles], np.asarray(ingresos)[visibles], color=LINE_COLORS[0], linewidth=2.5,
+                marker=marcador, markersize=5)
         
-        # Configuración de ejes
-        ax.set_xticks(x_indices)
-        ax.set_xticklabels(periodos, rotation=30, ha='right', color=TEXT_COLOR_DARK)
+        # Configuración de ejes (solo las etiquetas que caben sin solaparse)
+        ticks = indices_etiquetas(len(periodos), ancho_px)
+        ax.set_xticks(ticks)
+        ax.set_xticklabels([periodos[i] for i in ticks], rotation=30, ha='right', color=TEXT_COLOR_DARK)
         ax.tick_params(axis='y', length=0) # Oculta las marcas del eje Y
         ax.grid(axis='y', linestyle='--', alpha=0.7)
         
@@ -187,20 +333,23 @@ class VistaDashboard(CTkFrame):
         ax.spines['bottom'].set_color(GRID_COLOR)
         
         fig.subplots_adjust(left=0.05, right=0.95, top=0.9, bottom=0.2)
-        return fig
+        return []
     
-    def create_bar_chart(self, nombres, valores):
-        # Gráfico de barras de Ingresos por Comercial (Ranking).
-        fig, ax = plt.subplots(figsize=(1, 1))
+    def create_bar_chart(self, fig, nombres, valores, con_otros=False, ids=None):
+        # Gráfico de barras de Ingresos por Comercial (Ranking); la última barra puede ser "Otros".
+        # Cada barra con id (no "Otros") es pulsable.
+        ax = fig.subplots()
         if not valores: 
             ax.text(0.5, 0.5, 'Sin Datos', ha='center', va='center', color=TEXT_COLOR_DARK)
-            return fig
+            return []
         
         categorias = np.arange(len(nombres))
         colores_barras = [LINE_COLORS[0]] * len(nombres) # Usar color primario
+        if con_otros:
+            colores_barras[-1] = OTROS_COLOR
         
         # Trazado de barras
-        ax.bar(categorias, valores, color=colores_barras, edgecolor=CARD_COLOR, linewidth=1)
+        barras = ax.bar(categorias, valores, color=colores_barras, edgecolor=CARD_COLOR, linewidth=1)
         
         # Configuración de ejes
         ax.set_xticks(categorias)
@@ -215,4 +364,4 @@ class VistaDashboard(CTkFrame):
         ax.spines['bottom'].set_color(GRID_COLOR)
         
         fig.subplots_adjust(left=0.05, right=0.95, top=0.9, bottom=0.3)
-        return fig
\ No newline at end of file
+        return [(id_, barra) for id_, barra in zip(ids or [], barras) if id_ is not None]
\ No newline at end of file
@@ -0,0 +1,228 @@
+"""
+Generador determinista de datos sintéticos a escala de producción (comerciales, clientes,
+secciones, productos y facturas) con el formato JSON de la API Java (camelCase).
+
+Uso (desde la carpeta FrontEnd):
+    python -m herramientas.generador_datos --comerciales 50 --clientes 5000 --facturas 100000 --salida datos.json
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import date, timedelta
+
+# Distribución de estados: las facturas recientes están más a menudo pendientes
+PROB_CANCELADA = 0.06
+PROB_PENDIENTE_RECIENTE = 0.45   # facturas del último mes
+PROB_PENDIENTE_ANTIGUA = 0.08    # facturas de más de seis meses
+
+# Total de factura log-normal (mediana ~ exp(MU) €), con mínimo y máximo razonables
+TOTAL_MU = 6.6
+TOTAL_SIGMA = 0.9
+TOTAL_MIN = 25.0
+TOTAL_MAX = 60000.0
+
+# Crecimiento anual del volumen de facturación y peso de cada mes (estacionalidad)
+CRECIMIENTO_ANUAL = 0.15
+PESO_MES = (0.85, 0.9, 1.05, 1.0, 1.05, 1.1, 0.8, 0.55, 1.05, 1.15, 1.2, 1.3)
+
+NOMBRES = ("Ana", "Juan", "Laura", "David", "Lucía", "Carlos", "Marta", "Pablo", "Elena", "Sergio",
+           "Paula", "Javier", "Sara", "Álvaro", "Carmen", "Raúl", "Irene", "Diego", "Nuria", "Hugo")
+APELLIDOS = ("García", "Pérez", "Soto", "López", "Martín", "Sánchez", "Gómez", "Ruiz", "Díaz", "Moreno",
+             "Muñoz", "Álvarez", "Romero", "Navarro", "Torres", "Domínguez", "Vázquez", "Ramos", "Gil", "Serrano")
+FORMAS_JURIDICAS = ("S.L.", "S.A.", "Corp.", "S.Coop.", "")
+CALLES = ("Calle Mayor", "Av. de la Constitución", "Calle del Sol", "Paseo de la Castellana", "Calle Real")
+SECCIONES = ("Electrónica", "Hogar", "Oficina", "Formación", "Software", "Mantenimiento", "Viajes", "Eventos")
+
+
+def _nombre_persona(rnd):
+    return rnd.choice(NOMBRES), f"{rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}"
+
+
+def _pesos_sesgados(rnd, n, alfa=1.2):
+    # Pesos tipo Pareto: unos pocos comerciales/clientes concentran gran parte del volumen.
+    return [rnd.paretovariate(alfa) for _ in range(n)]
+
+
+def _fechas_por_mes(inicio, meses):
+    # Primer día de cada mes del periodo y su peso (estacionalidad + crecimiento).
+    periodos, pesos = [], []
+    anio, mes = inicio.year, inicio.month
+    for i in range(meses):
+        periodos.append(date(anio, mes, 1))
+        pesos.append(PESO_MES[mes - 1] * (1 + CRECIMIENTO_ANUAL) ** (i / 12))
+        mes += 1
+        if mes > 12:
+            anio, mes = anio + 1, 1
+    return periodos, pesos
+
+
+def _dias_del_mes(primer_dia):
+    siguiente = (primer_dia.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return (siguiente - primer_dia).days
+
+
+def _estado(rnd, antiguedad_dias):
+    if rnd.random() < PROB_CANCELADA:
+        return "cancelada"
+    # La probabilidad de seguir pendiente decae con la antigüedad de la factura
+    factor = min(antiguedad_dias / 180, 1.0)
+    prob_pendiente = PROB_PENDIENTE_RECIENTE + (PROB_PENDIENTE_ANTIGUA - PROB_PENDIENTE_RECIENTE) * factor
+    return "pendiente" if rnd.random() < prob_pendiente else "pagada"
+
+
+def _total(rnd):
+    valor = min(max(rnd.lognormvariate(TOTAL_MU, TOTAL_SIGMA), TOTAL_MIN), TOTAL_MAX)
+    return f"{valor:.2f}€"
+
+
+def generar_comerciales(rnd, n):
+    # El comercial 1 es el administrador (admin / 1234); el resto, comercialN / 1234.
+    comerciales = []
+    for i in range(1, n + 1):
+        nombre, apellidos = _nombre_persona(rnd)
+        username = "admin" if i == 1 else f"comercial{i}"
+        comerciales.append({
+            "comercialId": i,
+            "nombre": f"{nombre} {apellidos}",
+            "email": f"{username}@xtart.com",
+            "telefono": f"6{rnd.randrange(10**7, 10**8)}",
+            "rol": "admin" if i == 1 else "comercial",
+            "username": username,
+            "passwordHash": "1234",
+        })
+    return comerciales
+
+
+def generar_clientes(rnd, n, comerciales):
+    ids_comerciales = [c["comercialId"] for c in comerciales]
+    pesos = _pesos_sesgados(rnd, len(ids_comerciales))
+    asignados = rnd.choices(ids_comerciales, weights=pesos, k=n)
+    clientes = []
+    for i in range(1, n + 1):
+        nombre, apellidos = _nombre_persona(rnd)
+        empresa = rnd.random() < 0.6
+        clientes.append({
+            "clienteId": i,
+            "nombre": f"{apellidos.split()[0]} {rnd.choice(SECCIONES)}" if empresa else nombre,
+            "apellidos": rnd.choice(FORMAS_JURIDICAS) if empresa else apellidos,
+            "edad": None if empresa else rnd.randint(18, 80),
+            "email": f"cliente{i}@correo.es",
+            "telefono": f"9{rnd.randrange(10**7, 10**8)}",
+            "direccion": f"{rnd.choice(CALLES)}, {rnd.randint(1, 200)}",
+            "comercialId": asignados[i - 1],
+            "username": f"cliente{i}",
+        })
+    return clientes
+
+
+def generar_catalogo(rnd, num_productos):
+    secciones = [{"seccionId": i, "nombre": nombre} for i, nombre in enumerate(SECCIONES, start=1)]
+    productos = []
+    for i in range(num_productos):
+        seccion = rnd.choice(secciones)
+        productos.append({
+            "productoId": 101 + i,
+            "nombre": f"{seccion['nombre']} {chr(65 + i % 26)}{i // 26 + 1}",
+            "precioBase": f"{rnd.lognormvariate(5.5, 1.0):.2f}",
+            "plazasDisponibles": rnd.randint(0, 500),
+            "seccionId": seccion["seccionId"],
+        })
+    return secciones, productos
+
+
+def generar_facturas(rnd, n, clientes, productos, meses=24, fecha_fin=None):
+    """
+    Facturas repartidas en los últimos `meses` meses hasta `fecha_fin` (hoy por defecto),
+    con estacionalidad, crecimiento y clientes con volumen muy desigual.
+    El comercial de cada factura es el del cliente.
+    """
+    fecha_fin = fecha_fin or date.today()
+    anio, mes = fecha_fin.year, fecha_fin.month - (meses - 1)
+    while mes < 1:
+        anio, mes = anio - 1, mes + 12
+    periodos, pesos_periodo = _fechas_por_mes(date(anio, mes, 1), meses)
+
+    pesos_cliente = _pesos_sesgados(rnd, len(clientes), alfa=1.5)
+    clientes_elegidos = rnd.choices(clientes, weights=pesos_cliente, k=n)
+    meses_elegidos = rnd.choices(periodos, weights=pesos_periodo, k=n)
+    ids_productos = [p["productoId"] for p in productos]
+
+    facturas = []
+    for i in range(n):
+        cliente = clientes_elegidos[i]
+        primer_dia = meses_elegidos[i]
+        fecha = primer_dia + timedelta(days=rnd.randrange(_dias_del_mes(primer_dia)))
+        if fecha > fecha_fin:
+            fecha = fecha_fin
+        facturas.append({
+            "facturaId": None,
+            "clienteId": cliente["clienteId"],
+            "comercialId": cliente["comercialId"],
+            "productoId": rnd.choice(ids_productos),
+            "fechaEmision": fecha.isoformat(),
+            "estado": _estado(rnd, (fecha_fin - fecha).days),
+            "total": _total(rnd),
+        })
+    # Numeración correlativa en orden cronológico, como en la base de datos real
+    facturas.sort(key=lambda f: f["fechaEmision"])
+    for i, factura in enumerate(facturas, start=1):
+        factura["facturaId"] = f"F-{i:07d}"
+    return facturas
+
+
+def generar_dataset(num_comerciales=50, num_clientes=5000, num_facturas=100000, num_productos=200,
+                    meses=24, semilla=42, fecha_fin=None):
+    """
+    Devuelve {"comerciales": [...], "clientes": [...], "secciones": [...], "productos": [...], "facturas": [...]}.
+    Con la misma semilla y fecha_fin el resultado es siempre idéntico.
+    """
+    rnd = random.Random(semilla)
+    comerciales = generar_comerciales(rnd, max(num_comerciales, 1))
+    clientes = generar_clientes(rnd, max(num_clientes, 1), comerciales)
+    secciones, productos = generar_catalogo(rnd, max(num_productos, 1))
+    facturas = generar_facturas(rnd, num_facturas, clientes, productos, meses=meses, fecha_fin=fecha_fin)
+    return {
+        "comerciales": comerciales,
+        "clientes": clientes,
+        "secciones": secciones,
+        "productos": productos,
+        "facturas": facturas,
+    }
+
+
+def argumentos_dataset(parser):
+    # Opciones comunes al generador y al servidor simulado.
+    parser.add_argument("--comerciales", type=int, default=50)
+    parser.add_argument("--clientes", type=int, default=5000)
+    parser.add_argument("--facturas", type=int, default=100000)
+    parser.add_argument("--productos", type=int, default=200)
+    parser.add_argument("--meses", type=int, default=24)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--fecha-fin", type=date.fromisoformat, default=None,
+                        help="Último día del periodo (YYYY-MM-DD); por defecto hoy")
+
+
+def dataset_desde_argumentos(args):
+    return generar_dataset(args.comerciales, args.clientes, args.facturas, args.productos,
+                           args.meses, args.semilla, args.fecha_fin)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un dataset sintético del CRM en JSON.")
+    argumentos_dataset(parser)
+    parser.add_argument("--salida", help="Archivo JSON de salida (por defecto, la salida estándar)")
+    args = parser.parse_args(argv)
+
+    dataset = dataset_desde_argumentos(args)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(dataset, archivo, ensure_ascii=False)
+        resumen = ", ".join(f"{len(v):,} {k}" for k, v in dataset.items())
+        print(f"Dataset guardado en {args.salida}: {resumen}")
+    else:
+        json.dump(dataset, sys.stdout, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,534 @@
+"""
+Servidor HTTP local que sustituye a la API Java (/crm-backend/api) con datos sintéticos
+a escala de producción, para medir el rendimiento del cliente sin el backend real.
+
+Implementa los endpoints que usa api_client: login, CRUD de comerciales, clientes, secciones,
+productos y facturas, filtros (comercialId, clienteId, seccionId, productoId, username, estado,
+desde/hasta sobre fechaEmision), paginación (?page=0&size=500, total en X-Total-Count),
+sincronización incremental (?modifiedSince=<token>) y estadísticas. La latencia es configurable.
+Como un backend con negociación de contenido, comprime las respuestas (gzip; br y zstd si están
+`brotli`/`zstandard`) según Accept-Encoding y sirve los listados en formato columnar
+(application/vnd.crm.columnas+json, o +msgpack con `msgpack`) si el cliente lo pide en Accept.
+
+Uso (desde la carpeta FrontEnd):
+    python -m herramientas.servidor_simulado --facturas 200000 --latencia-ms 80 --jitter-ms 40
+La aplicación apunta por defecto a http://localhost:8080/crm-backend/api (CRM_BASE_URL para cambiarlo).
+Usuarios: admin / 1234 (rol admin) y comercialN / 1234 (rol comercial).
+"""
+import argparse
+import bisect
+import gzip
+import json
+import random
+import threading
+import time
+import uuid
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from herramientas.generador_datos import argumentos_dataset, dataset_desde_argumentos
+
+PREFIJO_API = "/crm-backend/api"
+
+CLAVES_PRIMARIAS_API = {
+    'comerciales': 'comercialId',
+    'clientes': 'clienteId',
+    'secciones': 'seccionId',
+    'productos': 'productoId',
+    'facturas': 'facturaId',
+}
+
+# Parámetros de consulta que filtran por igualdad sobre el campo del mismo nombre
+FILTROS_IGUALDAD = ('comercialId', 'clienteId', 'seccionId', 'productoId', 'username', 'estado')
+
+# Formatos compactos de los listados (negociados con la cabecera Accept)
+TIPO_JSON = "application/json"
+TIPO_COLUMNAS_JSON = "application/vnd.crm.columnas+json"
+TIPO_COLUMNAS_MSGPACK = "application/vnd.crm.columnas+msgpack"
+# Campos con importes "1500.00€" que el formato columnar envía como números
+CAMPOS_IMPORTE = ('total', 'precioBase')
+# Filas por bloque en los formatos compactos
+FILAS_POR_BLOQUE = 5000
+# Respuestas más pequeñas (bytes) se envían sin comprimir
+MINIMO_COMPRESION = 1024
+
+
+def _a_camel(clave):
+    # "fecha_emision" -> "fechaEmision" (los formularios envían snake_case o camelCase)
+    primera, *resto = clave.split('_')
+    return primera + ''.join(p[:1].upper() + p[1:] for p in resto)
+
+
+def _normalizar_entrada(datos):
+    # Claves a camelCase y objetos anidados de JPA aplanados: {"comercial": {"comercialId": 1}} -> comercialId.
+    registro = {}
+    for clave, valor in (datos or {}).items():
+        if isinstance(valor, dict):
+            for sub_clave, sub_valor in valor.items():
+                if _a_camel(sub_clave).endswith('Id'):
+                    registro[_a_camel(sub_clave)] = sub_valor
+        else:
+            registro[_a_camel(clave)] = valor
+    return registro
+
+
+def _importe(valor):
+    # "1500.00€" -> 1500.0 (None se mantiene)
+    if valor is None or isinstance(valor, (int, float)):
+        return valor
+    try: return float(str(valor).replace('€', '').replace(',', ''))
+    except ValueError: return None
+
+
+def _en_bloques(registros):
+    # [{...}, ...] -> (columnas, bloques); cada bloque es una lista de valores por columna
+    # de hasta FILAS_POR_BLOQUE filas, para que el cliente pueda decodificar según llega.
+    columnas = list(dict.fromkeys(clave for registro in registros for clave in registro))
+    bloques = []
+    for inicio in range(0, len(registros), FILAS_POR_BLOQUE):
+        tramo = registros[inicio:inicio + FILAS_POR_BLOQUE]
+        bloque = []
+        for columna in columnas:
+            valores_columna = [registro.get(columna) for registro in tramo]
+            if columna in CAMPOS_IMPORTE:
+                valores_columna = [_importe(v) for v in valores_columna]
+            bloque.append(valores_columna)
+        bloques.append(bloque)
+    return columnas, bloques
+
+
+def serializar(datos, tipo):
+    """
+    Cuerpo (bytes) de un listado o delta en el formato `tipo`. En los compactos va una cabecera
+    (columnas y, en un delta, deleted y syncToken) y después los registros en bloques de columnas.
+    """
+    if tipo == TIPO_JSON or not isinstance(datos, (list, dict)) or (isinstance(datos, dict) and 'items' not in datos):
+        return json.dumps(datos, ensure_ascii=False).encode('utf-8')
+    if isinstance(datos, dict):
+        resto = dict(datos)
+        registros = resto.pop('items')
+    else:
+        registros, resto = datos, {}
+    columnas, bloques = _en_bloques(registros)
+    cabecera = dict(columnas=columnas, **resto)
+    if tipo == TIPO_COLUMNAS_MSGPACK:
+        return b"".join(msgpack.packb(objeto, use_bin_type=True) for objeto in [cabecera, *bloques])
+    return json.dumps(dict(cabecera, bloques=bloques), ensure_ascii=False).encode('utf-8')
+
+
+def comprimir(cuerpo, codificacion):
+    if codificacion == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(cuerpo)
+    if codificacion == 'br':
+        return brotli.compress(cuerpo, quality=4)
+    return gzip.compress(cuerpo, compresslevel=5)
+
+
+def _tipos_aceptados(cabecera):
+    # "a/b;q=0.9, c/d;q=0" -> {"a/b", ...} (solo los que no tienen q=0)
+    aceptados = set()
+    for parte in (cabecera or "").split(","):
+        tipo, *parametros = [p.strip() for p in parte.split(";")]
+        if tipo and not any(p.replace(" ", "") in ("q=0", "q=0.0") for p in parametros):
+            aceptados.add(tipo.lower())
+    return aceptados
+
+
+class AlmacenSimulado:
+    """
+    Colecciones en memoria indexadas por clave primaria, con un registro de cambios
+    (revisión, entidad, id) para responder a ?modifiedSince sin recorrer todo el dataset.
+    """
+    def __init__(self, dataset):
+        self._lock = threading.RLock()
+        self.colecciones = {}
+        for entidad, clave in CLAVES_PRIMARIAS_API.items():
+            self.colecciones[entidad] = {str(r[clave]): r for r in dataset.get(entidad, [])}
+        self.revision = 0
+        self._cambios = []         # (revision, entidad, id), en orden creciente de revisión
+        self._revisiones = []      # solo las revisiones, para bisect
+        self._respuestas = {}      # clave -> (revision, bytes) de los listados completos
+        self.estadisticas = {'peticionesTotales': 0, 'fallos': 0}
+
+    # --- Lectura ---
+
+    @staticmethod
+    def _coincide(registro, filtros):
+        for campo, valor in filtros.items():
+            if campo == 'desde':
+                if str(registro.get('fechaEmision', ''))[:10] < valor: return False
+            elif campo == 'hasta':
+                if str(registro.get('fechaEmision', ''))[:10] > valor: return False
+            elif str(registro.get(campo)) != valor:
+                return False
+        return True
+
+    def listar(self, entidad, filtros):
+        registros = self.colecciones[entidad].values()
+        if not filtros:
+            return list(registros)
+        return [r for r in registros if self._coincide(r, filtros)]
+
+    def respuesta_cacheada(self, clave, producir):
+        # Los listados completos se serializan (y comprimen) una vez por revisión: con 1M de facturas
+        # cuesta segundos. `producir()` calcula la respuesta si no está en caché.
+        with self._lock:
+            cacheado = self._respuestas.get(clave)
+            if cacheado and cacheado[0] == self.revision:
+                return cacheado[1]
+            revision = self.revision
+            cuerpo = producir()
+            self._respuestas[clave] = (revision, cuerpo)
+            return cuerpo
+
+    def delta(self, entidad, filtros, token):
+        """
+        {"items": [...], "deleted": [...], "syncToken": "<revisión>"} con los cambios posteriores a `token`.
+        Un token "0" (o desconocido) devuelve todos los registros. Los registros que han dejado de
+        cumplir los filtros se envían como borrados.
+        """
+        with self._lock:
+            try: desde = int(token)
+            except (TypeError, ValueError): desde = 0
+            if desde <= 0 or desde > self.revision:
+                return {"items": self.listar(entidad, filtros), "deleted": [], "syncToken": str(self.revision)}
+
+            coleccion = self.colecciones[entidad]
+            items, borrados = [], []
+            inicio = bisect.bisect_right(self._revisiones, desde)
+            # Solo el último cambio de cada id importa
+            ids = dict.fromkeys(id_ for _, ent, id_ in self._cambios[inicio:] if ent == entidad)
+            for id_ in ids:
+                registro = coleccion.get(id_)
+                if registro is not None and self._coincide(registro, filtros):
+                    items.append(registro)
+                else:
+                    borrados.append(id_)
+            return {"items": items, "deleted": borrados, "syncToken": str(self.revision)}
+
+    def obtener(self, entidad, id_):
+        return self.colecciones[entidad].get(id_)
+
+    # --- Escritura ---
+
+    def _registrar_cambio(self, entidad, id_):
+        self.revision += 1
+        self._cambios.append((self.revision, entidad, id_))
+        self._revisiones.append(self.revision)
+
+    def _siguiente_id(self, entidad):
+        coleccion = self.colecciones[entidad]
+        if entidad == 'facturas':
+            return f"F-{len(coleccion) + 1:07d}"
+        return max((int(k) for k in coleccion), default=0) + 1
+
+    def guardar(self, entidad, datos, id_=None):
+        # Alta (id_ None) o modificación; devuelve el registro guardado o None si no existe.
+        clave = CLAVES_PRIMARIAS_API[entidad]
+        with self._lock:
+            coleccion = self.colecciones[entidad]
+            registro = _normalizar_entrada(datos)
+            if id_ is None:
+                registro[clave] = registro.get(clave) or self._siguiente_id(entidad)
+            else:
+                if id_ not in coleccion:
+                    return None
+                registro = dict(coleccion[id_], **registro)
+                registro[clave] = coleccion[id_][clave]
+            id_guardado = str(registro[clave])
+            coleccion[id_guardado] = registro
+            self._registrar_cambio(entidad, id_guardado)
+            return registro
+
+    def borrar(self, entidad, id_):
+        with self._lock:
+            if self.colecciones[entidad].pop(id_, None) is None:
+                return False
+            self._registrar_cambio(entidad, id_)
+            return True
+
+    def autenticar(self, username, password):
+        for comercial in self.colecciones['comerciales'].values():
+            if comercial.get('username') == username and comercial.get('passwordHash') == password:
+                return comercial
+        return None
+
+
+class ManejadorApi(BaseHTTPRequestHandler):
+    """Traduce las peticiones HTTP a operaciones sobre el AlmacenSimulado del servidor."""
+    protocol_version = "HTTP/1.1"
+
+    # --- Utilidades ---
+
+    def log_message(self, formato, *args):
+        if self.server.verboso:
+            super().log_message(formato, *args)
+
+    def _simular_latencia(self):
+        latencia = self.server.latencia_ms + random.uniform(0, self.server.jitter_ms)
+        if latencia > 0:
+            time.sleep(latencia / 1000)
+
+    def _codificacion(self):
+        # Compresión preferida entre las que acepta el cliente (None = sin comprimir).
+        if not self.server.compresion:
+            return None
+        aceptadas = _tipos_aceptados(self.headers.get("Accept-Encoding"))
+        for codificacion, disponible in (('zstd', zstandard), ('br', brotli), ('gzip', gzip)):
+            if codificacion in aceptadas and disponible is not None:
+                return codificacion
+        return None
+
+    def _tipo_listado(self):
+        # Formato de los listados según Accept: columnar si el cliente lo pide, JSON si no.
+        if not self.server.formatos_compactos:
+            return TIPO_JSON
+        aceptados = _tipos_aceptados(self.headers.get("Accept"))
+        if TIPO_COLUMNAS_MSGPACK in aceptados and msgpack is not None:
+            return TIPO_COLUMNAS_MSGPACK
+        if TIPO_COLUMNAS_JSON in aceptados:
+            return TIPO_COLUMNAS_JSON
+        return TIPO_JSON
+
+    def _responder_listado(self, datos, clave_cache=None):
+        # Listado o delta en el formato negociado; con `clave_cache` el cuerpo comprimido se reutiliza.
+        tipo, codificacion = self._tipo_listado(), self._codificacion()
+        def producir():
+            # (codificación aplicada o None, bytes)
+            cuerpo = serializar(datos() if callable(datos) else datos, tipo)
+            if codificacion and len(cuerpo) >= MINIMO_COMPRESION:
+                return codificacion, comprimir(cuerpo, codificacion)
+            return None, cuerpo
+        if clave_cache is None:
+            aplicada, cuerpo = producir()
+        else:
+            aplicada, cuerpo = self.server.almacen.respuesta_cacheada((clave_cache, tipo, codificacion), producir)
+        cabeceras = {"Vary": "Accept, Accept-Encoding"}
+        if aplicada:
+            cabeceras["Content-Encoding"] = aplicada
+        self._responder(200, cuerpo, tipo=tipo, cabeceras=cabeceras, comprimir_cuerpo=False)
+
+    def _responder(self, estado, cuerpo=b"", tipo="application/json", cabeceras=None, comprimir_cuerpo=True):
+        if estado >= 400:
+            self.server.almacen.estadisticas['fallos'] += 1
+        if isinstance(cuerpo, (dict, list)):
+            cuerpo = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+        elif isinstance(cuerpo, str):
+            cuerpo = cuerpo.encode('utf-8')
+        cabeceras = dict(cabeceras or {})
+        codificacion = self._codificacion() if comprimir_cuerpo and len(cuerpo) >= MINIMO_COMPRESION else None
+        if codificacion:
+            cuerpo = comprimir(cuerpo, codificacion)
+            cabeceras["Content-Encoding"] = codificacion
+        self.send_response(estado)
+        self.send_header("Content-Type", f"{tipo}; charset=utf-8" if tipo.startswith("text/") or tipo.endswith("json") else tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for nombre, valor in cabeceras.items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _leer_cuerpo(self):
+        longitud = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(longitud) if longitud else b""
+
+    def _ruta(self):
+        # Devuelve (entidad, id o None, consulta) o None si la ruta no es de la API.
+        url = urlparse(self.path)
+        if not url.path.startswith(PREFIJO_API + "/"):
+            return None
+        partes = url.path[len(PREFIJO_API) + 1:].strip("/").split("/")
+        consulta = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        return partes[0], (partes[1] if len(partes) > 1 else None), consulta
+
+    def _sesion_valida(self):
+        if not self.server.exigir_sesion:
+            return True
+        cookies = SimpleCookie(self.headers.get("Cookie", ""))
+        return "JSESSIONID" in cookies and cookies["JSESSIONID"].value in self.server.sesiones
+
+    def _preparar(self):
+        # Latencia, contador de peticiones, ruta y sesión comunes a todos los métodos.
+        self._simular_latencia()
+        self.server.almacen.estadisticas['peticionesTotales'] += 1
+        ruta = self._ruta()
+        if ruta is None:
+            self._responder(404, {"error": "Ruta no encontrada"})
+            return None
+        if ruta[0] != "login" and not self._sesion_valida():
+            self._responder(401, "Sesión no válida o caducada", tipo="text/plain")
+            return None
+        return ruta
+
+    # --- Métodos HTTP ---
+
+    def do_GET(self):
+        ruta = self._preparar()
+        if ruta is None:
+            return
+        entidad, id_, consulta = ruta
+        almacen = self.server.almacen
+
+        if entidad == "estadisticas":
+            return self._responder(200, almacen.estadisticas)
+        if entidad == "informes":
+            return self._responder(200, {"informe": id_, "generado": time.strftime("%Y-%m-%dT%H:%M:%S")})
+        if entidad not in CLAVES_PRIMARIAS_API:
+            return self._responder(404, {"error": f"Entidad desconocida: {entidad}"})
+
+        if id_ is not None:
+            registro = almacen.obtener(entidad, id_)
+            return self._responder(200, registro) if registro else self._responder(404, {"error": "No encontrado"})
+
+        filtros = {k: v for k, v in consulta.items() if k in FILTROS_IGUALDAD or k in ('desde', 'hasta')}
+        clave_consulta = tuple(sorted(filtros.items()))
+        if "modifiedSince" in consulta:
+            token = consulta["modifiedSince"]
+            if token in ("", "0"):
+                # Carga inicial (todo el dataset): misma respuesta para todos hasta el siguiente cambio
+                return self._responder_listado(lambda: almacen.delta(entidad, filtros, token),
+                                               clave_cache=("delta", entidad, clave_consulta))
+            return self._responder_listado(almacen.delta(entidad, filtros, token))
+
+        if "page" in consulta or "size" in consulta:
+            # Paginación estilo Spring: page empieza en 0; el total va en la cabecera X-Total-Count
+            registros = almacen.listar(entidad, filtros)
+            tamano = max(int(consulta.get("size", 500)), 1)
+            inicio = max(int(consulta.get("page", 0)), 0) * tamano
+            return self._responder(200, registros[inicio:inicio + tamano],
+                                   cabeceras={"X-Total-Count": str(len(registros))})
+
+        self._responder_listado(lambda: almacen.listar(entidad, filtros), clave_cache=("listado", entidad, clave_consulta))
+
+    def do_POST(self):
+        ruta = self._preparar()
+        if ruta is None:
+            return
+        entidad, _, consulta = ruta
+        cuerpo = self._leer_cuerpo()
+
+        if entidad == "login":
+            # Formulario x-www-form-urlencoded como el LoginServlet; responde "ROL,NOMBRE,ID"
+            campos = {k: v[-1] for k, v in parse_qs(cuerpo.decode("utf-8")).items()}
+            comercial = self.server.almacen.autenticar(campos.get("username"), campos.get("password"))
+            if comercial is None:
+                return self._responder(401, "Credenciales incorrectas", tipo="text/plain")
+            sesion = uuid.uuid4().hex
+            self.server.sesiones.add(sesion)
+            texto = f"{comercial['rol']},{comercial['nombre']},{comercial['comercialId']}"
+            return self._responder(200, texto, tipo="text/plain",
+                                   cabeceras={"Set-Cookie": f"JSESSIONID={sesion}; Path=/crm-backend; HttpOnly"})
+        if entidad == "estadisticas":
+            return self._responder(204)
+        if entidad not in CLAVES_PRIMARIAS_API:
+            return self._responder(404, {"error": f"Entidad desconocida: {entidad}"})
+        try:
+            datos = json.loads(cuerpo or b"{}")
+        except ValueError:
+            return self._responder(400, {"error": "JSON no válido"})
+        self._responder(201, self.server.almacen.guardar(entidad, datos))
+
+    def do_PUT(self):
+        ruta = self._preparar()
+        if ruta is None:
+            return
+        entidad, id_, _ = ruta
+        if entidad not in CLAVES_PRIMARIAS_API or id_ is None:
+            return self._responder(404, {"error": "Ruta no encontrada"})
+        try:
+            datos = json.loads(self._leer_cuerpo() or b"{}")
+        except ValueError:
+            return self._responder(400, {"error": "JSON no válido"})
+        registro = self.server.almacen.guardar(entidad, datos, id_)
+        self._responder(200, registro) if registro else self._responder(404, {"error": "No encontrado"})
+
+    def do_DELETE(self):
+        ruta = self._preparar()
+        if ruta is None:
+            return
+        entidad, id_, _ = ruta
+        if entidad == "estadisticas":
+            self.server.almacen.estadisticas.update(peticionesTotales=0, fallos=0)
+            return self._responder(204)
+        if entidad not in CLAVES_PRIMARIAS_API or id_ is None:
+            return self._responder(404, {"error": "Ruta no encontrada"})
+        self._responder(204) if self.server.almacen.borrar(entidad, id_) else self._responder(404, {"error": "No encontrado"})
+
+
+class ServidorSimulado(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, almacen, latencia_ms=0, jitter_ms=0, exigir_sesion=False, verboso=False,
+                 compresion=True, formatos_compactos=True):
+        super().__init__(direccion, ManejadorApi)
+        self.almacen = almacen
+        self.compresion = compresion
+        self.formatos_compactos = formatos_compactos
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.exigir_sesion = exigir_sesion
+        self.verboso = verboso
+        self.sesiones = set()
+
+    @property
+    def url_base(self):
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}{PREFIJO_API}"
+
+
+def arrancar_en_segundo_plano(dataset, puerto=0, **opciones):
+    """
+    Arranca el servidor en un hilo daemon (puerto 0 = uno libre) y lo devuelve.
+    Pensado para benchmarks: os.environ["CRM_BASE_URL"] = servidor.url_base antes de importar api_client.
+    """
+    servidor = ServidorSimulado(("127.0.0.1", puerto), AlmacenSimulado(dataset), **opciones)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API simulada del CRM con datos sintéticos.")
+    argumentos_dataset(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--latencia-ms", type=float, default=0, help="Latencia fija añadida a cada petición")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Latencia aleatoria adicional (0..jitter)")
+    parser.add_argument("--exigir-sesion", action="store_true", help="Responder 401 sin cookie de login")
+    parser.add_argument("--verboso", action="store_true", help="Registrar cada petición en consola")
+    parser.add_argument("--sin-compresion", action="store_true", help="No comprimir aunque el cliente lo acepte")
+    parser.add_argument("--sin-formato-compacto", action="store_true", help="Listados siempre en JSON por filas")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    dataset = dataset_desde_argumentos(args)
+    resumen = ", ".join(f"{len(v):,} {k}" for k, v in dataset.items())
+    print(f"Dataset generado en {time.perf_counter() - inicio:.1f} s: {resumen}")
+
+    servidor = ServidorSimulado((args.host, args.puerto), AlmacenSimulado(dataset), args.latencia_ms,
+                                args.jitter_ms, args.exigir_sesion, args.verboso,
+                                not args.sin_compresion, not args.sin_formato_compacto)
+    print(f"API simulada en {servidor.url_base} (Ctrl+C para parar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
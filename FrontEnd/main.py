@@ -1,6 +1,8 @@
 from customtkinter import *
 from ui.login import LoginPage
 from ui.dashboard import VentanaDashboard # Import necesario para la transición
+from api import api_client
+from components.segundo_plano import ejecutar_en_segundo_plano
 
 # Configuración inicial del tema y apariencia
 set_appearance_mode("light")
@@ -10,7 +12,14 @@ def open_dashboard_callback(user_name):
     """Oculta la ventana de Login y muestra la ventana del Dashboard."""
     app.withdraw() # Oculta la ventana principal (Login)
     # Crea y muestra la ventana del Dashboard
-    VentanaDashboard(app, username=user_name)
+    return VentanaDashboard(app, username=user_name)
+
+def abrir_sesion_restaurada(usuario):
+    """Abre el Dashboard con la sesión guardada y la valida en segundo plano (vuelve al Login si caducó)."""
+    ventana = open_dashboard_callback(usuario.get("nombre") or usuario.get("username"))
+    # Anclado a la ventana: si el usuario ya cerró sesión, la respuesta se descarta
+    ejecutar_en_segundo_plano(ventana, api_client.validar_sesion_restaurada,
+                              lambda vigente: ventana.sesion_caducada() if vigente is False else None)
 
 if __name__ == "__main__":
     app = CTk()
@@ -25,6 +34,11 @@ if __name__ == "__main__":
     
     # Empaqueta la vista para que ocupe todo el espacio de la ventana principal
     login_view.pack(fill="both", expand=True)
+
+    # Si hay sesión del arranque anterior se reutiliza y se salta el login (sin esperar a la red)
+    usuario_restaurado = api_client.restaurar_sesion()
+    if usuario_restaurado:
+        app.after(0, lambda: abrir_sesion_restaurada(usuario_restaurado))
     
     # Inicia el bucle principal de la aplicación
     app.mainloop()
\ No newline at end of file
@@ -2,10 +2,12 @@ from customtkinter import CTkFrame, CTkButton, CTkEntry, CTkFont
 import tkinter.messagebox as tk_messagebox
 import re
 from api import api_client
+from api.modelos import Cliente
 
 # Importa componentes de tabla y modal
 from components.data_table import DataTable
 from components.modal_form import ModalForm 
+from components.segundo_plano import ejecutar_en_segundo_plano
 
 # ====================================================================
 # --- FUNCIONES DE VALIDACIÓN SIMPLIFICADAS ---
@@ -58,6 +60,8 @@ class VistaClientes(CTkFrame):
         self.id_seleccionado = None
         self.cliente_en_edicion = None
         self.valor_celda_seleccionada = None
+        # Versión del dataset mostrado (la usa el refresco automático para detectar cambios)
+        self.firma_datos = None
 
         self._inicializar_controles()
         self.cargar_datos_cliente()
@@ -82,7 +86,8 @@ class VistaClientes(CTkFrame):
 
         # Inicialización de la Tabla de Datos
         columnas_cliente = ["cliente_id", "nombre", "apellidos", "edad", "email", "telefono", "direccion", "comercial_id"]
-        self.tabla_datos = DataTable(self, columnas=columnas_cliente, al_seleccionar_item=self.al_seleccionar_fila)
+        self.tabla_datos = DataTable(self, columnas=columnas_cliente, al_seleccionar_item=self.al_seleccionar_fila,
+                                     facetas=["comercial_id"])
         self.tabla_datos.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
         
         # Marco de Acciones inferiores (Editar/Eliminar)
@@ -95,8 +100,33 @@ class VistaClientes(CTkFrame):
     # --- FUNCIONES DE LECTURA Y SELECCIÓN ---
 
     def cargar_datos_cliente(self):
-        # Llama a la API para obtener y actualizar la tabla con los clientes.
-        datos = api_client.obtener_clientes()
+        # Pinta al instante el dataset local y lo reconcilia con la API (delta) en segundo plano.
+        datos_locales = api_client.obtener_datos_locales('clientes')
+        if datos_locales is not None:
+              self.tabla_datos.actualizar_datos(datos_locales)
+              ejecutar_en_segundo_plano(self, self.obtener_datos_refresco, self.aplicar_refresco)
+        else:
+              # Primera descarga: las filas aparecen en la tabla según llegan los lotes
+              ejecutar_en_segundo_plano(self, self._descargar_por_lotes, self.aplicar_refresco,
+                                        al_progreso=self.tabla_datos.mostrar_parcial)
+
+    def _descargar_por_lotes(self, notificar):
+        # Fuera del hilo de Tk: notifica la lista (creciente) de registros recibidos tras cada lote.
+        recibidos = []
+        def al_lote(lote):
+            recibidos.extend(lote)
+            notificar(recibidos)
+        datos = api_client.sincronizar_clientes(al_lote=al_lote)
+        return api_client.version_datos('clientes'), datos
+
+    def obtener_datos_refresco(self):
+        # Fuera del hilo de Tk: sincroniza (delta) y devuelve (versión del dataset, datos).
+        datos = api_client.sincronizar_clientes()
+        return api_client.version_datos('clientes'), datos
+
+    def aplicar_refresco(self, resultado):
+        # Callback (hilo de Tk) con la respuesta de la API o de la caché si no hay servidor.
+        self.firma_datos, datos = resultado
         if datos is None:
               tk_messagebox.showerror("Error de Conexión", "No se pudieron obtener los clientes. Verifique el servidor REST.")
               self.tabla_datos.actualizar_datos([])
@@ -165,7 +195,7 @@ class VistaClientes(CTkFrame):
                 if datos_actuales is None:
                     raise Exception(f"Cliente no encontrado en la lista de la API.")
             
-            elif isinstance(datos_api_lista, dict):
+            elif isinstance(datos_api_lista, (dict, Cliente)):
                 datos_actuales = datos_api_lista
             
             else:
@@ -234,10 +264,11 @@ class VistaClientes(CTkFrame):
             data_final['username'] = cliente_previo.get('username') or data.get('email')
             data_final['passwordHash'] = cliente_previo.get('password_hash') or "password123" 
             
-            comercial_data = cliente_previo.get('comercial')
-            if comercial_data and isinstance(comercial_data, dict):
+            # El modelo Cliente ya trae el comercial_id (aunque la API lo envíe anidado)
+            comercial_id = cliente_previo.get('comercial_id')
+            if comercial_id is not None:
                 data_final['comercial'] = {
-                    "comercialId": comercial_data.get('comercial_id')
+                    "comercialId": comercial_id
                 }
             # Si el cliente previo NO tenía la FK completa, la asignamos por defecto
             elif not data_final.get('comercial'):
@@ -5,7 +5,9 @@ from typing import Optional, Dict, Any
 
 from components.data_table import DataTable
 from components.modal_form import ModalForm 
+from components.segundo_plano import ejecutar_en_segundo_plano
 from api import api_client
+from api.modelos import Comercial
 
 # --- FUNCIONES DE VALIDACIÓN ---
 def validar_nombre(valor):
@@ -34,6 +36,8 @@ class VistaComerciales(CTkFrame):
         # Variables de estado para la selección/edición
         self.id_seleccionado: Optional[int] = None 
         self.comercial_en_edicion: Optional[Dict[str, Any]] = None 
+        # Versión del dataset mostrado (la usa el refresco automático para detectar cambios)
+        self.firma_datos = None
         
         # Marco de control superior
         self.marco_control = CTkFrame(self, fg_color="transparent")
@@ -59,12 +63,23 @@ class VistaComerciales(CTkFrame):
         CTkButton(self.marco_accion, text="Eliminar (D)", fg_color="red", command=self._confirmar_y_eliminar).pack(side="right", padx=5)
         
     def cargar_datos_comercial(self):
-        # Carga datos de la API y actualiza la tabla.
-        datos = api_client.obtener_comerciales()
+        # Pinta al instante el dataset local y lo reconcilia con la API (delta) en segundo plano.
+        datos_locales = api_client.obtener_datos_locales('comerciales')
+        if datos_locales is not None:
+              self.tabla_datos.actualizar_datos(datos_locales)
+        ejecutar_en_segundo_plano(self, self.obtener_datos_refresco, self.aplicar_refresco)
+
+    def obtener_datos_refresco(self):
+        # Fuera del hilo de Tk: sincroniza (delta) y devuelve (versión del dataset, datos).
+        datos = api_client.sincronizar_comerciales()
+        return api_client.version_datos('comerciales'), datos
+
+    def aplicar_refresco(self, resultado):
+        # Callback (hilo de Tk) con la respuesta de la API o de la caché si no hay servidor.
+        self.firma_datos, datos = resultado
         if datos is None:
-              # Muestra error y vacía la tabla si la conexión falla.
               tk_messagebox.showerror("Error de Conexión", "No se pudieron obtener los comerciales. Verifique el servidor REST.")
-              self.tabla_datos.actualizar_datos([]) 
+              self.tabla_datos.actualizar_datos([])
         else:
               self.tabla_datos.actualizar_datos(datos)
 
@@ -106,7 +121,7 @@ class VistaComerciales(CTkFrame):
             
             if isinstance(datos_api, list) and len(datos_api) > 0:
                 datos_actuales = datos_api[0]
-            elif isinstance(datos_api, dict):
+            elif isinstance(datos_api, (dict, Comercial)):
                 datos_actuales = datos_api
             else:
                  raise Exception("Comercial no encontrado o formato de respuesta inválido.")
@@ -162,7 +177,7 @@ class VistaComerciales(CTkFrame):
             
             # 2. Reenviar campos obligatorios NOT NULL
             data_final['rol'] = comercial_previo.get('rol')
-            data_final['passwordHash'] = comercial_previo.get('passwordHash') 
+            data_final['passwordHash'] = comercial_previo.get('password_hash') 
             
             # 3. Incluir el ID para el ORM de Java
             data_final['comercialId'] = self.id_seleccionado
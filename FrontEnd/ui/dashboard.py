@@ -8,6 +8,19 @@ from .facturas import VistaFacturas
 
 # Importación del contenido real del Dashboard (vista de resumen)
 from components.vistadashboard import VistaDashboard 
+from components.planificador_refresco import PlanificadorRefresco
+from components.precarga import Precargador
+from components.panel_diagnostico import PanelDiagnostico
+from components.ventana_informe import VentanaInforme
+from api import api_client
+
+# Entidades que sincroniza cada vista al abrirse (lo que se precarga al pasar el ratón por su botón)
+ENTIDADES_POR_VISTA = {
+    "Dashboard": ("facturas", "comerciales", "clientes"),
+    "Clientes": ("clientes",),
+    "Comerciales": ("comerciales",),
+    "Facturas": ("facturas",),
+}
 
 
 class VentanaDashboard(CTkToplevel):
@@ -24,16 +37,28 @@ class VentanaDashboard(CTkToplevel):
         self.minsize(800, 600)
         
         self.vistas_cargadas = {} # Diccionario para futuras vistas con caché
+        self.vista_actual = None # Vista visible (la refresca el planificador)
+        self.preferencias = {} # Preferencias de las vistas durante la sesión (p. ej. el Top N y la métrica del ranking)
         
         # Configuración de Grid: Lateral (0) y Contenido (1)
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(1, weight=1)
         
+        # Refresco automático en segundo plano de la vista visible
+        self.planificador = PlanificadorRefresco(self, lambda: self.vista_actual)
+        # Precarga en segundo plano de las vistas por las que pasa el ratón (o todas, en reposo)
+        self.precargador = Precargador(self, ENTIDADES_POR_VISTA)
+
         self.crear_diseno()
+        self.planificador.iniciar()
+        self.precargador.iniciar()
         self.cambiar_vista("Dashboard") # Carga la vista inicial
         
         self.protocol("WM_DELETE_WINDOW", self._al_cerrar) # Maneja el cierre con X
         self.maestro.bind('<F1>', lambda event: self._abrir_ayuda()) # Atajo F1
+        self.bind('<Control-Shift-D>', self._abrir_diagnostico) # Panel oculto de diagnóstico
+        self.panel_diagnostico = None
+        self.ventana_informe = None
 
     def crear_diseno(self):
         # ===============================================
@@ -56,11 +81,21 @@ class VentanaDashboard(CTkToplevel):
         self.crear_boton_nav("Clientes", 2)
         self.crear_boton_nav("Comerciales", 3)
         self.crear_boton_nav("Facturas", 4)
+
+        # Informe completo calculado en local (fila 5: el espacio flexible empuja el logout abajo)
+        CTkButton(self.lateral_frame,
+                  text="Informe Completo",
+                  command=self._abrir_informe,
+                  fg_color="#4C566A",
+                  hover_color="#3B4252",
+                  font=CTkFont(family="Roboto", size=15, weight="bold"),
+                  height=40,
+                  corner_radius=10).grid(row=5, column=0, padx=20, pady=10, sticky="new")
         
         # Botón de Cerrar Sesión
         CTkButton(self.lateral_frame, 
                   text="Cerrar Sesión", 
-                  command=self._al_cerrar,
+                  command=self._cerrar_sesion,
                   fg_color="#CC0000", # Rojo más vivo
                   hover_color="#AA0000", 
                   font=CTkFont(family="Roboto", size=15, weight="bold"), 
@@ -118,6 +153,7 @@ class VentanaDashboard(CTkToplevel):
                         height=40,
                         corner_radius=10)
         btn.grid(row=fila, column=0, padx=20, pady=10, sticky="ew")
+        self.precargador.vincular(btn, texto)
         return btn
 
     def cambiar_vista(self, nombre_vista):
@@ -126,6 +162,9 @@ class VentanaDashboard(CTkToplevel):
         # Destruye la vista actual para limpiar el contenedor
         for widget in self.current_view_container.winfo_children():
             widget.destroy() 
+        self.vista_actual = None
+        # La vista pulsada se adelanta a cualquier precarga especulativa
+        self.precargador.al_navegar(nombre_vista)
         
         self.section_title.configure(text=nombre_vista.upper())
         
@@ -146,17 +185,50 @@ class VentanaDashboard(CTkToplevel):
             
         if vista:
             vista.grid(row=0, column=0, sticky="nsew")
+            self.vista_actual = vista
 
     def cargar_vista_dashboard(self):
         # Carga la vista de resumen principal del dashboard.
-        dashboard_view = VistaDashboard(self.current_view_container, fg_color="transparent")
+        dashboard_view = VistaDashboard(self.current_view_container, preferencias=self.preferencias, fg_color="transparent")
         dashboard_view.grid(row=0, column=0, sticky="nsew", padx=0, pady=0)
+        self.vista_actual = dashboard_view
+        # Puede haberse pintado con datos locales: reconciliamos con la API cuanto antes
+        self.planificador.refrescar_pronto()
 
     def _al_cerrar(self):
-        # Cierra el Dashboard y devuelve la visibilidad a la ventana principal (Login).
+        # Cierre con la X: detiene los refrescos y vuelve al Login sin olvidar la sesión guardada.
+        self.planificador.detener()
+        self.precargador.detener()
+        self.destroy()
+        self.maestro.deiconify()
+
+    def _cerrar_sesion(self):
+        # Botón "Cerrar Sesión": además olvida la sesión (memoria y disco) antes de volver al Login.
+        self.planificador.detener()
+        self.precargador.detener()
+        api_client.cerrar_sesion()
         self.destroy()
         self.maestro.deiconify()
 
+    def sesion_caducada(self):
+        # La sesión restaurada al arrancar ya no es válida en el servidor: se avisa y se vuelve al Login.
+        tk_messagebox.showwarning(title="Sesión caducada", message="La sesión ha caducado. Vuelva a iniciar sesión.")
+        self._cerrar_sesion()
+
+    def _abrir_diagnostico(self, event=None):
+        # Abre (o trae al frente) el panel oculto con las métricas del cliente API.
+        if self.panel_diagnostico is not None and self.panel_diagnostico.winfo_exists():
+            self.panel_diagnostico.lift()
+            return
+        self.panel_diagnostico = PanelDiagnostico(self)
+
+    def _abrir_informe(self):
+        # Abre (o trae al frente) la ventana del informe completo.
+        if self.ventana_informe is not None and self.ventana_informe.winfo_exists():
+            self.ventana_informe.lift()
+            return
+        self.ventana_informe = VentanaInforme(self)
+
     def _abrir_ayuda(self, event=None):
         # Muestra la ayuda contextual (Requisito de F1).
         informacion_ayuda = ("GUÍA RÁPIDA - CRM XTART\n"
@@ -4,8 +4,11 @@ import re
 from datetime import datetime # Necesario para la fecha de emisión
 
 from components.data_table import DataTable
+from components.formato import MONEDA, FECHA
 from components.modal_form import ModalForm 
+from components.segundo_plano import ejecutar_en_segundo_plano
 from api import api_client
+from api.modelos import Factura
 
 # --- FUNCIONES DE VALIDACIÓN ---
 def validar_id_factura(valor):
@@ -40,6 +43,8 @@ class VistaFacturas(CTkFrame):
         self.id_seleccionado = None 
         # Almacena el objeto completo de la factura para la actualización (PUT).
         self.factura_en_edicion = None
+        # Versión del dataset mostrado (la usa el refresco automático para detectar cambios)
+        self.firma_datos = None
 
         self.marco_control = CTkFrame(self, fg_color="transparent")
         self.marco_control.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="new")
@@ -51,7 +56,9 @@ class VistaFacturas(CTkFrame):
 
         # Inicialización de la Tabla de Datos
         columnas_factura = ["factura_id", "cliente_id", "comercial_id", "fecha_emision", "estado", "total"]
-        self.tabla_datos = DataTable(self, columnas=columnas_factura, al_seleccionar_item=self.al_seleccionar_fila)
+        self.tabla_datos = DataTable(self, columnas=columnas_factura, al_seleccionar_item=self.al_seleccionar_fila,
+                                     facetas=["estado", "comercial_id"], rangos=["fecha_emision"],
+                                     formatos={"fecha_emision": FECHA, "total": MONEDA})
         self.tabla_datos.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
         
         self.cargar_datos_factura()
@@ -67,8 +74,33 @@ class VistaFacturas(CTkFrame):
         CTkButton(self.marco_accion, text="Eliminar (D)", fg_color="red", command=self._confirmar_y_eliminar).pack(side="right", padx=5)
         
     def cargar_datos_factura(self):
-        # Carga datos de la API y actualiza la tabla.
-        datos = api_client.obtener_facturas()
+        # Pinta al instante el dataset local y lo reconcilia con la API (delta) en segundo plano.
+        datos_locales = api_client.obtener_datos_locales('facturas')
+        if datos_locales is not None:
+              self.tabla_datos.actualizar_datos(datos_locales)
+              ejecutar_en_segundo_plano(self, self.obtener_datos_refresco, self.aplicar_refresco)
+        else:
+              # Primera descarga: las filas aparecen en la tabla según llegan los lotes
+              ejecutar_en_segundo_plano(self, self._descargar_por_lotes, self.aplicar_refresco,
+                                        al_progreso=self.tabla_datos.mostrar_parcial)
+
+    def _descargar_por_lotes(self, notificar):
+        # Fuera del hilo de Tk: notifica la lista (creciente) de registros recibidos tras cada lote.
+        recibidos = []
+        def al_lote(lote):
+            recibidos.extend(lote)
+            notificar(recibidos)
+        datos = api_client.sincronizar_facturas(al_lote=al_lote)
+        return api_client.version_datos('facturas'), datos
+
+    def obtener_datos_refresco(self):
+        # Fuera del hilo de Tk: sincroniza (delta) y devuelve (versión del dataset, datos).
+        datos = api_client.sincronizar_facturas()
+        return api_client.version_datos('facturas'), datos
+
+    def aplicar_refresco(self, resultado):
+        # Callback (hilo de Tk) con la respuesta de la API o de la caché si no hay servidor.
+        self.firma_datos, datos = resultado
         if datos is None:
               tk_messagebox.showerror("Error de Conexión", "No se pudieron obtener las facturas. Verifique el servidor REST.")
               self.tabla_datos.actualizar_datos([])
@@ -114,7 +146,7 @@ class VistaFacturas(CTkFrame):
             
             if isinstance(datos_api, list) and len(datos_api) > 0:
                 datos_actuales = datos_api[0]
-            elif isinstance(datos_api, dict):
+            elif isinstance(datos_api, (dict, Factura)):
                 datos_actuales = datos_api
             else:
                  raise Exception("Factura no encontrada o formato de respuesta inválido.")
@@ -175,7 +207,9 @@ class VistaFacturas(CTkFrame):
             # 2. Reenviar campos obligatorios NOT NULL (ID, producto, fecha, estado)
             data_final['factura_id'] = factura_previo.get('factura_id')
             data_final['producto_id'] = factura_previo.get('producto_id')
-            data_final['fecha_emision'] = factura_previo.get('fecha_emision')
+            # El modelo guarda la fecha como date: la API espera YYYY-MM-DD
+            fecha_emision = factura_previo.get('fecha_emision')
+            data_final['fecha_emision'] = fecha_emision.isoformat() if fecha_emision else None
             data_final['estado'] = factura_previo.get('estado')
             
             if api_client.actualizar_factura(self.id_seleccionado, data_final):
@@ -1,12 +1,8 @@
 from customtkinter import *
 from PIL import Image
-import requests
 import tkinter.messagebox as tk_messagebox
-# Importar la configuración de la API desde api_client.py (PENDIENTE DE MOVER)
-
-# --- CONFIGURACIÓN DE API 
-BASE_URL = "http://localhost:8080/crm-backend/api"
-COMERCIALES_ENDPOINT = f"{BASE_URL}/comerciales" 
+# La configuración de la API (BASE_URL, sesión compartida) vive en api_client.py
+from api import api_client
 
 
 class LoginPage(CTkFrame):
@@ -93,45 +89,37 @@ class LoginPage(CTkFrame):
             return
 
         try:
-            # 1. PETICIÓN GET al endpoint para obtener la lista de comerciales
-            response = requests.get(COMERCIALES_ENDPOINT, timeout=3)
-            response.raise_for_status() # Lanza HTTPError si el estado no es 2xx
-            
-            comerciales_list = response.json()
-            login_successful = False
-
-            # 2. Iterar y validar credenciales localmente (como en tu versión)
-            for comercial in comerciales_list:
-                api_username = comercial.get("username")
-                api_password = comercial.get("passwordHash") # Se asume que la 'contraseña' es el hash
-                
-                if api_username == username and api_password == password:
-                    nombre_comercial = comercial.get("nombre", username)
-                    tk_messagebox.showinfo(title="Login Exitoso", message=f"Bienvenido, {nombre_comercial}.")
-                    self.open_dashboard_callback(nombre_comercial)
-                    login_successful = True
-                    break
-            
-            if not login_successful:
+            # 1. Un único POST (form) a /api/login sobre la sesión compartida GLOBAL_SESSION.
+            # El servidor valida las credenciales y deja la cookie de sesión para el resto de peticiones.
+            usuario = api_client.login_autenticacion(username, password)
+
+            if usuario:
+                nombre_comercial = usuario.get("nombre") or username
+                tk_messagebox.showinfo(title="Login Exitoso", message=f"Bienvenido, {nombre_comercial}.")
+                self.open_dashboard_callback(nombre_comercial)
+            elif usuario is False:
+                # 401/400: credenciales rechazadas por el servidor
                 tk_messagebox.showerror(title="Error", message="Usuario o contraseña incorrectos.")
-
-        except requests.exceptions.RequestException as e:
-            # --- FALLBACK DE SIMULACIÓN (Servidor Java apagado o inaccesible) ---
-            print(f"Error de conexión: {e}. Activando modo simulación.")
-            
-            if username == "admin" and password == "1234":
-                nombre_simulado = "Administrador (Simulación)"
-                tk_messagebox.showinfo(title="Modo Simulación Activo",
-                                        message=f"Conexión fallida al servidor. Bienvenido, {nombre_simulado}.")
-                self.open_dashboard_callback(nombre_simulado)
             else:
-                # Mostrar el error de conexión real si no se usan las credenciales de simulación
-                tk_messagebox.showerror(title="Error Fatal",
-                                         message="No se pudo conectar al servidor. Intente más tarde.")
+                self._login_simulado(username, password)
         
         finally:
             self.passwd_entry.delete(0, END) # Limpia la contraseña siempre
 
+    def _login_simulado(self, username, password):
+        # --- FALLBACK DE SIMULACIÓN (Servidor Java apagado o inaccesible) ---
+        print("Error de conexión con /api/login. Activando modo simulación.")
+        
+        if username == "admin" and password == "1234":
+            nombre_simulado = "Administrador (Simulación)"
+            tk_messagebox.showinfo(title="Modo Simulación Activo",
+                                    message=f"Conexión fallida al servidor. Bienvenido, {nombre_simulado}.")
+            self.open_dashboard_callback(nombre_simulado)
+        else:
+            # Mostrar el error de conexión real si no se usan las credenciales de simulación
+            tk_messagebox.showerror(title="Error Fatal",
+                                     message="No se pudo conectar al servidor. Intente más tarde.")
+
     def _abrir_ayuda(self):
         #Muestra la ayuda contextual (Requisito de F1).
         informacion_ayuda = ("GUÍA RÁPIDA - CRM XTART\n"